@@ -51,7 +51,8 @@ export const teamService = {
     }
   },
 
-  getAllTeams: async () => {
+  // includePlayers embeds each team's roster (one request instead of one per team)
+  getAllTeams: async (includePlayers = false) => {
     try {
       const token = localStorage.getItem('authToken');
       const headers: Record<string, string> = {
@@ -62,7 +63,8 @@ export const teamService = {
         headers['Authorization'] = `Bearer ${token}`;
       }
 
-      const res = await fetch(`${BASE_URL}/teams`, {
+      const query = includePlayers ? '?include=players' : '';
+      const res = await fetch(`${BASE_URL}/teams${query}`, {
         method: 'GET',
         headers,
       });
@@ -0,0 +1,162 @@
+# announcements.py
+#
+# Fan-out of announcements to per-user inboxes. Posting only stores the
+# announcement (models/Announcement.py); a background thread per worker then
+# writes one announcement_inbox row per recipient:
+#   club     every user
+#   teams    the players and coaches of the addressed teams
+#   players  a coach's players: on the coach's teams or with a lesson booked
+#   cancellation  players and coaches of the lessons a bulk cancellation
+#            removed (cancellation.py)
+# The author is never a recipient.
+#
+# Recipients are delivered in id order, ANNOUNCEMENT_BATCH_SIZE per
+# transaction (through the single-writer queue, so bookings interleave with a
+# club-wide fan-out instead of waiting for it). Each batch inserts the inbox
+# rows and bumps announcement_unread with one batched statement each, and
+# moves announcements.fanout_cursor past the last recipient, so a fan-out cut
+# short by a restart resumes where it stopped. Every batch first updates the
+# announcement row, which serializes workers delivering the same announcement.
+#
+# Posting wakes the local thread at once; it also looks for undelivered
+# announcements every ANNOUNCEMENT_POLL_INTERVAL seconds (posts from other
+# workers, fan-outs interrupted by a restart).
+
+import os
+import threading
+import writer
+from database import db_connection
+from query import execute, execute_many, fetch_one, fetch_all
+from metrics import metrics
+from config import ANNOUNCEMENT_BATCH_SIZE, ANNOUNCEMENT_POLL_INTERVAL
+
+# Candidate recipients per audience, as a derived table of user ids
+_RECIPIENTS_SQL = {
+    "club": ("SELECT id FROM users", lambda a: ()),
+    "teams": ("""
+        SELECT tm.player_id AS id FROM team_members tm
+        JOIN announcement_teams ta ON ta.team_id = tm.team_id
+        WHERE ta.announcement_id = %s
+        UNION
+        SELECT t.coach_id FROM teams t
+        JOIN announcement_teams ta ON ta.team_id = t.id
+        WHERE ta.announcement_id = %s AND t.coach_id IS NOT NULL
+        """, lambda a: (a["id"], a["id"])),
+    "players": ("""
+        SELECT tm.player_id AS id FROM team_members tm
+        JOIN teams t ON t.id = tm.team_id
+        WHERE t.coach_id = %s
+        UNION
+        SELECT player_id FROM private_lessons WHERE coach_id = %s
+        """, lambda a: (a["coach_id"], a["coach_id"])),
+    "cancellation": ("""
+        SELECT player_id AS id FROM lesson_refunds WHERE cancellation_id = %s
+        UNION
+        SELECT coach_id FROM lesson_refunds WHERE cancellation_id = %s
+        """, lambda a: (a["cancellation_id"], a["cancellation_id"])),
+}
+
+_UNREAD_SQL = """
+    INSERT INTO announcement_unread (user_id, unread) VALUES (%s, 1)
+    ON CONFLICT (user_id) DO UPDATE SET unread = announcement_unread.unread + 1
+"""
+
+
+def deliver_batch(db, announcement_id, batch_size=ANNOUNCEMENT_BATCH_SIZE):
+    """
+    Delivers the next `batch_size` recipients of an announcement in one
+    transaction. Returns (inbox rows written, whether the fan-out is finished).
+    """
+    # Locks the row (the database write lock on SQLite) before reading the cursor
+    claimed = execute(
+        db,
+        "UPDATE announcements SET fanout_cursor = fanout_cursor WHERE id = %s AND delivered_at IS NULL",
+        (announcement_id,)
+    ).rowcount
+    if not claimed:
+        db.rollback()
+        return 0, True  # delivered elsewhere, or deleted
+    announcement = fetch_one(
+        db,
+        "SELECT id, author_id, audience, coach_id, cancellation_id, fanout_cursor FROM announcements WHERE id = %s",
+        (announcement_id,)
+    )
+    candidates, params = _RECIPIENTS_SQL[announcement["audience"]]
+    rows = fetch_all(
+        db,
+        f"SELECT id FROM ({candidates}) r WHERE id > %s AND id <> %s ORDER BY id LIMIT %s",
+        params(announcement) + (announcement["fanout_cursor"], announcement["author_id"] or 0, batch_size)
+    )
+    user_ids = [row["id"] for row in rows]
+    if user_ids:
+        execute_many(
+            db,
+            "INSERT INTO announcement_inbox (user_id, announcement_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+            [(user_id, announcement_id) for user_id in user_ids]
+        )
+        execute_many(db, _UNREAD_SQL, [(user_id,) for user_id in user_ids])
+    done = len(user_ids) < batch_size
+    execute(
+        db,
+        "UPDATE announcements SET fanout_cursor = %s, recipients = recipients + %s"
+        + (", delivered_at = CURRENT_TIMESTAMP" if done else "") + " WHERE id = %s",
+        (user_ids[-1] if user_ids else announcement["fanout_cursor"], len(user_ids), announcement_id)
+    )
+    db.commit()
+    return len(user_ids), done
+
+
+class FanOut:
+    """Delivers pending announcements; one thread per worker, started on first use."""
+
+    def __init__(self, interval, batch_size):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self.delivered = 0
+
+    def ensure_running(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # A thread started before fork doesn't exist in the child
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, name="announcement-fanout", daemon=True).start()
+
+    def wake(self):
+        self.ensure_running()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.drain()
+            except Exception as e:
+                print(f"❌ Announcement fan-out failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def drain(self):
+        with db_connection() as db:
+            pending = fetch_all(db, "SELECT id FROM announcements WHERE delivered_at IS NULL ORDER BY id")
+        for row in pending:
+            self.deliver(row["id"])
+
+    def deliver(self, announcement_id):
+        total = 0
+        while True:
+            written, done = writer.run(deliver_batch, announcement_id, self.batch_size)
+            total += written
+            if done:
+                break
+        if total:
+            self.delivered += total
+            metrics.inc("announcement_deliveries_total", total)
+            print(f"✅ Announcement {announcement_id} delivered to {total} inboxes")
+        return total
+
+
+fanout = FanOut(ANNOUNCEMENT_POLL_INTERVAL, ANNOUNCEMENT_BATCH_SIZE)
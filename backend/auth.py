@@ -0,0 +1,103 @@
+# auth.py
+#
+# Resolves the caller of a request (its "principal": user id + role) without
+# a users lookup per role check. The JWT is decoded once by @jwt_required();
+# the role is read from the users table through a small TTL/LRU cache. The
+# token's `role` claim is not trusted: a demoted or deleted user keeps a valid
+# token for its whole lifetime. Every cached entry carries the shared users
+# change counter (counters.py), so a users write in any worker retires the
+# entries of every worker; a restarted process starts with an empty cache.
+
+import time
+import threading
+import collections
+from dataclasses import dataclass
+from flask import g
+from flask_jwt_extended import get_jwt
+from database import db_connection
+from query import fetch_one
+from counters import counters
+from config import AUTH_CACHE_SIZE, AUTH_CACHE_TTL
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    role: str
+
+
+class PrincipalCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # user_id -> (Principal | None, expires_at, users version)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        now = time.monotonic()
+        # Any users write in any worker bumps the shared counter and retires older entries
+        version = counters.version("users")
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now and entry[2] == version:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def put(self, user_id, principal, version):
+        with self._lock:
+            self._entries[user_id] = (principal, time.monotonic() + self.ttl, version)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
+
+def invalidate_user(*user_ids):
+    """Called by User.update / User.delete so stale roles are never served."""
+    for user_id in user_ids:
+        if user_id is not None:
+            principal_cache.invalidate(int(user_id))
+
+
+def _load_principal(user_id):
+    cached = principal_cache.get(user_id)
+    if cached is not None:
+        return cached[0]
+    version = counters.version("users")  # read before the query so a racing write can't be masked
+    with db_connection() as db:
+        row = fetch_one(db, "SELECT id, role FROM users WHERE id = %s", (user_id,))
+    principal = Principal(id=row["id"], role=row["role"]) if row else None
+    principal_cache.put(user_id, principal, version)
+    return principal
+
+
+def current_principal():
+    """
+    The authenticated caller of this request, or None if the user no longer
+    exists. Must run after @jwt_required(); the result is memoized on `g`.
+    """
+    if "principal" in g:
+        return g.principal
+    principal = _load_principal(int(get_jwt()["id"]))
+    g.principal = principal
+    return principal
+
+
+def has_role(*roles):
+    principal = current_principal()
+    return principal is not None and principal.role in roles
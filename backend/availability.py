@@ -0,0 +1,119 @@
+# availability.py
+#
+# Weekly availability templates. A template such as
+#   { "days": ["Monday", "Wednesday", "Friday"], "start_time": "16:00", "end_time": "20:00" }
+# is validated, merged per day (overlapping / touching ranges become one window)
+# and applied to the coach's rows in one transaction:
+#   merge   - template windows are unioned with what the coach already has
+#   replace - the template becomes the coach's whole week
+# Either way the result is diffed against the stored rows, so unchanged windows
+# keep their ids and only the difference is deleted / inserted.
+
+from collections import defaultdict
+from clock import DAYS
+from booking import BookingError, parse_time, lock_coach
+from weekmap import merge_intervals
+from query import execute_many, fetch_all
+
+MODES = ("merge", "replace")
+_DAY_NAMES = {day.lower(): day for day in DAYS}
+_DAY_NAMES.update({day[:3].lower(): day for day in DAYS})
+
+
+class TemplateError(BookingError):
+    pass
+
+
+def parse_day(value):
+    """'monday' / 'Mon' / 'Monday' -> 'Monday'."""
+    day = _DAY_NAMES.get(str(value).strip().lower())
+    if day is None:
+        raise TemplateError(f"Invalid day: {value}")
+    return day
+
+
+def parse_template(entries):
+    """
+    `entries` is a list of { "days": [...], "start_time": "HH:MM", "end_time": "HH:MM" }.
+    Returns { day: [(start_minutes, end_minutes), ...] } with each day's ranges merged.
+    """
+    if not isinstance(entries, list) or not entries:
+        raise TemplateError("Template must contain at least one entry.")
+    windows = defaultdict(list)
+    for entry in entries:
+        if not isinstance(entry, dict):
+            raise TemplateError("Each template entry must be an object.")
+        days = entry.get("days")
+        if isinstance(days, str):
+            days = [days]
+        if not days or not isinstance(days, list):
+            raise TemplateError("Each template entry needs a list of days.")
+        start, end = parse_time(entry.get("start_time")), parse_time(entry.get("end_time"))
+        if start >= end:
+            raise TemplateError("Availability must end after it starts.")
+        for day in days:
+            windows[parse_day(day)].append((start, end))
+    return {day: merge_intervals(ranges) for day, ranges in windows.items()}
+
+
+def _current(db, coach_id):
+    """{ day: { (start_minutes, end_minutes): [row ids] } } for the coach's stored windows."""
+    current = defaultdict(lambda: defaultdict(list))
+    rows = fetch_all(
+        db,
+        "SELECT id, day, start_time, end_time FROM coach_availability WHERE coach_id = %s",
+        (coach_id,)
+    )
+    for row in rows:
+        key = (row["start_time"], row["end_time"])
+        current[row["day"]][key].append(row["id"])
+    return current
+
+
+def apply_template(db, coach_id, windows, mode="merge"):
+    """
+    Applies parsed template `windows` to the coach's availability in one transaction.
+    Returns { "inserted": n, "deleted": n, "unchanged": n }.
+    """
+    if mode not in MODES:
+        raise TemplateError(f"Invalid mode. Must be one of: {', '.join(MODES)}.")
+    try:
+        coach = lock_coach(db, coach_id)
+        if coach is None or coach["role"] != "coach":
+            raise TemplateError("Coach not found.")
+        current = _current(db, coach_id)
+
+        target = {}
+        for day in DAYS:
+            wanted = list(windows.get(day, ()))
+            if mode == "merge":
+                wanted.extend(current[day].keys() if day in current else ())
+            target[day] = set(merge_intervals(wanted))
+
+        stale, fresh, unchanged = [], [], 0
+        for day in DAYS:
+            stored = current.get(day, {})
+            for key, ids in stored.items():
+                if key in target[day]:
+                    unchanged += 1
+                    stale.extend(ids[1:])  # duplicate rows of the same window
+                else:
+                    stale.extend(ids)
+            fresh.extend(
+                (coach_id, day, start, end)
+                for start, end in sorted(target[day]) if (start, end) not in stored
+            )
+
+        if stale:
+            execute_many(db, "DELETE FROM coach_availability WHERE id = %s", [(i,) for i in stale])
+        if fresh:
+            execute_many(
+                db,
+                "INSERT INTO coach_availability (coach_id, day, start_time, end_time) VALUES (%s, %s, %s, %s)",
+                fresh
+            )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {"inserted": len(fresh), "deleted": len(stale), "unchanged": unchanged}
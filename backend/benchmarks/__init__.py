@@ -0,0 +1,5 @@
+# Benchmarks for the backend. Run modules from the backend directory, e.g.
+#   python -m benchmarks.booking_contention --threads 16
+#   python -m benchmarks.seed --players 50000 --coaches 500 --lessons 2000000 --teams 5000
+#   python -m benchmarks.loadtest --clients 32 --duration 30 --out run.json --compare baseline.json
+#   python -m benchmarks.serialization --rows 10000
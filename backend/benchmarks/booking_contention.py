@@ -0,0 +1,97 @@
+# booking_contention.py
+#
+# Throughput of concurrent bookings against a single coach.
+# Every thread books random one-hour slots on the same coach and day range;
+# at the end the table is checked for overlapping lessons.
+#
+#   python -m benchmarks.booking_contention --threads 16 --attempts 200
+#   DATABASE_URL=postgresql://... python -m benchmarks.booking_contention
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent bookings against one coach")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--attempts", type=int, default=100, help="booking attempts per thread")
+    parser.add_argument("--days", type=int, default=5, help="distinct lesson dates to spread bookings over")
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+    import datetime
+    import booking
+    from database import init_db, db_connection
+    from query import insert, execute, fetch_all
+
+    init_db()
+    with db_connection() as db:
+        coach_id = insert(db, "INSERT INTO users (first_name, last_name, password, role) VALUES (%s, %s, %s, %s)",
+                          ("Bench", f"Coach{random.randint(0, 10**9)}", "x", "coach"))
+        players = [
+            insert(db, "INSERT INTO users (first_name, last_name, password, role) VALUES (%s, %s, %s, %s)",
+                   ("Bench", f"Player{i}-{coach_id}", "x", "player"))
+            for i in range(args.threads)
+        ]
+        for day in booking.DAYS:
+            execute(db, "INSERT INTO coach_availability (coach_id, day, start_time, end_time) VALUES (%s, %s, %s, %s)",
+                    (coach_id, day, 6 * 60, 22 * 60))
+        db.commit()
+
+    first_day = datetime.date.today() + datetime.timedelta(days=1)
+    dates = [(first_day + datetime.timedelta(days=i)).isoformat() for i in range(args.days)]
+    counts = {"booked": 0, "taken": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def worker(player_id, seed):
+        rng = random.Random(seed)
+        local = {"booked": 0, "taken": 0, "errors": 0}
+        for _ in range(args.attempts):
+            start = rng.randrange(6 * 4, 21 * 4) * 15  # quarter-hour starts
+            start_time = f"{start // 60:02d}:{start % 60:02d}"
+            end_time = f"{(start + 60) // 60:02d}:{(start + 60) % 60:02d}"
+            with db_connection() as db:
+                try:
+                    booking.book_lesson(db, player_id, coach_id, rng.choice(dates), start_time, end_time)
+                    local["booked"] += 1
+                except booking.SlotTaken:
+                    local["taken"] += 1
+                except Exception:
+                    local["errors"] += 1
+        with lock:
+            for key, value in local.items():
+                counts[key] += value
+
+    threads = [threading.Thread(target=worker, args=(pid, i)) for i, pid in enumerate(players)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    with db_connection() as db:
+        rows = fetch_all(db, "SELECT lesson_date, start_time, end_time FROM private_lessons WHERE coach_id = %s "
+                             "ORDER BY lesson_date, start_time", (coach_id,))
+    overlaps = sum(
+        1 for a, b in zip(rows, rows[1:])
+        if a["lesson_date"] == b["lesson_date"] and b["start_time"] < a["end_time"]
+    )
+
+    attempts = args.threads * args.attempts
+    print(f"threads={args.threads} attempts={attempts} elapsed={elapsed:.2f}s")
+    print(f"booked={counts['booked']} rejected_overlap={counts['taken']} errors={counts['errors']}")
+    print(f"throughput={attempts / elapsed:.1f} attempts/s  ({counts['booked'] / elapsed:.1f} bookings/s)")
+    print(f"overlapping lessons in table: {overlaps}")
+
+
+if __name__ == "__main__":
+    main()
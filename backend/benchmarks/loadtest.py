@@ -0,0 +1,259 @@
+# loadtest.py
+#
+# Drives a weighted mix of requests against the API with many concurrent
+# clients and reports p50/p95/p99 latency and throughput per endpoint.
+# Run benchmarks.seed first; seeded players/coaches/teams are read from the
+# database named by DATABASE_URL.
+#
+#   python -m benchmarks.loadtest --clients 32 --duration 30 --out run.json
+#   python -m benchmarks.loadtest --url http://127.0.0.1:5000 --clients 64 --out run.json
+#   python -m benchmarks.loadtest --out new.json --compare run.json --threshold 0.15
+#
+# Without --url, requests go through the Flask test client in this process.
+# With --compare, endpoints whose p95 grew or whose throughput fell by more
+# than --threshold are listed and the exit status is 1.
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import threading
+import http.client
+import urllib.parse
+from collections import defaultdict
+
+# Hundreds of logins from one address would hit the /login limits; a server
+# under --url needs RATE_LIMIT_ENABLED=0 as well
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+DEFAULT_MIX = "login=1,book=1,team=4,availability=4"
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class TestClientTransport:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, token=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HTTPTransport:
+    """One keep-alive connection per client thread."""
+
+    def __init__(self, url):
+        parsed = urllib.parse.urlparse(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+
+    def request(self, method, path, body=None, token=None):
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        payload = json.dumps(body) if body is not None else None
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            raise
+        try:
+            return response.status, json.loads(data) if data else None
+        except ValueError:
+            return response.status, None
+
+
+class Scenario:
+    """The requests in the mix. Each returns (status, body) through the client's transport."""
+
+    def __init__(self, players, coaches, teams, password, rng):
+        self.players, self.coaches, self.teams = players, coaches, teams
+        self.password = password
+        self.rng = rng
+        self.first_day = datetime.date.today() + datetime.timedelta(days=1)
+
+    def login(self, transport, player_id):
+        return transport.request("POST", "/login", {"user_id": player_id, "password": self.password})
+
+    def book(self, transport, token):
+        start = self.rng.randrange(8, 19) * 60
+        day = self.first_day + datetime.timedelta(days=self.rng.randrange(0, 90))
+        return transport.request("POST", "/lessons", {
+            "coach_id": self.rng.choice(self.coaches),
+            "lesson_date": day.isoformat(),
+            "start_time": f"{start // 60:02d}:00",
+            "end_time": f"{start // 60 + 1:02d}:00",
+        }, token)
+
+    def team(self, transport, token):
+        return transport.request("GET", f"/teams/{self.rng.choice(self.teams)}", token=token)
+
+    def availability(self, transport, token):
+        return transport.request("GET", f"/coach/availability/{self.rng.choice(self.coaches)}", token=token)
+
+
+def _client(transport, scenario, mix, player_id, deadline, max_requests, results):
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    status, body = scenario.login(transport, player_id)
+    token = (body or {}).get("token")
+    if not token:
+        results["_setup_errors"].append(status)
+        return
+    done = 0
+    while time.perf_counter() < deadline and (not max_requests or done < max_requests):
+        name = scenario.rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            if name == "login":
+                status, _ = scenario.login(transport, player_id)
+            else:
+                status, _ = getattr(scenario, name)(transport, token)
+        except Exception:
+            status = "error"
+        results[name].append((time.perf_counter() - started, status))
+        done += 1
+
+
+def summarize(results, elapsed):
+    endpoints = {}
+    total = 0
+    for name, samples in sorted(results.items()):
+        if name.startswith("_") or not samples:
+            continue
+        latencies = sorted(latency for latency, _ in samples)
+        statuses = defaultdict(int)
+        for _, status in samples:
+            statuses[str(status)] += 1
+        errors = sum(count for status, count in statuses.items() if status == "error" or status.startswith("5"))
+        endpoints[name] = {
+            "requests": len(samples),
+            "throughput": round(len(samples) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+            "max_ms": round(latencies[-1] * 1000, 3),
+            "errors": errors,
+            "statuses": dict(statuses),
+        }
+        total += len(samples)
+    return {"elapsed_s": round(elapsed, 3), "requests": total,
+            "throughput": round(total / elapsed, 2) if elapsed else 0, "endpoints": endpoints}
+
+
+def compare(current, baseline, threshold):
+    """Endpoints that got slower (p95) or handled less (throughput) than `baseline` by more than `threshold`."""
+    regressions = []
+    for name, now in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        if before["p95_ms"] and now["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']} ms -> {now['p95_ms']} ms")
+        if before["throughput"] and now["throughput"] < before["throughput"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {before['throughput']}/s -> {now['throughput']}/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test with per-endpoint latency percentiles")
+    parser.add_argument("--url", help="base URL of a running server (default: in-process test client)")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent clients (threads)")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="stop each client after this many requests")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted endpoint mix (default {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+    from database import init_db, db_connection, is_postgres
+    from query import fetch_all
+    from benchmarks.seed import seeded_ids, SEED_PASSWORD, PLAYER_NAME, COACH_NAME
+
+    mix = []
+    for part in args.mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("login", "book", "team", "availability"):
+            parser.error(f"unknown endpoint in --mix: {name}")
+        mix.append((name.strip(), float(weight or 1)))
+
+    init_db()
+    with db_connection() as db:
+        players, coaches = seeded_ids(db, PLAYER_NAME), seeded_ids(db, COACH_NAME)
+        teams = [row["id"] for row in fetch_all(db, "SELECT id FROM teams WHERE team_name LIKE %s", ("Seed Team %",))]
+    if len(players) < args.clients or not coaches or not teams:
+        sys.exit("❌ Not enough seeded data; run python -m benchmarks.seed first.")
+
+    if args.url:
+        make_transport = lambda: HTTPTransport(args.url)
+    else:
+        from main import create_app
+        app = create_app()
+        make_transport = lambda: TestClientTransport(app)
+
+    results = defaultdict(list)
+    deadline = time.perf_counter() + args.duration
+    rng = random.Random(args.seed)
+    threads = [
+        threading.Thread(target=_client, args=(
+            make_transport(), Scenario(players, coaches, teams, SEED_PASSWORD, random.Random(rng.random())),
+            mix, player_id, deadline, args.requests, results,
+        ))
+        for player_id in rng.sample(players, args.clients)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    summary = summarize(results, elapsed)
+    summary["meta"] = {
+        "target": args.url or "test-client",
+        "database": "postgres" if is_postgres() else "sqlite",
+        "clients": args.clients,
+        "mix": args.mix,
+        "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "setup_errors": len(results["_setup_errors"]),
+    }
+
+    print(f"{'endpoint':<14}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, stats in summary["endpoints"].items():
+        print(f"{name:<14}{stats['requests']:>10}{stats['throughput']:>10}{stats['p50_ms']:>10}"
+              f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['errors']:>8}")
+    print(f"total {summary['requests']} requests in {summary['elapsed_s']}s ({summary['throughput']} req/s)")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(summary, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(summary, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"❌ Regression: {line}")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# seed.py
+#
+# Synthetic club data at production scale, for load tests and query plans.
+# Rows are generated deterministically and written with batched inserts
+# (execute_many, one commit per batch). Every seeded user shares one
+# password, hashed once up front: SEED_PASSWORD below.
+#
+#   python -m benchmarks.seed --players 50000 --coaches 500 --lessons 2000000 --teams 5000
+#   DATABASE_URL=postgresql://... python -m benchmarks.seed --players 1000 --lessons 20000
+#
+# Lessons are laid out coach by coach in hourly slots (08:00-20:00, Mon-Sat),
+# centred on today, so they never overlap for a coach or for a player.
+
+import os
+import sys
+import time
+import random
+import argparse
+import datetime
+
+SEED_PASSWORD = "benchpass"
+PLAYER_NAME = "SeedPlayer"
+COACH_NAME = "SeedCoach"
+DAY_START, DAY_END = 8 * 60, 20 * 60
+WORKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday")
+
+
+def _progress(label, done, started):
+    elapsed = time.perf_counter() - started
+    print(f"🔹 {label}: {done} rows in {elapsed:.1f}s ({done / elapsed if elapsed else 0:.0f} rows/s)")
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _write(db, label, sql, rows, batch_size):
+    from query import execute_many
+
+    started = time.perf_counter()
+    done = 0
+    for batch in _batched(rows, batch_size):
+        execute_many(db, sql, batch)
+        db.commit()
+        done += len(batch)
+    _progress(label, done, started)
+    return done
+
+
+def seeded_ids(db, first_name):
+    from query import fetch_all
+
+    rows = fetch_all(db, "SELECT id FROM users WHERE first_name = %s ORDER BY id", (first_name,))
+    return [row["id"] for row in rows]
+
+
+def seed(db, players, coaches, lessons, teams, team_size, batch_size, rng):
+    from hashing import hash_password
+
+    hashed = hash_password(SEED_PASSWORD)
+    offset = len(seeded_ids(db, PLAYER_NAME)), len(seeded_ids(db, COACH_NAME))
+    users_sql = "INSERT INTO users (first_name, last_name, password, role) VALUES (%s, %s, %s, %s)"
+    _write(db, "players", users_sql,
+           ((PLAYER_NAME, f"P{offset[0] + i:07d}", hashed, "player") for i in range(players)), batch_size)
+    _write(db, "coaches", users_sql,
+           ((COACH_NAME, f"C{offset[1] + i:05d}", hashed, "coach") for i in range(coaches)), batch_size)
+    player_ids, coach_ids = seeded_ids(db, PLAYER_NAME), seeded_ids(db, COACH_NAME)
+    new_coaches = coach_ids[-coaches:] if coaches else []
+
+    _write(db, "availability",
+           "INSERT INTO coach_availability (coach_id, day, start_time, end_time) VALUES (%s, %s, %s, %s)",
+           ((coach_id, day, DAY_START, DAY_END) for coach_id in new_coaches for day in WORKDAYS), batch_size)
+
+    if lessons and coach_ids and len(player_ids) >= len(coach_ids):
+        _write(db, "lessons",
+               "INSERT INTO private_lessons (player_id, coach_id, lesson_date, start_time, end_time) "
+               "VALUES (%s, %s, %s, %s, %s)",
+               _lessons(db, lessons, coach_ids, player_ids), batch_size)
+    elif lessons:
+        print("❌ Lessons need at least as many players as coaches; skipped.")
+
+    if teams and coach_ids:
+        _seed_teams(db, teams, team_size, coach_ids, player_ids, batch_size, rng)
+
+    from counters import bump
+    bump("users", "teams", "team_members", "coach_availability", "private_lessons")
+
+
+def _lessons(db, count, coach_ids, player_ids):
+    """Hourly lessons for every coach, day after day, with a distinct player per coach per slot."""
+    from query import fetch_one
+
+    slots = range(DAY_START, DAY_END, 60)
+    per_day = len(coach_ids) * len(slots)
+    days = -(-count // per_day)
+    # Resume after the last seeded day, or start so the range is centred on today
+    last = fetch_one(db, "SELECT MAX(lesson_date) AS last FROM private_lessons WHERE coach_id = %s", (coach_ids[0],))
+    if last and last["last"]:
+        day = datetime.date.fromisoformat(str(last["last"])) + datetime.timedelta(days=1)
+    else:
+        day = datetime.date.today() - datetime.timedelta(days=days * 7 // 12)
+    made = 0
+    day_index = 0
+    while made < count:
+        if day.weekday() < len(WORKDAYS):
+            iso = day.isoformat()
+            for s, start in enumerate(slots):
+                shift = day_index * 7 + s * 13
+                for c, coach_id in enumerate(coach_ids):
+                    yield player_ids[(c + shift) % len(player_ids)], coach_id, iso, start, start + 60
+                    made += 1
+                    if made == count:
+                        return
+            day_index += 1
+        day += datetime.timedelta(days=1)
+
+
+def _seed_teams(db, count, team_size, coach_ids, player_ids, batch_size, rng):
+    from query import fetch_all
+
+    tag = rng.randrange(16 ** 6)
+    names = [f"Seed Team {tag:06x}-{i}" for i in range(count)]
+    _write(db, "teams", "INSERT INTO teams (team_name, coach_id) VALUES (%s, %s)",
+           ((name, coach_ids[i % len(coach_ids)]) for i, name in enumerate(names)), batch_size)
+    rows = fetch_all(db, "SELECT id FROM teams WHERE team_name LIKE %s ORDER BY id", (f"Seed Team {tag:06x}-%",))
+    size = min(team_size, len(player_ids))
+    _write(db, "team members", "INSERT INTO team_members (team_id, player_id) VALUES (%s, %s)",
+           ((row["id"], player_id) for row in rows for player_id in rng.sample(player_ids, size)), batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the database with synthetic club data")
+    parser.add_argument("--players", type=int, default=50000)
+    parser.add_argument("--coaches", type=int, default=500)
+    parser.add_argument("--lessons", type=int, default=2000000)
+    parser.add_argument("--teams", type=int, default=5000)
+    parser.add_argument("--team-size", type=int, default=12)
+    parser.add_argument("--batch", type=int, default=5000, help="rows per insert batch / commit")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (team rosters)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+    from database import init_db, db_connection
+
+    init_db()
+    started = time.perf_counter()
+    with db_connection() as db:
+        seed(db, args.players, args.coaches, args.lessons, args.teams, args.team_size, args.batch,
+             random.Random(args.seed))
+    print(f"✅ Seeded in {time.perf_counter() - started:.1f}s (password for every seeded user: {SEED_PASSWORD})")
+
+
+if __name__ == "__main__":
+    main()
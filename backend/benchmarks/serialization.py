@@ -0,0 +1,119 @@
+# serialization.py
+#
+# Cost of turning list-endpoint rows into a JSON response body, per 10k rows:
+#   before: SELECT every column, Model.from_row(row).to_dict(), flask.jsonify
+#   after:  SELECT the projected columns, serializers.Projection.row, serializers.dumps
+# Each path is timed with the query and on already fetched rows (encoding
+# only). CPU time is the best of --repeat runs; peak allocation comes from a
+# separate run under tracemalloc, since tracing slows the runs down.
+#
+#   python -m benchmarks.serialization --rows 10000 --repeat 5
+#   DATABASE_URL=postgresql://... python -m benchmarks.serialization
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+
+def _measure(fn, repeat):
+    """(best CPU seconds over `repeat` runs, peak traced bytes of one run)."""
+    best = None
+    for _ in range(repeat):
+        started = time.process_time()
+        fn()
+        elapsed = time.process_time() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Row serialization cost, old model round trip vs projections")
+    parser.add_argument("--rows", type=int, default=10000, help="rows per endpoint")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+    import random
+    import datetime
+    from flask import Flask, jsonify
+    from database import init_db, db_connection
+    from query import execute, execute_many, fetch_all, fetch_one
+    from hashing import hash_password
+    from models.Users import User
+    from models.Lesson import Lesson
+    import serializers
+    from serializers import USER, LESSON
+
+    init_db()
+    tag = f"Bench{random.randrange(10 ** 9)}"
+    with db_connection() as db:
+        hashed = hash_password("benchpass")
+        execute_many(db, "INSERT INTO users (first_name, last_name, password, role) VALUES (%s, %s, %s, %s)",
+                     [(tag, f"P{i:07d}", hashed, "player") for i in range(args.rows)])
+        execute(db, "INSERT INTO users (first_name, last_name, password, role) VALUES (%s, %s, %s, %s)",
+                (tag, "Coach", hashed, "coach"))
+        db.commit()
+        coach_id = fetch_one(db, "SELECT id FROM users WHERE first_name = %s AND role = 'coach'", (tag,))["id"]
+        first_day = datetime.date(2030, 1, 1)
+        players = [row["id"] for row in fetch_all(db, "SELECT id FROM users WHERE first_name = %s AND role = 'player'", (tag,))]
+        execute_many(db, "INSERT INTO private_lessons (player_id, coach_id, lesson_date, start_time, end_time) "
+                         "VALUES (%s, %s, %s, %s, %s)",
+                     [(player_id, coach_id, (first_day + datetime.timedelta(days=i // 12)).isoformat(),
+                       480 + i % 12 * 60, 540 + i % 12 * 60) for i, player_id in enumerate(players)])
+        db.commit()
+
+        app = Flask(__name__)
+        lesson_order = " ORDER BY lesson_date, start_time, id"
+        cases = {
+            "users": (
+                ("SELECT id, first_name, last_name, password, role FROM users WHERE first_name = %s ORDER BY id",
+                 lambda rows: jsonify([User.from_row(row).to_dict() for row in rows]).get_data()),
+                (f"SELECT {USER.columns()} FROM users WHERE first_name = %s ORDER BY id",
+                 lambda rows: serializers.dumps(USER.rows(rows))),
+                (tag,),
+            ),
+            "lessons": (
+                ("SELECT id, player_id, coach_id, lesson_date, start_time, end_time FROM private_lessons "
+                 "WHERE coach_id = %s" + lesson_order,
+                 lambda rows: jsonify([Lesson.from_row(row).to_dict() for row in rows]).get_data()),
+                (f"SELECT {LESSON.columns()} FROM private_lessons WHERE coach_id = %s" + lesson_order,
+                 lambda rows: serializers.dumps(LESSON.rows(rows))),
+                (coach_id,),
+            ),
+        }
+
+        encoder = "orjson" if serializers.orjson is not None else "json"
+        scale = 10000 / args.rows
+        print(f"🔹 {args.rows} rows per endpoint, encoder: {encoder}; figures are per 10k rows")
+        print(f"{'endpoint':<10}{'path':<8}{'query+encode ms':>17}{'peak KiB':>10}{'encode ms':>11}{'peak KiB':>10}")
+        with app.app_context():
+            for name, (old, new, params) in cases.items():
+                results = {}
+                for path, (sql, encode) in (("before", old), ("after", new)):
+                    rows = fetch_all(db, sql, params)
+                    total_cpu, total_peak = _measure(lambda: encode(fetch_all(db, sql, params)), args.repeat)
+                    encode_cpu, encode_peak = _measure(lambda: encode(rows), args.repeat)
+                    results[path] = encode_cpu
+                    print(f"{name:<10}{path:<8}{total_cpu * 1000 * scale:>17.1f}{total_peak / 1024 * scale:>10.0f}"
+                          f"{encode_cpu * 1000 * scale:>11.1f}{encode_peak / 1024 * scale:>10.0f}")
+                if results["after"]:
+                    print(f"✅ {name}: encoding takes {results['before'] / results['after']:.1f}x less CPU")
+
+        execute(db, "DELETE FROM private_lessons WHERE coach_id = %s", (coach_id,))
+        execute(db, "DELETE FROM users WHERE first_name = %s", (tag,))
+        db.commit()
+
+
+if __name__ == "__main__":
+    main()
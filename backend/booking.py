@@ -0,0 +1,92 @@
+# booking.py
+#
+# Lesson booking engine. A booking is checked and written in one transaction:
+#   1. take the per-coach write lock (BEGIN IMMEDIATE on SQLite,
+#      SELECT ... FOR UPDATE on the coach row on Postgres)
+#   2. the lesson must fit inside one of the coach's availability windows
+#   3. it must not overlap any lesson of the coach (or of the player)
+#   4. insert and commit
+# Times are minutes since midnight throughout (see clock.py); availability
+# is checked against the coach's cached weekly bitmap (weekmap.py).
+# The database enforces step 3 as well (exclusion constraint on Postgres,
+# trigger on SQLite, see migration 0003), so nothing slips through even if
+# a caller bypasses this module.
+
+import datetime
+import sqlite3
+import psycopg2
+from models.Lesson import Lesson
+from clock import to_minutes
+from weekmap import weekmaps
+from query import dialect, execute
+
+class BookingError(Exception):
+    status = 400
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class SlotTaken(BookingError):
+    pass
+
+
+class CoachUnavailable(BookingError):
+    pass
+
+
+def parse_time(value):
+    """'9:5', '09:05' or '09:05:00' -> minutes since midnight (545)."""
+    try:
+        return to_minutes(value)
+    except ValueError:
+        raise BookingError(f"Invalid time '{value}', expected HH:MM.")
+
+
+def parse_date(value):
+    try:
+        return datetime.date.fromisoformat(str(value))
+    except ValueError:
+        raise BookingError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+
+
+def lock_coach(db, coach_id):
+    if dialect(db) == "sqlite":
+        # Takes the database write lock up front, so the checks below and the
+        # insert can't interleave with another booking.
+        execute(db, "BEGIN IMMEDIATE")
+        return execute(db, "SELECT role FROM users WHERE id = %s", (coach_id,)).fetchone()
+    return execute(db, "SELECT role FROM users WHERE id = %s FOR UPDATE", (coach_id,)).fetchone()
+
+
+def book_lesson(db, player_id, coach_id, lesson_date, start_time, end_time):
+    """Books a lesson atomically and returns it. Raises BookingError (or a subclass) when it can't."""
+    day = parse_date(lesson_date)
+    start, end = parse_time(start_time), parse_time(end_time)
+    if start >= end:
+        raise BookingError("Lesson must end after it starts.")
+
+    lesson = Lesson(id=None, player_id=player_id, coach_id=coach_id,
+                    lesson_date=day.isoformat(), start_time=start, end_time=end)
+    try:
+        coach = lock_coach(db, coach_id)
+        if coach is None or coach["role"] != "coach":
+            raise BookingError("Coach not found.")
+        if not weekmaps.get(db, coach_id).covers(day.weekday(), start, end):
+            raise CoachUnavailable("Coach is not available at this time.")
+        if Lesson.is_booked(db, coach_id, lesson.lesson_date, start, end):
+            raise SlotTaken("This time slot is already booked.")
+        if Lesson.player_is_busy(db, player_id, lesson.lesson_date, start, end):
+            raise SlotTaken("You already have a lesson at this time.")
+        lesson.save(db, commit=False)
+        db.commit()
+    except (sqlite3.IntegrityError, psycopg2.IntegrityError):
+        # Overlap guard / unique constraint fired: another booking won the race
+        db.rollback()
+        raise SlotTaken("This time slot is already booked.")
+    except Exception:
+        db.rollback()
+        raise
+    return lesson
+
@@ -0,0 +1,136 @@
+# cancellation.py
+#
+# Bulk cancellation of lessons (rain). Every lesson overlapping a date / time
+# window, optionally for one coach, is cancelled in one transaction of a few
+# set-based statements, however many lessons there are:
+#   1. take the write lock (BEGIN IMMEDIATE on SQLite; on Postgres the
+#      deleted lessons' row locks, with the refund ledger's unique lesson_id
+#      making a concurrent cancellation of the same lessons a no-op)
+#   2. INSERT INTO lesson_refunds ... SELECT the lessons in the window
+#   3. DELETE the lessons that were just written to the ledger
+#   4. queue the notification: an announcement to the cancellation's players
+#      and coaches, delivered afterwards by the fan-out (announcements.py)
+# The change-log triggers record the deletes, so /sync and /events pick them
+# up like any other. Lessons carry no price: a refund is recorded as minutes
+# of lesson time for billing to settle.
+#
+# The window is capped at BULK_CANCEL_MAX_DAYS and BULK_CANCEL_MAX_LESSONS, so
+# a request (a full-day wipeout included) stays one short transaction over
+# the lesson_date index.
+
+from booking import BookingError, parse_date, parse_time
+from models.Announcement import Announcement
+from clock import format_minutes
+from query import dialect, execute, insert, fetch_one
+from pagination import fetch_page
+from serializers import REFUND
+from config import BULK_CANCEL_MAX_DAYS, BULK_CANCEL_MAX_LESSONS
+
+REFUND_STATUSES = ("pending", "settled")
+
+
+class CancellationError(BookingError):
+    pass
+
+
+def parse_window(date_from, date_to=None, start_time=None, end_time=None):
+    """(first day, last day, start minute, end minute) of a cancellation window; the whole day by default."""
+    first = parse_date(date_from)
+    last = parse_date(date_to) if date_to else first
+    start = parse_time(start_time) if start_time else 0
+    end = parse_time(end_time) if end_time else 24 * 60
+    if last < first:
+        raise CancellationError("date_to must not be before date_from.")
+    if (last - first).days >= BULK_CANCEL_MAX_DAYS:
+        raise CancellationError(f"At most {BULK_CANCEL_MAX_DAYS} days can be cancelled at once.")
+    if start >= end:
+        raise CancellationError("end_time must be after start_time.")
+    return first, last, start, end
+
+
+def _describe(first, last, start, end):
+    days = first.isoformat() if first == last else f"{first.isoformat()} to {last.isoformat()}"
+    if (start, end) == (0, 24 * 60):
+        return days
+    return f"{days} between {format_minutes(start)} and {format_minutes(end)}"
+
+
+def cancel_lessons(db, cancelled_by, first, last, start, end, coach_id=None, reason="weather", dry_run=False):
+    """
+    Cancels the lessons overlapping the window and records their refunds.
+    Returns counts: lessons, players, coaches, minutes (and cancellation_id
+    unless `dry_run`, which only counts). Raises CancellationError when the
+    window holds more than BULK_CANCEL_MAX_LESSONS lessons.
+    """
+    where = "lesson_date BETWEEN %s AND %s AND start_time < %s AND end_time > %s"
+    params = (first.isoformat(), last.isoformat(), end, start)
+    if coach_id is not None:
+        where += " AND coach_id = %s"
+        params += (coach_id,)
+    summary_sql = ("SELECT COUNT(*) AS lessons, COUNT(DISTINCT player_id) AS players, "
+                   "COUNT(DISTINCT coach_id) AS coaches, COALESCE(SUM(end_time - start_time), 0) AS minutes FROM ")
+
+    try:
+        if dialect(db) == "sqlite":
+            execute(db, "BEGIN IMMEDIATE")
+        found = dict(fetch_one(db, summary_sql + f"private_lessons WHERE {where}", params))
+        if found["lessons"] > BULK_CANCEL_MAX_LESSONS:
+            raise CancellationError(
+                f"{found['lessons']} lessons in this window; at most {BULK_CANCEL_MAX_LESSONS} "
+                "can be cancelled at once. Narrow the window or cancel per coach."
+            )
+        if dry_run or not found["lessons"]:
+            db.rollback()
+            return dict(found, cancellation_id=None)
+
+        cancellation_id = insert(
+            db,
+            "INSERT INTO lesson_cancellations (cancelled_by, reason, date_from, date_to, start_time, end_time, coach_id) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            (cancelled_by, reason, first.isoformat(), last.isoformat(), start, end, coach_id)
+        )
+        execute(
+            db,
+            "INSERT INTO lesson_refunds (cancellation_id, lesson_id, player_id, coach_id, lesson_date, "
+            "start_time, end_time, minutes) "
+            "SELECT %s, id, player_id, coach_id, lesson_date, start_time, end_time, end_time - start_time "
+            f"FROM private_lessons WHERE {where} ON CONFLICT (lesson_id) DO NOTHING",
+            (cancellation_id,) + params
+        )
+        cancelled = execute(
+            db,
+            "DELETE FROM private_lessons WHERE id IN (SELECT lesson_id FROM lesson_refunds WHERE cancellation_id = %s)",
+            (cancellation_id,)
+        ).rowcount
+        if not cancelled:
+            # Another cancellation took these lessons first
+            db.rollback()
+            return {"lessons": 0, "players": 0, "coaches": 0, "minutes": 0, "cancellation_id": None}
+        execute(db, "UPDATE lesson_cancellations SET lessons = %s WHERE id = %s", (cancelled, cancellation_id))
+        result = dict(fetch_one(db, summary_sql + "lesson_refunds WHERE cancellation_id = %s", (cancellation_id,)))
+
+        window = _describe(first, last, start, end)
+        Announcement(
+            id=None, author_id=cancelled_by, title=f"Lessons cancelled ({reason})",
+            content=f"Your lessons on {window} have been cancelled ({reason}). A refund has been recorded.",
+            important=True, audience="cancellation", cancellation_id=cancellation_id
+        ).save(db, commit=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    result["cancellation_id"] = cancellation_id
+    return result
+
+
+def get_refunds(db, status=None, cancellation_id=None, page=None):
+    """The refund ledger, optionally filtered; oldest first."""
+    sql = f"SELECT {REFUND.columns()} FROM lesson_refunds WHERE 1 = 1"
+    params = ()
+    if status is not None:
+        sql += " AND status = %s"
+        params += (status,)
+    if cancellation_id is not None:
+        sql += " AND cancellation_id = %s"
+        params += (cancellation_id,)
+    return fetch_page(db, sql, params, [("id", "id")], page, REFUND.row)
@@ -0,0 +1,225 @@
+# changelog.py
+#
+# Delta sync for the dashboards. Triggers (migration 0006) append every write
+# to private_lessons, coach_availability, teams and team_members to change_log
+# in the writing transaction. An entry's position is (txid, seq):
+#   - PostgreSQL: txid is the writing transaction's id (migration 0009), and
+#     only entries whose transactions have all ended are read: txid below the
+#     xmin of the reader's snapshot. Any transaction that is still running, or
+#     not yet started, has a txid at or above it, so whatever it writes later
+#     lands after every position already handed out. Writers never wait on
+#     each other for this; a long-running transaction only delays delivery.
+#   - SQLite: one writer at a time, so seq alone is in commit order; txid is 0.
+# A client keeps the `next` token from its last /sync and asks for what
+# changed since:
+#   - entries after the token are filtered to what the caller may see
+#       admin:  everything
+#       coach:  own lessons and availability, own teams and their rosters
+#       player: own lessons, every coach's availability, teams they're in
+#   - several entries for one row collapse into one insert / update / delete,
+#     with the row's current contents for inserts and updates
+# Tokens are opaque (pagination.encode_cursor of the position); a token from
+# before migration 0009 holds a bare seq and reads as (0, seq).
+#
+# Compaction deletes entries older than CHANGE_LOG_RETENTION_DAYS and raises
+# the watermark; a token below the watermark (or from another database) gets
+# 410 and the client reloads its lists, then syncs from the token in the reply.
+
+import os
+import time
+import threading
+from query import dialect, execute, fetch_one, fetch_all
+from pagination import InvalidCursor, encode_cursor, decode_cursor
+from serializers import AVAILABILITY, LESSON, TEAM, TEAM_MEMBER
+from models.Team import Team
+from config import CHANGE_LOG_RETENTION_DAYS, CHANGE_LOG_COMPACT_INTERVAL, SYNC_MAX_CHANGES
+import writer
+
+ID_CHUNK = 400  # ids per IN (...) lookup
+
+# Current contents of changed rows, per table
+_ROW_SQL = {
+    "private_lessons": (f"SELECT {LESSON.columns()} FROM private_lessons WHERE id IN ", LESSON),
+    "coach_availability": (f"SELECT {AVAILABILITY.columns()} FROM coach_availability WHERE id IN ", AVAILABILITY),
+    "teams": (Team.LIST_SQL + " AND t.id IN ", TEAM),
+    "team_members": (f"SELECT {TEAM_MEMBER.columns()} FROM team_members WHERE id IN ", TEAM_MEMBER),
+}
+
+
+class ResyncRequired(Exception):
+    """The token is older than the compacted log (or not from this database)."""
+
+    def __init__(self, head):
+        super().__init__("Changes since this token are no longer available; reload and sync again.")
+        self.head = head
+
+
+def encode_token(position):
+    return encode_cursor(list(position))
+
+
+def decode_token(token):
+    """(txid, seq) from a /sync token; raises pagination.InvalidCursor for garbage."""
+    try:
+        position = decode_cursor(token, 2)
+    except InvalidCursor:
+        position = [0] + decode_cursor(token, 1)
+    if not all(isinstance(value, int) for value in position):
+        raise InvalidCursor("Invalid sync token.")
+    return tuple(position)
+
+
+def _settled(db):
+    """Condition limiting change_log to entries whose writing transactions have all ended."""
+    if dialect(db) == "postgres":
+        return "txid < txid_snapshot_xmin(txid_current_snapshot())"
+    return "1 = 1"
+
+
+def read(db, after, limit, columns="txid, seq, table_name, op, row_id", scope_sql="", scope_params=(), until=None):
+    """Up to `limit` settled entries after position `after` (and up to `until`), in order."""
+    sql = f"SELECT {columns} FROM change_log WHERE (txid, seq) > (%s, %s) AND {_settled(db)}"
+    params = tuple(after)
+    if until is not None:
+        sql += " AND (txid, seq) <= (%s, %s)"
+        params += tuple(until)
+    return fetch_all(db, sql + scope_sql + " ORDER BY txid, seq LIMIT %s", params + tuple(scope_params) + (limit,))
+
+
+def position(entry):
+    return (entry["txid"], entry["seq"])
+
+
+def _scope(principal):
+    if principal.role == "admin":
+        return "", ()
+    if principal.role == "coach":
+        return (" AND (coach_id = %s OR team_id IN (SELECT id FROM teams WHERE coach_id = %s))",
+                (principal.id, principal.id))
+    return (" AND (player_id = %s OR table_name = 'coach_availability'"
+            " OR team_id IN (SELECT team_id FROM team_members WHERE player_id = %s))",
+            (principal.id, principal.id))
+
+
+def _watermark(db):
+    row = fetch_one(db, "SELECT watermark_txid, watermark FROM change_log_state WHERE id = 1")
+    return (row["watermark_txid"], row["watermark"])
+
+
+def head(db):
+    """
+    Position every settled entry is at or before. On PostgreSQL that's
+    (snapshot xmin, 0); on SQLite the newest entry (the watermark when the
+    log is empty).
+    """
+    if dialect(db) == "postgres":
+        row = fetch_one(db, "SELECT txid_snapshot_xmin(txid_current_snapshot()) AS xmin")
+        return max((row["xmin"], 0), _watermark(db))
+    row = fetch_one(db, "SELECT MAX(seq) AS seq FROM change_log")
+    return (0, row["seq"]) if row["seq"] is not None else _watermark(db)
+
+
+def _current_rows(db, table, ids):
+    sql, projection = _ROW_SQL[table]
+    rows = {}
+    for i in range(0, len(ids), ID_CHUNK):
+        chunk = ids[i:i + ID_CHUNK]
+        for row in fetch_all(db, sql + "(" + ", ".join(["%s"] * len(chunk)) + ")", tuple(chunk)):
+            rows[row["id"]] = projection.row(row)
+    return rows
+
+
+def changes_since(db, principal, since, limit=SYNC_MAX_CHANGES):
+    """
+    {"changes": [...], "next": token, "more": bool} for `principal` after position `since`.
+    Raises ResyncRequired when entries after `since` were compacted away.
+    """
+    newest = head(db)
+    scope_sql, scope_params = _scope(principal)
+    entries = read(db, since, limit + 1, scope_sql=scope_sql, scope_params=scope_params, until=newest)
+    # Checked after the scan: a compaction that ran meanwhile shows up here
+    if since < _watermark(db) or since > newest:
+        raise ResyncRequired(newest)
+
+    more = len(entries) > limit
+    entries = entries[:limit]
+    last_position = position(entries[-1]) if more else newest
+
+    ops = {}  # (table, row_id) -> [first op, last op, last position]
+    for entry in entries:
+        key = (entry["table_name"], entry["row_id"])
+        if key in ops:
+            ops[key][1:] = [entry["op"], position(entry)]
+        else:
+            ops[key] = [entry["op"], entry["op"], position(entry)]
+
+    wanted = {}
+    for (table, row_id), (first, last, _) in ops.items():
+        if last != "delete":
+            wanted.setdefault(table, []).append(row_id)
+    current = {table: _current_rows(db, table, ids) for table, ids in wanted.items()}
+
+    changes = []
+    for (table, row_id), (first, last, seq) in sorted(ops.items(), key=lambda item: item[1][2]):
+        row = current.get(table, {}).get(row_id)
+        if last == "delete" or row is None:
+            if first == "insert":
+                continue  # created and removed within the window: the client never saw it
+            changes.append({"table": table, "op": "delete", "id": row_id})
+        else:
+            changes.append({"table": table, "op": "insert" if first == "insert" else "update",
+                            "id": row_id, "row": row})
+    return {"changes": changes, "next": encode_token(last_position), "more": more}
+
+
+def compact(db, retention_days=CHANGE_LOG_RETENTION_DAYS):
+    """
+    Deletes settled entries older than `retention_days` (and any before them)
+    and raises the watermark. Returns rows removed.
+    """
+    seconds = int(retention_days * 86400)
+    if dialect(db) == "postgres":
+        cutoff, param = "CURRENT_TIMESTAMP - %s * INTERVAL '1 second'", seconds
+    else:
+        cutoff, param = "datetime('now', %s)", f"-{seconds} seconds"
+    row = fetch_one(
+        db,
+        f"SELECT txid, seq FROM change_log WHERE changed_at < {cutoff} AND {_settled(db)} "
+        "ORDER BY txid DESC, seq DESC LIMIT 1",
+        (param,)
+    )
+    if row is None:
+        return 0
+    mark = position(row)
+    execute(
+        db,
+        "UPDATE change_log_state SET watermark_txid = %s, watermark = %s "
+        "WHERE id = 1 AND (watermark_txid, watermark) < (%s, %s)",
+        mark + mark
+    )
+    removed = execute(db, "DELETE FROM change_log WHERE (txid, seq) <= (%s, %s)", mark).rowcount
+    db.commit()
+    return removed
+
+
+_compactor_pid = None
+
+
+def _compact_loop():
+    while True:
+        time.sleep(CHANGE_LOG_COMPACT_INTERVAL)
+        try:
+            removed = writer.run(compact)
+            if removed:
+                print(f"🔹 Change log compacted: {removed} entries older than {CHANGE_LOG_RETENTION_DAYS:g} days")
+        except Exception as e:
+            print(f"❌ Change log compaction failed: {e}")
+
+
+def ensure_compactor():
+    # Started lazily in each worker: a thread started in the master doesn't survive fork
+    global _compactor_pid
+    if CHANGE_LOG_COMPACT_INTERVAL > 0 and _compactor_pid != os.getpid():
+        _compactor_pid = os.getpid()
+        threading.Thread(target=_compact_loop, name="change-log-compact", daemon=True).start()
+
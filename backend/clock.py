@@ -0,0 +1,28 @@
+# clock.py
+#
+# Times of day are stored as minutes since midnight (migration 0005) and
+# exchanged with clients as zero-padded "HH:MM". These are the two conversions.
+
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+
+def to_minutes(value):
+    """'9:05', '09:05', '09:05:00' or 545 -> 545. Raises ValueError for anything else."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        total = value
+    else:
+        parts = str(value).strip().split(":")
+        if len(parts) not in (2, 3):
+            raise ValueError(f"Invalid time '{value}', expected HH:MM.")
+        hours, minutes = int(parts[0]), int(parts[1])
+        if not (0 <= hours <= 24 and 0 <= minutes < 60):
+            raise ValueError(f"Invalid time '{value}', expected HH:MM.")
+        total = hours * 60 + minutes
+    if not 0 <= total <= 24 * 60:
+        raise ValueError(f"Invalid time '{value}', expected HH:MM.")
+    return total
+
+
+def format_minutes(total):
+    """Minutes since midnight -> 'HH:MM'."""
+    return f"{total // 60:02d}:{total % 60:02d}"
@@ -4,3 +4,90 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_PATH = os.getenv("DATABASE_URL", "sqlite:///tennis_club.db")
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "d2df9688ef44d41a0ba41...")
+
+# Connection pool settings (see database.py)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))                    # max open Postgres connections per process
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))             # seconds to wait for a free connection
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))  # recycle connections older than this
+DB_POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "30"))      # ping connections idle longer than this
+
+# Password hashing (see hashing.py)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))                 # work factor for new hashes; older ones are rehashed on login
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(os.cpu_count() or 1)))  # 0 = hash inline in the request thread
+BCRYPT_QUEUE_SIZE = int(os.getenv("BCRYPT_QUEUE_SIZE", "32"))         # hashes allowed to wait for a worker
+BCRYPT_TIMEOUT = float(os.getenv("BCRYPT_TIMEOUT", "10"))             # seconds before a queued hash gives up
+
+# Principal cache (see auth.py)
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "4096"))           # users kept in the role cache
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))             # seconds before a cached role is re-read
+
+# HTTP response cache (see counters.py / http_cache.py)
+CHANGE_COUNTER_PATH = os.getenv("CHANGE_COUNTER_PATH", "")             # counter file shared by the host's workers (one host only); required on Postgres
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "512"))
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Weekly availability bitmaps (see weekmap.py)
+AVAILABILITY_CACHE_SIZE = int(os.getenv("AVAILABILITY_CACHE_SIZE", "4096"))  # coaches kept in memory
+
+# Metrics (see metrics.py)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in {"1", "true", "yes"}  # serve GET /metrics
+METRICS_DIR = os.getenv("METRICS_DIR", "")                            # shared dir to merge every worker's metrics
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))  # seconds between per-worker writes
+
+# SQL profiler (see profiler.py)
+SQL_PROFILE = os.getenv("SQL_PROFILE", "0").lower() in {"1", "true", "yes"}  # record every statement per request
+SQL_SLOW_MS = float(os.getenv("SQL_SLOW_MS", "100"))                  # log statements slower than this
+SQL_EXPLAIN = os.getenv("SQL_EXPLAIN", "0").lower() in {"1", "true", "yes"}  # attach EXPLAIN plans to slow SELECTs
+SQL_N_PLUS_ONE = int(os.getenv("SQL_N_PLUS_ONE", "3"))                # same fingerprint this often in one request = N+1
+SQL_PROFILE_WINDOW = int(os.getenv("SQL_PROFILE_WINDOW", "500"))       # requests kept for the rolling report
+
+# SQLite production profile (see database.py / writer.py), for single-node deployments
+SQLITE_PRODUCTION = os.getenv("SQLITE_PRODUCTION", "0").lower() in {"1", "true", "yes"}  # WAL + tuned pragmas
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))   # wait this long for a lock before "database is locked"
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes of the file read through mmap
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))      # page cache per connection
+SQLITE_CHECKPOINT_INTERVAL = float(os.getenv("SQLITE_CHECKPOINT_INTERVAL", "30"))  # seconds between WAL checkpoints
+SQLITE_CHECKPOINT_TRUNCATE_PAGES = int(os.getenv("SQLITE_CHECKPOINT_TRUNCATE_PAGES", "10000"))  # truncate the WAL past this size
+SQLITE_SINGLE_WRITER = os.getenv("SQLITE_SINGLE_WRITER", "1" if SQLITE_PRODUCTION else "0").lower() in {"1", "true", "yes"}
+SQLITE_WRITE_QUEUE_SIZE = int(os.getenv("SQLITE_WRITE_QUEUE_SIZE", "256"))  # writes allowed to wait for the writer thread
+SQLITE_WRITE_TIMEOUT = float(os.getenv("SQLITE_WRITE_TIMEOUT", "5"))        # seconds to wait for a queue slot
+
+# Change log / delta sync (see changelog.py)
+CHANGE_LOG_RETENTION_DAYS = float(os.getenv("CHANGE_LOG_RETENTION_DAYS", "30"))  # older entries are compacted; older tokens get 410
+CHANGE_LOG_COMPACT_INTERVAL = float(os.getenv("CHANGE_LOG_COMPACT_INTERVAL", "3600"))  # seconds between compactions per worker (0 = off)
+SYNC_MAX_CHANGES = int(os.getenv("SYNC_MAX_CHANGES", "1000"))             # log entries per /sync reply; "more" says there are others
+
+# Server-sent events (see events.py)
+EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", "1"))    # seconds between change-log reads while anyone listens
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))          # seconds between keep-alive comments on idle streams
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))         # undelivered events per connection before "resync"
+# open streams per worker; under gthread each holds a request thread, so half of them by default
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv(
+    "EVENTS_MAX_SUBSCRIBERS",
+    "10000" if os.getenv("GUNICORN_WORKER_CLASS") == "gevent" else str(max(int(os.getenv("GUNICORN_THREADS", "4")) // 2, 1))
+))
+
+# Rate limiting (see ratelimit.py); limits are "<n>/second|minute|hour|day" or "off"
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1").lower() in {"1", "true", "yes"}
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "memory")             # memory (per process) | sqlite (shared by the host's workers)
+RATE_LIMIT_PATH = os.getenv("RATE_LIMIT_PATH", "")                     # sqlite store file; default is per-database in the temp dir
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))  # memory store: least recently seen keys are dropped
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "0"))  # proxies whose X-Forwarded-For is believed
+RATE_LIMIT_LIST = os.getenv("RATE_LIMIT_LIST", "120/minute")           # per caller on each list endpoint (cache misses only)
+RATE_LIMIT_ROUTES = os.getenv("RATE_LIMIT_ROUTES", "")                 # per-endpoint overrides: "search_slots=30/minute,get_all_players=off"
+LOGIN_LIMIT_IP = os.getenv("LOGIN_LIMIT_IP", "20/minute")              # login attempts per client address
+LOGIN_LIMIT_USER = os.getenv("LOGIN_LIMIT_USER", "10/minute")          # login attempts per user_id
+LOGIN_FREE_FAILURES = int(os.getenv("LOGIN_FREE_FAILURES", "5"))       # wrong passwords for a user from one address before backoff starts
+LOGIN_IP_FREE_FAILURES = int(os.getenv("LOGIN_IP_FREE_FAILURES", "20"))  # failures from one address before backoff starts
+LOGIN_BACKOFF_BASE = float(os.getenv("LOGIN_BACKOFF_BASE", "1"))       # seconds of the first backoff; doubles per failure
+LOGIN_BACKOFF_MAX = float(os.getenv("LOGIN_BACKOFF_MAX", "900"))       # longest backoff
+LOGIN_FAILURE_WINDOW = float(os.getenv("LOGIN_FAILURE_WINDOW", "900"))  # failures older than this (since the last) are forgotten
+
+# Announcements (see announcements.py)
+ANNOUNCEMENT_BATCH_SIZE = int(os.getenv("ANNOUNCEMENT_BATCH_SIZE", "500"))        # inbox rows written per fan-out transaction
+ANNOUNCEMENT_POLL_INTERVAL = float(os.getenv("ANNOUNCEMENT_POLL_INTERVAL", "30"))  # seconds between checks for undelivered posts
+
+# Bulk lesson cancellation (see cancellation.py)
+BULK_CANCEL_MAX_DAYS = int(os.getenv("BULK_CANCEL_MAX_DAYS", "7"))          # longest date window one request may cancel
+BULK_CANCEL_MAX_LESSONS = int(os.getenv("BULK_CANCEL_MAX_LESSONS", "5000"))  # more lessons than this in the window: refused
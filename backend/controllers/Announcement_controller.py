@@ -0,0 +1,131 @@
+from models.Announcement import Announcement, AUDIENCES
+from database import get_db_connection
+from query import fetch_all, fetch_one
+import writer
+from announcements import fanout
+from flask import jsonify
+from serializers import json_response
+from auth import current_principal
+
+
+class AnnouncementController:
+    @staticmethod
+    def _check_audience(db, principal, audience, team_ids, coach_id):
+        """(error message, status) if `principal` may not post to this audience, else None."""
+        if audience not in AUDIENCES:
+            return "Invalid audience. Must be 'club', 'teams' or 'players'.", 400
+        if audience == "teams":
+            if not team_ids:
+                return "team_ids is required for audience 'teams'.", 400
+            placeholders = ", ".join(["%s"] * len(team_ids))
+            rows = fetch_all(db, f"SELECT id, coach_id FROM teams WHERE id IN ({placeholders})", tuple(team_ids))
+            if len(rows) != len(team_ids):
+                return "Team not found.", 404
+            if principal.role == "coach" and any(row["coach_id"] != principal.id for row in rows):
+                return "Unauthorized. Coaches can only post to their own teams.", 403
+        if audience == "players":
+            row = fetch_one(db, "SELECT role FROM users WHERE id = %s", (coach_id,))
+            if row is None or row["role"] != "coach":
+                return "coach_id must be a coach.", 400
+        return None
+
+    @staticmethod
+    def create_announcement(title, content, important=False, audience="club", team_ids=None, coach_id=None):
+        principal = current_principal()
+        if principal is None or principal.role not in ("admin", "coach"):
+            return jsonify({"error": "Unauthorized. Only admins and coaches can post announcements."}), 403
+        if principal.role == "coach":
+            coach_id = principal.id  # a coach posts to their own players
+        try:
+            team_ids = sorted({int(team_id) for team_id in team_ids or ()})
+            coach_id = int(coach_id) if coach_id is not None else None
+        except (TypeError, ValueError):
+            return jsonify({"error": "team_ids and coach_id must be integers."}), 400
+        if len(title) > 255:
+            return jsonify({"error": "Title must be at most 255 characters."}), 400
+
+        db = get_db_connection()
+        error = AnnouncementController._check_audience(db, principal, audience, team_ids, coach_id)
+        db.close()
+        if error:
+            return jsonify({"error": error[0]}), error[1]
+
+        announcement = Announcement(
+            id=None, author_id=principal.id, title=title, content=content, important=bool(important),
+            audience=audience, coach_id=coach_id if audience == "players" else None,
+            team_ids=tuple(team_ids) if audience == "teams" else ()
+        )
+        writer.run(announcement.save)
+        fanout.wake()
+        return jsonify({"message": "Announcement posted; delivery is in progress.",
+                        "announcement": announcement.to_dict()}), 202
+
+    @staticmethod
+    def get_inbox(page=None):
+        principal = current_principal()
+        if principal is None:
+            return jsonify({"error": "User not found"}), 404
+        fanout.ensure_running()
+        db = get_db_connection()
+        announcements = Announcement.get_inbox(db, principal.id, page)
+        db.close()
+        return json_response(announcements)
+
+    @staticmethod
+    def unread_count():
+        principal = current_principal()
+        if principal is None:
+            return jsonify({"error": "User not found"}), 404
+        db = get_db_connection()
+        unread = Announcement.unread_count(db, principal.id)
+        db.close()
+        return jsonify({"unread": unread}), 200
+
+    @staticmethod
+    def get_announcement(announcement_id):
+        principal = current_principal()
+        if principal is None:
+            return jsonify({"error": "User not found"}), 404
+        db = get_db_connection()
+        announcement = Announcement.find(db, announcement_id)
+        if announcement and (principal.role == "admin" or announcement["author_id"] == principal.id):
+            body = announcement  # with delivery progress
+        else:
+            body = Announcement.get_inbox_entry(db, principal.id, announcement_id)
+        db.close()
+        if body is None:
+            return jsonify({"error": "Announcement not found."}), 404
+        return json_response(body)
+
+    @staticmethod
+    def mark_read(announcement_id):
+        principal = current_principal()
+        if principal is None:
+            return jsonify({"error": "User not found"}), 404
+        if not writer.run(Announcement.mark_read, principal.id, announcement_id):
+            return jsonify({"error": "No unread announcement with this id in your inbox."}), 404
+        return jsonify({"message": "Announcement marked as read."}), 200
+
+    @staticmethod
+    def mark_all_read():
+        principal = current_principal()
+        if principal is None:
+            return jsonify({"error": "User not found"}), 404
+        marked = writer.run(Announcement.mark_all_read, principal.id)
+        return jsonify({"message": "All announcements marked as read.", "marked": marked}), 200
+
+    @staticmethod
+    def delete_announcement(announcement_id):
+        principal = current_principal()
+        if principal is None:
+            return jsonify({"error": "User not found"}), 404
+        db = get_db_connection()
+        announcement = Announcement.find(db, announcement_id)
+        db.close()
+        if announcement is None:
+            return jsonify({"error": "Announcement not found."}), 404
+        if principal.role != "admin" and announcement["author_id"] != principal.id:
+            return jsonify({"error": "Unauthorized. Only the author or an admin can delete an announcement."}), 403
+        if not writer.run(Announcement.delete, announcement_id):
+            return jsonify({"error": "Announcement not found."}), 404
+        return jsonify({"message": "Announcement deleted."}), 200
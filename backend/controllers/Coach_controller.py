@@ -1,20 +1,28 @@
 from models.CoachAvail import CoachAvailability
-from models.Users import User
 from database import get_db_connection
+import writer
+import booking
+import availability
+from query import fetch_one
 import sqlite3  # you may want to remove or replace with psycopg2 if purely on Postgres
 from flask import jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from serializers import json_response
+from auth import current_principal
+from counters import bump
 
 class CoachAvailabilityController:
     @staticmethod
-    @jwt_required()
     def add_availability(coach_id, day, start_time, end_time):
-        db = get_db_connection()
-        logged_in_id = get_jwt_identity()
-        user = User.find_by_id(db, logged_in_id)
+        user = current_principal()
         if not user or user.role != "coach":
-            db.close()
             return jsonify({"error": "Unauthorized. Only coaches can add availability."}), 403
+        # Times are stored as minutes since midnight
+        try:
+            start_time, end_time = booking.parse_time(start_time), booking.parse_time(end_time)
+        except booking.BookingError as e:
+            return jsonify({"error": e.message}), 400
+        if day not in booking.DAYS or start_time >= end_time:
+            return jsonify({"error": "Invalid day or time range."}), 400
         # Use the provided coach_id or ensure that logged-in coach matches
         availability = CoachAvailability(
             id=None,
@@ -24,38 +32,61 @@ class CoachAvailabilityController:
             end_time=end_time
         )
         try:
-            availability.save(db)
+            writer.run(availability.save)
         except sqlite3.IntegrityError as e:
             # If you're on Postgres, you might want to catch a psycopg2 error instead.
-            db.close()
             return jsonify({"error": "Failed to add availability: " + str(e)}), 400
-        db.close()
+        bump("coach_availability")
         return jsonify({"message": "Availability added successfully."}), 201
 
+    @staticmethod
+    def apply_template(coach_id, entries, mode):
+        """Coaches apply a weekly template to their own availability; admins to any coach's."""
+        user = current_principal()
+        if not user or user.role not in {"coach", "admin"}:
+            return jsonify({"error": "Unauthorized. Only coaches can set availability."}), 403
+        if user.role == "coach":
+            coach_id = user.id
+        elif not coach_id:
+            return jsonify({"error": "coach_id is required."}), 400
+        try:
+            windows = availability.parse_template(entries)
+        except booking.BookingError as e:
+            return jsonify({"error": e.message}), e.status
+        try:
+            result = writer.run(availability.apply_template, coach_id, windows, mode)
+        except booking.BookingError as e:
+            return jsonify({"error": e.message}), e.status
+        if result["inserted"] or result["deleted"]:
+            bump("coach_availability")
+        return jsonify({"message": "Availability template applied.", **result}), 200
+
     @staticmethod
     def get_availability(coach_id):
         db = get_db_connection()
         avail = CoachAvailability.get_availability(db, coach_id)
         db.close()
-        return jsonify(avail), 200
+        return json_response(avail)
 
     @staticmethod
-    @jwt_required()
     def update_availability(availability_id, day, start_time, end_time):
-        db = get_db_connection()
-        logged_in_id = get_jwt_identity()
-        user = User.find_by_id(db, logged_in_id)
+        user = current_principal()
         if not user or user.role != "coach":
-            db.close()
             return jsonify({"error": "Unauthorized. Only coaches can update availability."}), 403
+        logged_in_id = user.id
+        try:
+            start_time, end_time = booking.parse_time(start_time), booking.parse_time(end_time)
+        except booking.BookingError as e:
+            return jsonify({"error": e.message}), 400
+        if day not in booking.DAYS or start_time >= end_time:
+            return jsonify({"error": "Invalid day or time range."}), 400
+        db = get_db_connection()
 
-        # Replaced the "?" with "%s" here:
-        cursor = db.cursor()
-        cursor.execute(
+        row = fetch_one(
+            db,
             "SELECT id, coach_id, day, start_time, end_time FROM coach_availability WHERE id = %s",
             (availability_id,)
         )
-        row = cursor.fetchone()
         if not row:
             db.close()
             return jsonify({"error": "Availability record not found."}), 404
@@ -70,4 +101,5 @@ class CoachAvailabilityController:
         availability.end_time = end_time
         availability.update(db)
         db.close()
+        bump("coach_availability")
         return jsonify({"message": "Availability updated successfully."}), 200
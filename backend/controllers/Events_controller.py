@@ -0,0 +1,43 @@
+from database import get_db_connection, detach_connection
+from flask import jsonify, Response
+import events
+import changelog
+from auth import current_principal
+
+
+class EventsController:
+    @staticmethod
+    def subscribe(topics):
+        principal = current_principal()
+        if principal is None:
+            return jsonify({"error": "User not found"}), 404
+        invalid = [topic for topic in topics if not events.TOPIC_RE.match(topic)]
+        if invalid:
+            return jsonify({"error": "Unknown topics: " + ", ".join(invalid)}), 400
+
+        db = get_db_connection()
+        subscriber = None
+        try:
+            topics = list(dict.fromkeys(topics)) or events.default_topics(db, principal)
+            denied = events.forbidden_topics(db, principal, topics)
+            if denied:
+                return jsonify({"error": "Not allowed to subscribe to: " + ", ".join(denied)}), 403
+            # Subscribe before reading the head, so nothing after it can be missed
+            subscriber = events.hub.subscribe(topics)
+            head = changelog.head(db)
+            events.bridge.ensure_running(head)
+        except Exception:
+            if subscriber is not None:
+                events.hub.unsubscribe(subscriber)
+            raise
+        finally:
+            db.close()
+            detach_connection()
+        response = Response(
+            events.stream(subscriber, head),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        # The server closes the response even if the stream never started
+        response.call_on_close(lambda: events.hub.unsubscribe(subscriber))
+        return response
@@ -1,44 +1,98 @@
 from models.Lesson import Lesson
-from models.Users import User
 from database import get_db_connection
+import writer
+from streaming import stream_query
+import booking
+import cancellation
+from announcements import fanout
+import datetime
 from flask import jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from serializers import json_response
+from clock import format_minutes
+from auth import current_principal, has_role
+from counters import bump
 
 class LessonController:
     @staticmethod
-    @jwt_required()
     def book_lesson(coach_id, lesson_date, start_time, end_time):
-        db = get_db_connection()
-        user_id = get_jwt_identity()
-        player = User.find_by_id(db, user_id)
+        player = current_principal()
         if not player or player.role != "player":
-            db.close()
             return jsonify({"error": "Unauthorized. Only players can book lessons."}), 403
-        if Lesson.is_booked(db, coach_id, lesson_date, start_time):
-            db.close()
-            return jsonify({"error": "This time slot is already booked."}), 400
-        lesson = Lesson(
-            id=None,
-            player_id=user_id,
-            coach_id=coach_id,
-            lesson_date=lesson_date,
-            start_time=start_time,
-            end_time=end_time
+        try:
+            # Serialized through the single-writer queue when SQLite runs in production mode
+            lesson = writer.run(booking.book_lesson, player.id, coach_id, lesson_date, start_time, end_time)
+        except booking.BookingError as e:
+            return jsonify({"error": e.message}), e.status
+        bump("private_lessons")
+        return jsonify({"message": "Lesson booked successfully.", "lesson": lesson.to_dict()}), 201
+
+    @staticmethod
+    def _date_range(date_from, date_to, upcoming):
+        if upcoming:
+            today = datetime.date.today().isoformat()
+            date_from = max(date_from, today) if date_from else today
+        return (
+            booking.parse_date(date_from).isoformat() if date_from else None,
+            booking.parse_date(date_to).isoformat() if date_to else None,
         )
-        lesson.save(db)
+
+    @staticmethod
+    def get_player_lessons(player_id, date_from=None, date_to=None, upcoming=False, page=None, stream=False):
+        try:
+            date_from, date_to = LessonController._date_range(date_from, date_to, upcoming)
+        except booking.BookingError as e:
+            return jsonify({"error": e.message}), 400
+        if stream:
+            return stream_query(Lesson.iter_lessons, "player_id", player_id, date_from, date_to)
+        db = get_db_connection()
+        lessons = Lesson.get_player_lessons(db, player_id, date_from, date_to, page)
         db.close()
-        return jsonify({"message": "Lesson booked successfully."}), 201
+        return json_response(lessons)
 
     @staticmethod
-    def get_player_lessons(player_id):
+    def get_coach_lessons(coach_id, date_from=None, date_to=None, upcoming=False, page=None, stream=False):
+        try:
+            date_from, date_to = LessonController._date_range(date_from, date_to, upcoming)
+        except booking.BookingError as e:
+            return jsonify({"error": e.message}), 400
+        if stream:
+            return stream_query(Lesson.iter_lessons, "coach_id", coach_id, date_from, date_to)
         db = get_db_connection()
-        lessons = Lesson.get_player_lessons(db, player_id)
+        lessons = Lesson.get_coach_lessons(db, coach_id, date_from, date_to, page)
         db.close()
-        return jsonify(lessons), 200
+        return json_response(lessons)
+
+    @staticmethod
+    def cancel_bulk(date_from, date_to=None, start_time=None, end_time=None, coach_id=None,
+                    reason="weather", dry_run=False):
+        principal = current_principal()
+        if principal is None or principal.role != "admin":
+            return jsonify({"error": "Unauthorized. Only admin can cancel lessons in bulk."}), 403
+        try:
+            window = cancellation.parse_window(date_from, date_to, start_time, end_time)
+            result = writer.run(cancellation.cancel_lessons, principal.id, *window,
+                                coach_id=coach_id, reason=reason, dry_run=dry_run)
+        except booking.BookingError as e:
+            return jsonify({"error": e.message}), e.status
+        if result["cancellation_id"] is not None:
+            bump("private_lessons")
+            fanout.wake()  # notifies the players and coaches
+        first, last, start, end = window
+        return jsonify({
+            "message": "Dry run: nothing was cancelled." if dry_run else f"{result['lessons']} lessons cancelled.",
+            "dry_run": dry_run,
+            "window": {"date_from": first.isoformat(), "date_to": last.isoformat(),
+                       "start_time": format_minutes(start), "end_time": format_minutes(end), "coach_id": coach_id},
+            **result
+        }), 200
 
     @staticmethod
-    def get_coach_lessons(coach_id):
+    def get_refunds(status=None, cancellation_id=None, page=None):
+        if not has_role("admin"):
+            return jsonify({"error": "Unauthorized. Only admin can view refunds."}), 403
+        if status is not None and status not in cancellation.REFUND_STATUSES:
+            return jsonify({"error": "status must be 'pending' or 'settled'."}), 400
         db = get_db_connection()
-        lessons = Lesson.get_coach_lessons(db, coach_id)
+        refunds = cancellation.get_refunds(db, status, cancellation_id, page)
         db.close()
-        return jsonify(lessons), 200
+        return json_response(refunds)
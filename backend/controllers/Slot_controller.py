@@ -0,0 +1,27 @@
+from database import get_db_connection
+from flask import jsonify
+import booking
+import slots
+
+
+class SlotController:
+    @staticmethod
+    def search(start_date, end_date, duration, coach_ids, step, limit):
+        try:
+            start = booking.parse_date(start_date)
+            end = booking.parse_date(end_date) if end_date else start
+        except booking.BookingError as e:
+            return jsonify({"error": e.message}), 400
+        if end < start or (end - start).days >= slots.MAX_RANGE_DAYS:
+            return jsonify({"error": f"Date range must be 1 to {slots.MAX_RANGE_DAYS} days."}), 400
+        if not 15 <= duration <= 8 * 60 or not 5 <= step <= 120:
+            return jsonify({"error": "Invalid duration or step."}), 400
+        if not 1 <= limit <= slots.MAX_LIMIT:
+            return jsonify({"error": f"limit must be 1 to {slots.MAX_LIMIT}."}), 400
+
+        db = get_db_connection()
+        found, truncated = slots.find_open_slots(
+            db, start, end, duration, coach_ids=coach_ids, step=step, limit=limit
+        )
+        db.close()
+        return jsonify({"slots": found, "count": len(found), "truncated": truncated}), 200
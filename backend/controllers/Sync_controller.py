@@ -0,0 +1,39 @@
+from database import get_db_connection
+from flask import jsonify
+import changelog
+import writer
+from auth import current_principal, has_role
+from serializers import json_response
+
+
+class SyncController:
+    @staticmethod
+    def sync(token=None):
+        principal = current_principal()
+        if principal is None:
+            return jsonify({"error": "User not found"}), 404
+        changelog.ensure_compactor()
+        db = get_db_connection()
+        try:
+            if token is None:
+                # First sync: load the lists, then sync from this token
+                body = {"changes": [], "next": changelog.encode_token(changelog.head(db)),
+                        "more": False, "full_resync": True}
+            else:
+                body = changelog.changes_since(db, principal, changelog.decode_token(token))
+        except changelog.ResyncRequired as e:
+            return jsonify({"error": str(e), "full_resync": True,
+                            "next": changelog.encode_token(e.head)}), 410
+        finally:
+            db.close()
+        return json_response(body)
+
+    @staticmethod
+    def compact(retention_days=None):
+        if not has_role("admin"):
+            return jsonify({"error": "Unauthorized. Only admin can compact the change log."}), 403
+        if retention_days is None:
+            removed = writer.run(changelog.compact)
+        else:
+            removed = writer.run(changelog.compact, retention_days)
+        return jsonify({"message": "Change log compacted.", "removed": removed}), 200
@@ -1,20 +1,19 @@
 from models.Team import Team
-from models.Users import User
 from database import get_db_connection
+from streaming import stream_query
 import sqlite3  # might remove if purely on Postgres
-from flask import jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import jsonify, Response
+import json
+from serializers import json_response
+from auth import has_role
+from counters import bump
 
 class TeamController:
     @staticmethod
-    @jwt_required()
     def create_team(team_name, coach_id):
-        db = get_db_connection()
-        admin_id = get_jwt_identity()
-        admin_user = User.find_by_id(db, admin_id)
-        if not admin_user or admin_user.role != "admin":
-            db.close()
+        if not has_role("admin"):
             return jsonify({"error": "Unauthorized. Only admin can create teams."}), 403
+        db = get_db_connection()
         team = Team(id=None, team_name=team_name, coach_id=coach_id)
         try:
             team.save(db)
@@ -22,56 +21,63 @@ class TeamController:
             db.close()
             return jsonify({"error": "Team creation failed: " + str(e)}), 400
         db.close()
+        bump("teams")
         return jsonify({"message": f"Team '{team_name}' created successfully."}), 201
 
     @staticmethod
-    @jwt_required()
-    def get_all_teams():
+    def stream_teams():
+        return stream_query(Team.iter_teams)
+
+    @staticmethod
+    def get_all_teams_with_players(page=None):
         db = get_db_connection()
-        teams = Team.get_all_teams(db)
-        if not teams:
-            db.close()
-            return jsonify({"error": "No teams found"}), 404
+        teams = Team.get_teams_with_players(db, page=page)
         db.close()
-        return jsonify(teams), 200
+        if page is None:
+            if not teams:
+                return jsonify({"error": "No teams found"}), 404
+            body = "[" + ",".join(teams) + "]"
+        else:
+            body = '{"items":[%s],"next_cursor":%s,"limit":%d}' % (
+                ",".join(teams.items), json.dumps(teams.next_cursor), teams.limit
+            )
+        return Response(body, status=200, mimetype="application/json")
 
     @staticmethod
-    @jwt_required()
-    def get_team(team_id):
+    def get_all_teams(page=None):
         db = get_db_connection()
-        team = Team.get_team(db, team_id)
-        
-        if team is None:
-            db.close()
-            return jsonify({"error": "Team not found"}), 404
-
-        # Fetch players
-        players_data = Team.get_team_players(db, team_id)
-        team["players"] = players_data["players"]
-        team["player_count"] = players_data["count"]
+        teams = Team.get_all_teams(db, page)
+        db.close()
+        if page is None and not teams:
+            return jsonify({"error": "No teams found"}), 404
+        return json_response(teams)
 
+    @staticmethod
+    def get_team(team_id):
+        # Team, roster and count come back from one query
+        db = get_db_connection()
+        teams = Team.get_teams_with_players(db, team_id=team_id)
         db.close()
-        return jsonify(team), 200
+
+        if not teams:
+            return jsonify({"error": "Team not found"}), 404
+        return Response(teams[0], status=200, mimetype="application/json")
 
     @staticmethod
-    @jwt_required()
     def assign_player_to_team(team_id, player_id):
-        db = get_db_connection()
-        admin_id = get_jwt_identity()
-        admin_user = User.find_by_id(db, admin_id)
-        if not admin_user or admin_user.role != "admin":
-            db.close()
+        if not has_role("admin"):
             return jsonify({"error": "Unauthorized. Only admin can assign players."}), 403
+        db = get_db_connection()
         try:
             Team.assign_player(db, team_id, player_id)
         except sqlite3.IntegrityError:
             db.close()
             return jsonify({"error": "Player already assigned to this team."}), 400
         db.close()
+        bump("team_members")
         return jsonify({"message": "Player successfully assigned to team."}), 200
 
     @staticmethod
-    @jwt_required()
     def get_team_players(team_id):
         db = get_db_connection()
         players = Team.get_team_players(db, team_id)
@@ -79,31 +85,25 @@ class TeamController:
         return jsonify(players), 200
 
     @staticmethod
-    @jwt_required()
     def remove_player_from_team(team_id, player_id):
-        db = get_db_connection()
-        admin_id = get_jwt_identity()
-        admin_user = User.find_by_id(db, admin_id)
-        if not admin_user or admin_user.role != "admin":
-            db.close()
+        if not has_role("admin"):
             return jsonify({"error": "Unauthorized. Only admin can remove players."}), 403
+        db = get_db_connection()
         Team.remove_player(db, team_id, player_id)
         db.close()
+        bump("team_members")
         return jsonify({"message": "Player successfully removed from team."}), 200
 
     @staticmethod
-    @jwt_required()
     def delete_team(team_id):
-        db = get_db_connection()
-        admin_id = get_jwt_identity()
-        admin_user = User.find_by_id(db, admin_id)
-
-        if not admin_user or admin_user.role != "admin":
-            db.close()
+        if not has_role("admin"):
             return jsonify({"error": "Unauthorized. Only admin can delete teams."}), 403
 
+        db = get_db_connection()
         success = Team.delete_team(db, team_id)
         db.close()
+        if success:
+            bump("teams", "team_members")
 
         if success:
             return jsonify({"message": f"Team {team_id} deleted successfully."}), 200
@@ -1,21 +1,22 @@
 from models.Users import User
 from database import get_db_connection
+from streaming import stream_query
+from hashing import hash_password
+import time
 from flask import jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from serializers import json_response
+from auth import has_role, current_principal
+from counters import bump
+from ratelimit import limiter
 
 class UserController:
     @staticmethod
-    @jwt_required()
     def register_user(first_name, last_name, password, role):
-        db = get_db_connection()
-        admin_id = get_jwt_identity()
-        admin_user = User.find_by_id(db, admin_id)
-        if not admin_user or admin_user.role != "admin":
-            db.close()
+        if not has_role("admin"):
             return jsonify({"error": "Unauthorized. Only admin can register users."}), 403
         if role not in {"coach", "player"}:
-            db.close()
             return jsonify({"error": "Invalid role. Must be 'coach' or 'player'."}), 400
+        db = get_db_connection()
         if User.find_by_name(db, first_name, last_name):
             db.close()
             return jsonify({"error": "User already exists."}), 400
@@ -28,54 +29,128 @@ class UserController:
         )
         user.save(db)
         db.close()
+        bump("users")
         return jsonify({"message": f"User {first_name} {last_name} added successfully as a {role}."}), 201
 
+    MAX_IMPORT_ROWS = 5000
+
+    @staticmethod
+    def import_users(rows):
+        """
+        Bulk registration. `rows` are dicts with first_name, last_name, password, role.
+        Returns a per-row result (created / duplicate / invalid) and the import throughput.
+        """
+        if not has_role("admin"):
+            return jsonify({"error": "Unauthorized. Only admin can import users."}), 403
+        if len(rows) > UserController.MAX_IMPORT_ROWS:
+            return jsonify({"error": f"At most {UserController.MAX_IMPORT_ROWS} users per import."}), 400
+
+        started = time.perf_counter()
+        results = []
+        candidates = {}  # (first_name, last_name) -> (row index, User)
+        for index, row in enumerate(rows):
+            first_name = str(row.get("first_name") or "").strip()
+            last_name = str(row.get("last_name") or "").strip()
+            password = str(row.get("password") or "")
+            role = str(row.get("role") or "").strip().lower()
+            result = {"row": index, "first_name": first_name, "last_name": last_name}
+            results.append(result)
+            if not first_name or not last_name or not password:
+                result.update(status="invalid", error="Missing required fields")
+            elif role not in {"coach", "player"}:
+                result.update(status="invalid", error="Invalid role. Must be 'coach' or 'player'.")
+            elif (first_name, last_name) in candidates:
+                result.update(status="duplicate", error="Repeated in this import")
+            else:
+                candidates[(first_name, last_name)] = (index, User(
+                    id=None, first_name=first_name, last_name=last_name, password=password, role=role
+                ))
+
+        db = get_db_connection()
+        existing = User.find_ids_by_names(db, list(candidates))
+        db.close()
+        for name in existing:
+            index, _ = candidates.pop(name)
+            results[index].update(status="duplicate", error="User already exists.")
+        created = {}
+        if candidates:
+            # bcrypt first, so no connection is held while the pool works through the import
+            users = [user for _, user in candidates.values()]
+            User.hash_passwords(users)
+            db = get_db_connection()
+            created = User.bulk_create(db, users)
+            db.close()
+        for name, (index, user) in candidates.items():
+            results[index].update(status="created", id=created.get(name), role=user.role)
+        if created:
+            bump("users")
+
+        elapsed = time.perf_counter() - started
+        summary = {status: sum(1 for r in results if r["status"] == status)
+                   for status in ("created", "duplicate", "invalid")}
+        return jsonify({
+            **summary,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "rows_per_second": round(len(rows) / elapsed, 1) if elapsed else None,
+            "results": results,
+        }), 200 if not summary["created"] else 201
+
     @staticmethod
-    def login_user(user_id, password):
+    def login_user(user_id, password, client_ip):
+        # Throttled before the user is loaded or bcrypt runs; raises RateLimited (429)
+        limiter.check_login(client_ip, user_id)
         db = get_db_connection()
         user = User.find_by_id(db, user_id)
         db.close()
         if not user or not user.verify_password(password):
+            limiter.login_failed(client_ip, user_id)
             return jsonify({"error": "Invalid user ID or password"}), 401
+        limiter.login_succeeded(client_ip, user_id)
+        if user.password_needs_rehash():
+            # Work factor changed since this hash was made: upgrade it transparently
+            new_hash = hash_password(password)
+            db = get_db_connection()
+            User.set_password_hash(db, user.id, new_hash)
+            db.close()
         token = user.generate_token()
         return jsonify({"message": "Login successful", "token": token, "role": user.role}), 200
 
     @staticmethod
-    @jwt_required()
     def get_client_details():
-        user_id = get_jwt_identity()
+        principal = current_principal()
+        if principal is None:
+            return jsonify({"error": "User not found"}), 404
         db = get_db_connection()
-        user = User.find_by_id(db, user_id)
+        user = User.find_by_id(db, principal.id)
         db.close()
         if user:
             return jsonify(user.to_dict()), 200
         return jsonify({"error": "User not found"}), 404
 
     @staticmethod
-    def get_all_players():
+    def stream_users(role):
+        return stream_query(User.iter_by_role, role)
+
+    @staticmethod
+    def get_all_players(page=None):
         db = get_db_connection()
-        players = User.get_all_players(db)
+        players = User.get_all_players(db, page)
         db.close()
-        return jsonify(players), 200
+        return json_response(players)
 
     @staticmethod
-    def get_all_coaches():
+    def get_all_coaches(page=None):
         db = get_db_connection()
-        coaches = User.get_all_coaches(db)
+        coaches = User.get_all_coaches(db, page)
         db.close()
-        return jsonify(coaches), 200
+        return json_response(coaches)
     
     @staticmethod
-    @jwt_required()
     def update_user(user_id, new_id, new_password):
-        db = get_db_connection()
-        admin_id = get_jwt_identity()
-        admin_user = User.find_by_id(db, admin_id)
-
-        if not admin_user or admin_user.role != "admin":
-            db.close()
+        if not has_role("admin"):
             return jsonify({"error": "Unauthorized. Only admin can update users."}), 403
 
+        db = get_db_connection()
         user = User.find_by_id(db, user_id)
         if not user:
             db.close()
@@ -83,24 +158,24 @@ class UserController:
         
         success = User.update(db, user_id, new_id=new_id, new_password=new_password)
         db.close()
+        # An id change moves the user under every table that references it
+        bump("users", "teams", "team_members", "coach_availability", "private_lessons")
         if success:
             return jsonify({"message": f"User {user_id} updated successfully."}), 200
         else:
             return jsonify({"error": "Failed to update user."}), 500
 
     @staticmethod
-    @jwt_required()
     def delete_user(user_id):
-        db = get_db_connection()
-        admin_id = get_jwt_identity()
-        admin_user = User.find_by_id(db, admin_id)
-
-        if not admin_user or admin_user.role != "admin":
-            db.close()
+        if not has_role("admin"):
             return jsonify({"error": "Unauthorized. Only admin can delete users."}), 403
 
+        db = get_db_connection()
         success = User.delete(db, user_id)
         db.close()
+        if success:
+            # Foreign keys cascade into these tables
+            bump("users", "teams", "team_members", "coach_availability", "private_lessons")
 
         if success:
             return jsonify({"message": f"User {user_id} deleted successfully."}), 200
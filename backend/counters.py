@@ -0,0 +1,115 @@
+# counters.py
+#
+# Per-table change counters shared by every worker process on the host.
+# Writers call bump("teams", ...) after they commit; readers (ETags, caches)
+# compare versions without touching the database. The counters live in a
+# small mmap'd file: reads are plain memory loads, increments take a short
+# flock so concurrent workers never lose an update. Listeners added with
+# add_listener() hear about bumps made in this process.
+#
+# Single host only: a worker on another host has its own file and never sees
+# these bumps, so its ETags, principal cache and availability bitmaps would
+# go stale. On SQLite that's the database's own limit; on PostgreSQL init_db
+# refuses to start without CHANGE_COUNTER_PATH, so a deployment names the
+# file its processes share, and every process that writes to the database
+# must run on that host.
+
+import os
+import mmap
+import struct
+import hashlib
+import tempfile
+import threading
+from config import DATABASE_PATH, CHANGE_COUNTER_PATH
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: counters are per process only
+    fcntl = None
+
+TABLES = (
+    "users",
+    "teams",
+    "team_members",
+    "coach_availability",
+    "private_lessons",
+)
+_SLOT = struct.Struct("<q")
+_SLOTS = 64  # room for more tables without resizing the file; slot 0 is the file's epoch
+
+
+class ChangeCounters:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pid = None
+        self._mm = None
+        self._fd = None
+
+    def _map(self):
+        if self._mm is not None and self._pid == os.getpid():
+            return self._mm
+        with self._lock:
+            if self._mm is None or self._pid != os.getpid():
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                self._flock(fd, True)
+                try:
+                    if os.fstat(fd).st_size < _SLOT.size * _SLOTS:
+                        os.ftruncate(fd, _SLOT.size * _SLOTS)
+                        # A fresh epoch means old ETags can never match a recreated file
+                        os.pwrite(fd, _SLOT.pack(int.from_bytes(os.urandom(7), "little")), 0)
+                finally:
+                    self._flock(fd, False)
+                self._fd = fd
+                self._mm = mmap.mmap(fd, _SLOT.size * _SLOTS)
+                self._pid = os.getpid()
+        return self._mm
+
+    @staticmethod
+    def _flock(fd, exclusive):
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_UN)
+
+    def epoch(self):
+        return _SLOT.unpack_from(self._map(), 0)[0]
+
+    def version(self, table):
+        return _SLOT.unpack_from(self._map(), _SLOT.size * (TABLES.index(table) + 1))[0]
+
+    def versions(self, tables):
+        mm = self._map()
+        return tuple(_SLOT.unpack_from(mm, _SLOT.size * (TABLES.index(t) + 1))[0] for t in tables)
+
+    def bump(self, *tables):
+        mm = self._map()
+        with self._lock:
+            self._flock(self._fd, True)
+            try:
+                for table in tables:
+                    offset = _SLOT.size * (TABLES.index(table) + 1)
+                    _SLOT.pack_into(mm, offset, _SLOT.unpack_from(mm, offset)[0] + 1)
+            finally:
+                self._flock(self._fd, False)
+
+
+def _default_path():
+    digest = hashlib.sha1(DATABASE_PATH.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"tennis_club_counters_{digest}.bin")
+
+
+counters = ChangeCounters(CHANGE_COUNTER_PATH or _default_path())
+
+
+_listeners = []
+
+
+def add_listener(fn):
+    """Calls fn(tables) in the writing process after every bump (e.g. to push events sooner)."""
+    _listeners.append(fn)
+
+
+def bump(*tables):
+    """Marks tables as changed. Call after the write has been committed."""
+    counters.bump(*tables)
+    for fn in _listeners:
+        fn(tables)
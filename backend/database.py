@@ -1,98 +1,525 @@
 # database.py
 
 import os
+import time
+import weakref
+import threading
+import collections
+from contextlib import contextmanager
 import sqlite3  # for local dev fallback
 import psycopg2  # NEW OR CHANGED
 import psycopg2.extras  # NEW OR CHANGED
-from config import DATABASE_PATH
+import psycopg2.extensions
+from config import (
+    DATABASE_PATH, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_MAX_LIFETIME, DB_POOL_PING_AFTER,
+    SQLITE_PRODUCTION, SQLITE_BUSY_TIMEOUT_MS, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE_KB,
+    SQLITE_CHECKPOINT_INTERVAL, SQLITE_CHECKPOINT_TRUNCATE_PAGES, CHANGE_COUNTER_PATH
+)
+from metrics import metrics
 
-# Path to the schema file
-SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "..", "database", "schema.sql")
+def is_postgres():
+    return DATABASE_PATH.startswith("postgres://") or DATABASE_PATH.startswith("postgresql://")
 
 
-def get_db_connection():
+def sqlite_path():
+    return DATABASE_PATH.replace("sqlite:///", "")
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection became free within DB_POOL_TIMEOUT."""
+
+
+class PooledConnection:
     """
-    Returns a database connection.
-    If DATABASE_PATH starts with 'postgres' we use psycopg2, otherwise we fall back to SQLite.
+    Thin proxy around a raw psycopg2 / sqlite3 connection handed out by a pool.
+    Everything is forwarded to the real connection, except close(), which
+    returns the connection to its pool instead of closing it.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+
+    @property
+    def raw(self):
+        if self._released:
+            raise RuntimeError("Connection was already returned to the pool.")
+        return self._raw
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def __enter__(self):
+        self.raw.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self.raw.__exit__(exc_type, exc, tb)
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._raw)
+
+
+class _PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.timeouts = 0
+        self.opened = 0
+        self.recycled = 0
+        self.failed_health_checks = 0
+
+    def record_wait(self, waited):
+        metrics.observe("db_pool_acquire_seconds", waited)
+        self.checkouts += 1
+        self.wait_time_total += waited
+        if waited > self.wait_time_max:
+            self.wait_time_max = waited
+
+    def as_dict(self):
+        return {
+            "checkouts": self.checkouts,
+            "wait_time_total": round(self.wait_time_total, 6),
+            "wait_time_max": round(self.wait_time_max, 6),
+            "wait_time_avg": round(self.wait_time_total / self.checkouts, 6) if self.checkouts else 0.0,
+            "timeouts": self.timeouts,
+            "opened": self.opened,
+            "recycled": self.recycled,
+            "failed_health_checks": self.failed_health_checks,
+        }
+
+
+class PostgresPool:
+    """
+    Bounded psycopg2 pool. At most `size` connections are open at once;
+    callers wait up to `timeout` seconds for one to be returned.
+    Idle connections are pinged before reuse and recycled after `max_lifetime`.
     """
-    # NEW OR CHANGED
-    if DATABASE_PATH.startswith("postgres://") or DATABASE_PATH.startswith("postgresql://"):
+
+    def __init__(self, dsn, size, timeout, max_lifetime, ping_after):
+        self.dsn = dsn
+        self.size = size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self._cond = threading.Condition()
+        self._idle = collections.deque()  # (raw, created_at, returned_at)
+        self._born = {}                   # id(raw) -> created_at, for checked-out connections
+        self._open = 0
+        self.stats = _PoolStats()
+
+    def _connect(self):
+        # Render often requires sslmode='require' to connect
+        raw = psycopg2.connect(
+            self.dsn,
+            sslmode='require',
+            cursor_factory=psycopg2.extras.RealDictCursor
+        )
+        self.stats.opened += 1
+        return raw
+
+    def _healthy(self, raw, created_at, returned_at, now):
+        if raw.closed:
+            return False
+        if now - created_at > self.max_lifetime:
+            self.stats.recycled += 1
+            return False
+        if now - returned_at > self.ping_after:
+            try:
+                with raw.cursor() as cur:
+                    cur.execute("SELECT 1")
+                raw.rollback()
+            except psycopg2.Error:
+                self.stats.failed_health_checks += 1
+                return False
+        return True
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            with self._cond:
+                while not self._idle and self._open >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats.timeouts += 1
+                        raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                    self._cond.wait(remaining)
+                entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    self._open += 1
+
+            if entry is None:
+                try:
+                    raw = self._connect()
+                except Exception:
+                    self._discard(None)
+                    raise
+                created_at = time.monotonic()
+            else:
+                raw, created_at, returned_at = entry
+                if not self._healthy(raw, created_at, returned_at, time.monotonic()):
+                    self._discard(raw)
+                    continue
+
+            with self._cond:
+                self._born[id(raw)] = created_at
+                self.stats.record_wait(time.monotonic() - started)
+            return PooledConnection(self, raw)
+
+    def release(self, raw):
+        with self._cond:
+            created_at = self._born.pop(id(raw), time.monotonic())
+        if raw.closed:
+            self._discard(None)
+            return
         try:
-            # Render often requires sslmode='require' to connect
-            conn = psycopg2.connect(
-                DATABASE_PATH,
-                sslmode='require',
-                cursor_factory=psycopg2.extras.RealDictCursor
-            )
-            return conn
-        except Exception as e:
-            print(f"❌ Error connecting to PostgreSQL: {e}")
-            return None
-    else:
-        # Fallback to SQLite for local dev
-        DB_FILE_PATH = DATABASE_PATH.replace("sqlite:///", "")
+            if raw.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                raw.rollback()
+        except psycopg2.Error:
+            self._discard(raw)
+            return
+        now = time.monotonic()
+        if now - created_at > self.max_lifetime:
+            self.stats.recycled += 1
+            self._discard(raw)
+            return
+        with self._cond:
+            self._idle.append((raw, created_at, now))
+            self._cond.notify()
+
+    def _discard(self, raw):
+        if raw is not None and not raw.closed:
+            try:
+                raw.close()
+            except psycopg2.Error:
+                pass
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def detach(self):
+        pass  # connections go back to the shared pool on release; nothing is tied to the thread
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), collections.deque()
+            self._open -= len(idle)
+        for raw, _, _ in idle:
+            if not raw.closed:
+                raw.close()
+
+    def snapshot(self):
+        with self._cond:
+            idle = len(self._idle)
+            in_use = self._open - idle
+        return {"backend": "postgres", "size": self.size, "open": idle + in_use,
+                "in_use": in_use, "idle": idle, **self.stats.as_dict()}
+
+
+def _sqlite_pragmas():
+    """
+    SQLITE_PRODUCTION profile: WAL so readers never block the writer (or each
+    other), fsync only at checkpoints (synchronous=NORMAL; still durable
+    against application crashes), a busy timeout instead of immediate
+    "database is locked", and reads served from mmap / a larger page cache.
+    """
+    if not SQLITE_PRODUCTION:
+        return ()
+    return (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",
+        "PRAGMA temp_store=MEMORY",
+    )
+
+
+def connect_sqlite(path):
+    """A new sqlite3 connection with the configured pragmas applied."""
+    raw = sqlite3.connect(path, check_same_thread=False, cached_statements=256,
+                          timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+    raw.row_factory = sqlite3.Row
+    for pragma in _sqlite_pragmas():
+        raw.execute(pragma)
+    return raw
+
+
+class _Checkpointer:
+    """
+    Background WAL checkpoints, so the log is copied back into the database
+    between bursts instead of by whichever write happens to cross the
+    autocheckpoint limit. PASSIVE never waits for readers; once the log grows
+    past `truncate_pages` a TRUNCATE checkpoint also shrinks the file.
+    """
+
+    def __init__(self, path, interval, truncate_pages):
+        self.path = path
+        self.interval = interval
+        self.truncate_pages = truncate_pages
+        self.runs = 0
+        self.last = None
+        self._stop = threading.Event()
+        threading.Thread(target=self._loop, name="sqlite-checkpoint", daemon=True).start()
+
+    def _loop(self):
+        raw = None
+        while not self._stop.wait(self.interval):
+            try:
+                raw = raw or connect_sqlite(self.path)
+                mode = "PASSIVE"
+                busy, log_pages, done = raw.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+                if log_pages >= self.truncate_pages:
+                    mode = "TRUNCATE"
+                    busy, log_pages, done = raw.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+                self.runs += 1
+                self.last = {"mode": mode, "busy": busy, "log_pages": log_pages, "checkpointed": done}
+            except sqlite3.Error as e:
+                print(f"❌ WAL checkpoint failed: {e}")
+        if raw is not None:
+            raw.close()
+
+    def stop(self):
+        self._stop.set()
+
+
+class SQLitePool:
+    """
+    One reusable sqlite3 connection per thread. Nested checkouts on the same
+    thread share the handle; an uncommitted transaction is rolled back when
+    the outermost checkout is returned.
+    """
+
+    def __init__(self, path, max_lifetime, ping_after, checkpoint_interval=0):
+        self.path = path
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._handles = weakref.WeakValueDictionary()  # id(raw) -> _Handle, kept alive by its thread
+        self._in_use = 0
+        self.stats = _PoolStats()
+        self._checkpointer = None
+        if checkpoint_interval > 0:
+            self._checkpointer = _Checkpointer(path, checkpoint_interval, SQLITE_CHECKPOINT_TRUNCATE_PAGES)
+
+    def _connect(self):
+        raw = connect_sqlite(self.path)
+        self.stats.opened += 1
+        return raw
+
+    def _healthy(self, handle, now):
+        if now - handle.created_at > self.max_lifetime:
+            self.stats.recycled += 1
+            return False
+        if now - handle.returned_at > self.ping_after:
+            try:
+                handle.raw.execute("SELECT 1")
+            except sqlite3.Error:
+                self.stats.failed_health_checks += 1
+                return False
+        return True
+
+    def acquire(self):
+        started = time.monotonic()
+        handle = getattr(self._local, "handle", None)
+        if handle is not None and handle.depth == 0 and not self._healthy(handle, started):
+            self._close_handle(handle)
+            handle = None
+        if handle is None:
+            handle = _Handle(self._connect(), started)
+            self._local.handle = handle
+            with self._lock:
+                self._handles[id(handle.raw)] = handle
+        if handle.depth == 0:
+            with self._lock:
+                self._in_use += 1
+        handle.depth += 1
+        self.stats.record_wait(time.monotonic() - started)
+        return PooledConnection(self, handle.raw)
+
+    def release(self, raw):
+        with self._lock:
+            handle = self._handles.get(id(raw))
+        if handle is None or handle.raw is not raw:
+            return
+        handle.depth -= 1
+        if handle.depth == 0:
+            if raw.in_transaction:
+                raw.rollback()
+            handle.returned_at = time.monotonic()
+            with self._lock:
+                self._in_use -= 1
+
+    def _close_handle(self, handle):
+        with self._lock:
+            self._handles.pop(id(handle.raw), None)
         try:
-            conn = sqlite3.connect(DB_FILE_PATH, check_same_thread=False)
-            conn.row_factory = sqlite3.Row
-            return conn
-        except sqlite3.OperationalError as e:
-            print(f"❌ Error connecting to SQLite: {e}")
-            return None
+            handle.raw.close()
+        except sqlite3.Error:
+            pass
+
+    def detach(self):
+        """Closes the calling thread's connection if it's idle."""
+        handle = getattr(self._local, "handle", None)
+        if handle is not None and handle.depth == 0:
+            self._local.handle = None
+            self._close_handle(handle)
+
+    def close_all(self):
+        with self._lock:
+            handles = list(self._handles.values())
+        for handle in handles:
+            self._close_handle(handle)
+        self._local = threading.local()
+        if self._checkpointer is not None:
+            self._checkpointer.stop()
+
+    def snapshot(self):
+        with self._lock:
+            open_handles = len(self._handles)
+            in_use = self._in_use
+        stats = {"backend": "sqlite", "open": open_handles, "in_use": in_use, **self.stats.as_dict()}
+        if self._checkpointer is not None:
+            stats["checkpoints"] = self._checkpointer.runs
+            stats["last_checkpoint"] = self._checkpointer.last
+        return stats
+
+
+class _Handle:
+    __slots__ = ("raw", "created_at", "returned_at", "depth", "__weakref__")
+
+    def __init__(self, raw, created_at):
+        self.raw = raw
+        self.created_at = created_at
+        self.returned_at = created_at
+        self.depth = 0
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_inherited = []  # pools copied from a parent process by fork(), see get_pool()
+
+
+def get_pool():
+    """
+    The process's connection pool, created on first use. A pool inherited
+    through fork() is never used or closed by the child: its sockets belong to
+    the parent, and closing them here would end the parent's sessions.
+    """
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is not None and _pool_pid != os.getpid():
+                _inherited.append(_pool)
+                _pool = None
+            if _pool is None:
+                _pool_pid = os.getpid()
+                if is_postgres():
+                    _pool = PostgresPool(DATABASE_PATH, DB_POOL_SIZE, DB_POOL_TIMEOUT,
+                                         DB_POOL_MAX_LIFETIME, DB_POOL_PING_AFTER)
+                else:
+                    _pool = SQLitePool(sqlite_path(),
+                                       DB_POOL_MAX_LIFETIME, DB_POOL_PING_AFTER,
+                                       SQLITE_CHECKPOINT_INTERVAL if SQLITE_PRODUCTION else 0)
+    return _pool
 
 
-def database_exists_sqlite(conn):
+def close_pool():
+    """Closes every idle pooled connection and forgets the pool."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is None:
+        return
+    if _pool_pid == os.getpid():
+        pool.close_all()
+    else:
+        _inherited.append(pool)
+
+
+def detach_connection():
+    """
+    Lets go of the calling thread's pooled connection (SQLite keeps one per
+    thread). For long-lived requests such as event streams that are done
+    with the database, so idle streams don't each hold a connection open.
+    """
+    get_pool().detach()
+
+
+def pool_stats():
+    """Checkout count, wait times and in-use / idle counts for the current pool."""
+    return get_pool().snapshot()
+
+
+def get_db_connection():
+    """
+    Checks a connection out of the pool.
+    If DATABASE_PATH starts with 'postgres' we use psycopg2, otherwise we fall back to SQLite.
+    Calling close() on the returned connection hands it back to the pool.
+    """
+    try:
+        return get_pool().acquire()
+    except PoolTimeout as e:
+        print(f"❌ Database pool exhausted: {e}")
+        return None
+    except psycopg2.Error as e:
+        print(f"❌ Error connecting to PostgreSQL: {e}")
+        return None
+    except sqlite3.Error as e:
+        print(f"❌ Error connecting to SQLite: {e}")
+        return None
+
+
+@contextmanager
+def db_connection():
     """
-    Checks if the 'clients' table exists in SQLite.
-    (Only used for local dev with SQLite)
+    Context-managed checkout:
+
+        with db_connection() as db:
+            ...
+
+    The connection goes back to the pool when the block exits; an open
+    transaction that was not committed is rolled back.
     """
+    conn = get_pool().acquire()
     try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name='clients';"
-        )
-        return cursor.fetchone() is not None  # True if table exists
-    except sqlite3.OperationalError:
-        return False
+        yield conn
+    finally:
+        conn.close()
 
 
 def init_db():
     """
-    Initializes the database.
-    - If Postgres, just run schema.sql (or skip if you do migrations).
-    - If SQLite, run your existing logic to apply schema only if tables are missing.
+    Initializes the database by applying any pending migrations from
+    database/migrations/ (see migrations.py). Steps that were already
+    applied are skipped, so this is cheap on an up-to-date database.
+    A failed migration is re-raised: the app must not start on a schema
+    it doesn't expect. So is PostgreSQL without CHANGE_COUNTER_PATH: the
+    change counters (counters.py) are per host, and the deployment has to
+    say where its one host keeps them.
     """
-    conn = get_db_connection()
-    if conn is None:
-        print("❌ Could not initialize the database.")
-        return
+    from migrations import migrate  # migrations.py imports this module
 
-    # Detect Postgres vs SQLite
-    if DATABASE_PATH.startswith("postgres://") or DATABASE_PATH.startswith("postgresql://"):
-        print("🔹 Detected PostgreSQL. Applying schema (if needed).")
-        try:
-            with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
-                schema_sql = f.read()
-            # In psycopg2, it’s best to do all DDL inside a transaction
-            with conn:
-                with conn.cursor() as cur:
-                    cur.execute(schema_sql)  # or split by ; if you want
-            print("✅ Postgres database initialized (schema applied).")
-        except Exception as e:
-            print(f"❌ Error initializing Postgres DB: {e}")
-        finally:
-            conn.close()
+    if is_postgres() and not CHANGE_COUNTER_PATH:
+        message = ("CHANGE_COUNTER_PATH must be set on PostgreSQL. The change counters behind ETags and the "
+                   "principal / availability caches are a file on one host, so every app process using this "
+                   "database must run on that host and share the file (see counters.py).")
+        print(f"❌ {message}")
+        raise RuntimeError(message)
+    print(f"🔹 {'Detected PostgreSQL' if is_postgres() else 'Using SQLite'}. Checking for pending migrations.")
+    try:
+        applied = migrate()
+    except Exception as e:
+        print(f"❌ Error initializing the database: {e}")
+        raise
+    if applied:
+        print(f"✅ Database migrated (applied {', '.join(str(v) for v in applied)}).")
     else:
-        print("🔹 Using SQLite. Checking if schema needs to be applied.")
-        if database_exists_sqlite(conn):
-            print("✅ Database already initialized. Skipping schema setup.")
-        else:
-            try:
-                print(f"🔹 Applying schema from: {SCHEMA_PATH}")
-                with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
-                    conn.executescript(f.read())
-                conn.commit()
-                print("✅ Database initialized successfully on SQLite!")
-            except Exception as e:
-                print(f"❌ Error initializing SQLite DB: {e}")
-            finally:
-                conn.close()
+        print("✅ Database already up to date.")
@@ -0,0 +1,265 @@
+# events.py
+#
+# Server-sent events (GET /events) so dashboards stop polling lesson lists and
+# rosters. A client subscribes to topics:
+#   lessons:coach:<id>      lessons of a coach             (that coach)
+#   lessons:player:<id>     lessons of a player            (that player)
+#   availability:coach:<id> a coach's availability         (anyone)
+#   team:<id>               a team and its roster          (its coach, its players)
+#   teams                   teams created / renamed / gone (anyone)
+# Admins may subscribe to anything. Without topics a caller gets their own.
+#
+# The change log (changelog.py) is the pub/sub between workers: every worker
+# runs one bridge thread that tails change_log while it has subscribers and
+# fans each entry out to the matching local subscribers. Writes made in this
+# worker wake the bridge at once (counters listener); other workers' writes
+# arrive within EVENTS_POLL_INTERVAL. Events carry ids only, with the sync
+# token as the SSE id (and as "next"), so a client pulls the rows through
+# /sync?since=.
+#
+# A subscriber is a bounded queue; a slow one that overflows is sent a
+# "resync" event instead of holding memory. Idle connections cost a blocked
+# queue read each: a greenlet under the gevent worker
+# (GUNICORN_WORKER_CLASS=gevent, for thousands of connections), but a request
+# thread under gthread. There EVENTS_MAX_SUBSCRIBERS defaults to half of
+# GUNICORN_THREADS, so streams can't take every thread; beyond it /events
+# answers 503.
+
+import os
+import re
+import queue
+import threading
+import counters
+import changelog
+from serializers import dumps
+from database import db_connection
+from query import fetch_all
+from config import EVENTS_POLL_INTERVAL, EVENTS_HEARTBEAT, EVENTS_QUEUE_SIZE, EVENTS_MAX_SUBSCRIBERS
+
+TOPIC_RE = re.compile(r"^(?:(?:lessons:coach|lessons:player|availability:coach|team):\d+|teams)$")
+TABLES = ("private_lessons", "coach_availability", "teams", "team_members")
+BATCH = 1000  # change_log entries read per poll
+
+
+class HubFull(Exception):
+    """This worker already holds EVENTS_MAX_SUBSCRIBERS connections."""
+
+
+class Subscriber:
+    __slots__ = ("topics", "queue", "overflowed", "active")
+
+    def __init__(self, topics, queue_size):
+        self.topics = topics
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.overflowed = False
+        self.active = True
+
+
+class EventHub:
+    def __init__(self, queue_size, max_subscribers):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._by_topic = {}  # topic -> set of Subscriber
+        self._count = 0
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, topics):
+        subscriber = Subscriber(tuple(topics), self.queue_size)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise HubFull("Too many event subscribers")
+            self._count += 1
+            for topic in subscriber.topics:
+                self._by_topic.setdefault(topic, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Safe to call more than once (the stream and the response close both do)."""
+        with self._lock:
+            if not subscriber.active:
+                return
+            subscriber.active = False
+            self._count -= 1
+            for topic in subscriber.topics:
+                subscribers = self._by_topic.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self._by_topic[topic]
+
+    def has_subscribers(self):
+        return self._count > 0
+
+    def publish(self, topics, event):
+        """Delivers `event` once to every subscriber of any of `topics`."""
+        with self._lock:
+            targets = set()
+            for topic in topics:
+                targets.update(self._by_topic.get(topic, ()))
+        for subscriber in targets:
+            try:
+                subscriber.queue.put_nowait(event)
+            except queue.Full:
+                subscriber.overflowed = True
+                self.dropped += 1
+        self.published += 1
+        return len(targets)
+
+    def snapshot(self):
+        with self._lock:
+            return {"subscribers": self._count, "topics": len(self._by_topic),
+                    "published": self.published, "dropped": self.dropped}
+
+
+def topics_for(entry):
+    """Topics a change_log entry is published to."""
+    table = entry["table_name"]
+    if table == "private_lessons":
+        return (f"lessons:coach:{entry['coach_id']}", f"lessons:player:{entry['player_id']}")
+    if table == "coach_availability":
+        return (f"availability:coach:{entry['coach_id']}",)
+    if table == "teams":
+        return (f"team:{entry['team_id']}", "teams")
+    return (f"team:{entry['team_id']}",)
+
+
+class ChangeBridge:
+    """Tails change_log into the hub; one thread per worker, started by the first subscriber."""
+
+    def __init__(self, hub, interval):
+        self.hub = hub
+        self.interval = interval
+        self.last_position = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def ensure_running(self, head):
+        """
+        Called after a subscriber registered and read `head`: everything after
+        it is pushed; the client catches up on the rest through /sync.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                # A thread started before fork doesn't exist in the child
+                self._pid = os.getpid()
+                self.last_position = None
+                threading.Thread(target=self._run, name="events-bridge", daemon=True).start()
+            if self.last_position is None:
+                self.last_position = head
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            with self._lock:
+                if not self.hub.has_subscribers():
+                    self.last_position = None  # nothing to push; the next subscriber sets the start
+                    continue
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"❌ Event bridge could not read the change log: {e}")
+
+    def poll(self):
+        if self.last_position is None:
+            return
+        with db_connection() as db:
+            while True:
+                entries = changelog.read(
+                    db, self.last_position, BATCH,
+                    columns="txid, seq, table_name, op, row_id, coach_id, player_id, team_id"
+                )
+                for entry in entries:
+                    self.last_position = changelog.position(entry)
+                    self.hub.publish(topics_for(entry), {
+                        "seq": entry["seq"], "table": entry["table_name"], "op": entry["op"], "id": entry["row_id"],
+                        "next": changelog.encode_token(self.last_position),
+                    })
+                if len(entries) < BATCH:
+                    return
+
+
+hub = EventHub(EVENTS_QUEUE_SIZE, EVENTS_MAX_SUBSCRIBERS)
+bridge = ChangeBridge(hub, EVENTS_POLL_INTERVAL)
+
+
+def _on_bump(tables):
+    if hub.has_subscribers() and any(table in TABLES for table in tables):
+        bridge.wake()
+
+
+counters.add_listener(_on_bump)
+
+
+# --- subscriptions ---
+
+def default_topics(db, principal):
+    if principal.role == "coach":
+        teams = fetch_all(db, "SELECT id FROM teams WHERE coach_id = %s", (principal.id,))
+        return [f"lessons:coach:{principal.id}", f"availability:coach:{principal.id}", "teams"] + \
+               [f"team:{row['id']}" for row in teams]
+    if principal.role == "player":
+        teams = fetch_all(db, "SELECT DISTINCT team_id FROM team_members WHERE player_id = %s", (principal.id,))
+        return [f"lessons:player:{principal.id}"] + [f"team:{row['team_id']}" for row in teams]
+    return ["teams"]
+
+
+def forbidden_topics(db, principal, topics):
+    """The topics in `topics` that `principal` may not subscribe to."""
+    if principal.role == "admin":
+        return []
+    denied = []
+    team_ids = []
+    for topic in topics:
+        kind, _, value = topic.rpartition(":")
+        if topic == "teams" or kind == "availability:coach":
+            continue
+        if kind == "team":
+            team_ids.append(int(value))
+        elif kind != f"lessons:{principal.role}" or int(value) != principal.id:
+            denied.append(topic)
+    if team_ids:
+        if principal.role == "coach":
+            sql = "SELECT id AS team_id FROM teams WHERE coach_id = %s AND id IN "
+        else:
+            sql = "SELECT DISTINCT team_id FROM team_members WHERE player_id = %s AND team_id IN "
+        rows = fetch_all(db, sql + "(" + ", ".join(["%s"] * len(team_ids)) + ")", (principal.id, *team_ids))
+        allowed = {row["team_id"] for row in rows}
+        denied.extend(f"team:{team_id}" for team_id in team_ids if team_id not in allowed)
+    return denied
+
+
+def _message(event, data, event_id=None):
+    lines = [f"id: {event_id}"] if event_id else []
+    lines.append(f"event: {event}")
+    lines.append("data: " + dumps(data).decode("utf-8"))
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def stream(subscriber, head):
+    """The SSE body for `subscriber`; unsubscribes when the client goes away."""
+    try:
+        yield b"retry: 3000\n\n"
+        yield _message("ready", {"topics": list(subscriber.topics), "next": changelog.encode_token(head)})
+        while True:
+            try:
+                event = subscriber.queue.get(timeout=EVENTS_HEARTBEAT)
+            except queue.Empty:
+                yield b": ping\n\n"
+                continue
+            if subscriber.overflowed:
+                subscriber.overflowed = False
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                # Events were dropped: the client re-syncs from the last id it received
+                yield _message("resync", {"reason": "overflow"})
+                continue
+            yield _message("change", event, event["next"])
+    finally:
+        hub.unsubscribe(subscriber)
@@ -0,0 +1,89 @@
+# gunicorn.conf.py
+#
+# Pre-forking production server. The app is imported once in the master
+# (preload_app) and shared copy-on-write with the workers. Migrations run in
+# the master before any worker exists; the master then drops its connections,
+# and every worker opens its own pool lazily after fork.
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# WEB_CONCURRENCY workers (default: one per core) x GUNICORN_THREADS threads.
+# GUNICORN_WORKER_CLASS=gevent runs requests as greenlets instead, up to
+# GUNICORN_WORKER_CONNECTIONS per worker, for many idle /events streams
+# (under gthread each stream holds a thread, see EVENTS_MAX_SUBSCRIBERS).
+# The standard library is patched here, before the app is preloaded, and
+# psycopg2 waits on its socket through gevent rather than blocking the worker.
+
+import os
+import time
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+
+if worker_class == "gevent":
+    from gevent import monkey
+
+    monkey.patch_all()
+
+    import psycopg2.extensions
+    from gevent.socket import wait_read, wait_write
+
+    def _gevent_wait(conn, timeout=None):
+        while True:
+            state = conn.poll()
+            if state == psycopg2.extensions.POLL_OK:
+                return
+            if state == psycopg2.extensions.POLL_READ:
+                wait_read(conn.fileno(), timeout=timeout)
+            elif state == psycopg2.extensions.POLL_WRITE:
+                wait_write(conn.fileno(), timeout=timeout)
+            else:
+                raise psycopg2.OperationalError(f"Bad result from poll: {state}")
+
+    psycopg2.extensions.set_wait_callback(_gevent_wait)
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "2000"))  # gevent only
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = 20
+keepalive = 5
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+
+_booted = time.perf_counter()
+
+
+def on_starting(server):
+    from database import init_db, close_pool
+
+    started = time.perf_counter()
+    init_db()
+    close_pool()  # never hand an open connection to a forked worker
+    server.log.info("Migrations checked in %.1f ms", (time.perf_counter() - started) * 1000)
+
+    from config import EVENTS_MAX_SUBSCRIBERS
+
+    if worker_class != "gevent" and EVENTS_MAX_SUBSCRIBERS >= threads:
+        server.log.warning("EVENTS_MAX_SUBSCRIBERS=%d lets /events streams take all %d threads of a worker; "
+                           "lower it or use GUNICORN_WORKER_CLASS=gevent", EVENTS_MAX_SUBSCRIBERS, threads)
+
+
+def when_ready(server):
+    server.log.info("Master ready %.1f ms after start (%d workers x %d threads)",
+                    (time.perf_counter() - _booted) * 1000, workers, threads)
+
+
+def post_fork(server, worker):
+    import main
+    from database import close_pool
+
+    main.mark_started()
+    close_pool()
+
+
+def post_worker_init(worker):
+    import main
+
+    worker.log.info("Worker %s ready %.1f ms after fork", worker.pid, main.uptime_ms())
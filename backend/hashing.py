@@ -0,0 +1,210 @@
+# hashing.py
+#
+# bcrypt runs on a dedicated process pool so a burst of logins doesn't pin
+# the request workers. The queue in front of the pool is bounded: when it is
+# full, callers get HashQueueFull right away (routes answer 503) instead of
+# piling up behind the CPU. A hash that waits longer than BCRYPT_TIMEOUT also
+# ends in HashQueueFull; if it is already running in a worker, its slot stays
+# taken until it finishes. Bulk hashing (imports) uses the same slots but
+# leaves a worker free, so logins don't wait behind it.
+
+import os
+import time
+import threading
+import collections
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+from metrics import metrics
+from config import BCRYPT_ROUNDS, BCRYPT_WORKERS, BCRYPT_QUEUE_SIZE, BCRYPT_TIMEOUT
+
+
+class HashQueueFull(Exception):
+    """Raised when too many hashes are already queued for the worker pool, or one waited past the timeout."""
+
+
+def _hash(password, rounds):
+    started = time.perf_counter()
+    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+    return hashed, time.perf_counter() - started
+
+
+def _check(password, hashed):
+    started = time.perf_counter()
+    ok = bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    return ok, time.perf_counter() - started
+
+
+class HashPool:
+    def __init__(self, workers, queue_size, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + queue_size)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._in_flight = 0
+        self.hashes = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.cpu_time_total = 0.0
+        self.wall_time_total = 0.0
+        self.wall_time_max = 0.0
+
+    def _get_executor(self):
+        # One executor per process: a pool inherited through fork is unusable
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            self._executor = None
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashQueueFull("Password hashing queue is full")
+        started = time.perf_counter()
+        cpu_time = 0.0
+        running = None
+        with self._lock:
+            self._in_flight += 1
+        try:
+            if self.workers <= 0:
+                result, cpu_time = fn(*args)
+            else:
+                try:
+                    future = self._get_executor().submit(fn, *args)
+                    result, cpu_time = future.result(timeout=self.timeout)
+                except BrokenProcessPool:
+                    self._reset_executor()
+                    future = self._get_executor().submit(fn, *args)
+                    result, cpu_time = future.result(timeout=self.timeout)
+            return result
+        except FutureTimeout:
+            if not future.cancel():
+                running = future  # can't be stopped; holds its slot until it's done
+            with self._lock:
+                self.timed_out += 1
+            raise HashQueueFull("Password hashing timed out") from None
+        finally:
+            wall = time.perf_counter() - started
+            labels = (("op", "check" if fn is _check else "hash"),)
+            metrics.observe("bcrypt_seconds", wall, labels)
+            metrics.inc("bcrypt_cpu_seconds_total", cpu_time, labels)
+            with self._lock:
+                self._in_flight -= 1
+                self.hashes += 1
+                self.wall_time_total += wall
+                self.wall_time_max = max(self.wall_time_max, wall)
+                self.cpu_time_total += cpu_time
+            if running is None:
+                self._slots.release()
+            else:
+                running.add_done_callback(lambda _: self._slots.release())
+
+    def map(self, fn, arg_tuples):
+        """
+        Runs many hashes for bulk work. They go through the same queue slots as
+        run(), at most `workers - 1` at a time (1 with a single worker), one
+        password per task, so a login is never queued behind a whole import.
+        Raises HashQueueFull when a slot doesn't free up within the timeout.
+        """
+        if self.workers <= 0:
+            return [fn(*args)[0] for args in arg_tuples]
+        window = max(self.workers - 1, 1)
+        started = time.perf_counter()
+        pending = collections.deque()
+        results = []
+        try:
+            for args in arg_tuples:
+                if len(pending) >= window:
+                    results.append(pending.popleft().result(timeout=self.timeout))
+                pending.append(self._submit_bulk(fn, args))
+            while pending:
+                results.append(pending.popleft().result(timeout=self.timeout))
+        except FutureTimeout:
+            raise HashQueueFull("Password hashing timed out") from None
+        except BrokenProcessPool:
+            self._reset_executor()
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+        cpu_time = sum(cpu for _, cpu in results)
+        metrics.inc("bcrypt_cpu_seconds_total", cpu_time, (("op", "hash"),))
+        with self._lock:
+            self.hashes += len(results)
+            self.cpu_time_total += cpu_time
+            self.wall_time_total += time.perf_counter() - started
+        return [result for result, _ in results]
+
+    def _submit_bulk(self, fn, args):
+        # Waits for a slot, unlike run(): bulk work queues rather than failing fast
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HashQueueFull("Password hashing queue is full")
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._bulk_done(None)
+            raise
+        future.add_done_callback(self._bulk_done)
+        return future
+
+    def _bulk_done(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def snapshot(self):
+        with self._lock:
+            done = self.hashes or 1
+            return {
+                "workers": self.workers,
+                "in_flight": self._in_flight,
+                "queue_depth": max(self._in_flight - max(self.workers, 1), 0),
+                "hashes": self.hashes,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "cpu_ms_avg": round(self.cpu_time_total / done * 1000, 2),
+                "wall_ms_avg": round(self.wall_time_total / done * 1000, 2),
+                "wall_ms_max": round(self.wall_time_max * 1000, 2),
+            }
+
+
+_pool = HashPool(BCRYPT_WORKERS, BCRYPT_QUEUE_SIZE, BCRYPT_TIMEOUT)
+
+
+def hash_password(password, rounds=None):
+    return _pool.run(_hash, password, rounds or BCRYPT_ROUNDS)
+
+
+def hash_passwords(passwords, rounds=None):
+    rounds = rounds or BCRYPT_ROUNDS
+    return _pool.map(_hash, [(password, rounds) for password in passwords])
+
+
+def check_password(password, hashed):
+    return _pool.run(_check, password, hashed)
+
+
+def hash_rounds(hashed):
+    """The work factor stored in a bcrypt hash ("$2b$12$..." -> 12)."""
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed):
+    return hash_rounds(hashed) != BCRYPT_ROUNDS
+
+
+def hash_stats():
+    return _pool.snapshot()
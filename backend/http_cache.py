@@ -0,0 +1,100 @@
+# http_cache.py
+#
+# Conditional GET for read-mostly endpoints. The ETag is derived from the
+# request (path + query string) and the change counters of the tables the
+# response depends on, so computing it never touches the database:
+#   - If-None-Match matches   -> 304, no database work
+#   - body cached for the tag -> served from the in-process LRU
+#   - otherwise               -> run the view, remember the body under its tag
+# Writes invalidate by bumping counters (counters.bump), which changes the tag.
+
+import hashlib
+import threading
+import collections
+from functools import wraps
+from flask import request, make_response, Response
+from counters import counters
+from config import HTTP_CACHE_MAX_ENTRIES, HTTP_CACHE_MAX_BYTES
+
+
+class ResponseCache:
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # etag -> (body, mimetype)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, etag):
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(etag)
+            self.hits += 1
+            return entry
+
+    def put(self, etag, body, mimetype):
+        if len(body) > self.max_bytes // 4:
+            return  # one huge export shouldn't evict everything else
+        with self._lock:
+            old = self._entries.pop(etag, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[etag] = (body, mimetype)
+            self._bytes += len(body)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def snapshot(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits,
+                    "misses": self.misses, "not_modified": self.not_modified}
+
+
+response_cache = ResponseCache(HTTP_CACHE_MAX_ENTRIES, HTTP_CACHE_MAX_BYTES)
+
+
+def compute_etag(tables):
+    parts = [request.path, request.query_string.decode("latin-1"), str(counters.epoch())]
+    parts.extend(f"{t}={v}" for t, v in zip(tables, counters.versions(tables)))
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def _with_validators(response, etag):
+    response.set_etag(etag)  # strong validator
+    response.headers["Cache-Control"] = "no-cache"  # clients may keep it, but must revalidate
+    return response
+
+
+def conditional(*tables):
+    """
+    Decorator for GET views whose output depends only on the request and on `tables`.
+    Put it below @jwt_required() so authorization still runs on every request.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = compute_etag(tables)
+            if request.if_none_match.contains(etag):
+                response_cache.not_modified += 1
+                return _with_validators(Response(status=304), etag)
+
+            cached = response_cache.get(etag)
+            if cached is not None:
+                body, mimetype = cached
+                return _with_validators(Response(body, status=200, mimetype=mimetype), etag)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            if not response.is_streamed:
+                response_cache.put(etag, response.get_data(), response.mimetype)
+            return _with_validators(response, etag)
+        return wrapper
+    return decorator
@@ -1,42 +1,95 @@
 # main.py
+#
+# Application factory. Nothing here touches the database at import time:
+# migrations run once, in the server's master process (gunicorn.conf.py) or
+# in the dev-server block below, and connections are opened lazily by each
+# worker on its first request.
+#
+#   development:  python main.py
+#   production:   gunicorn -c gunicorn.conf.py wsgi:app
 
 import os
-from flask import Flask
+import time
+from flask import Flask, g
 from flask_cors import CORS
-from database import init_db
-from routes import routes_app
 from flask_jwt_extended import JWTManager
+from config import JWT_SECRET_KEY
 
-app = Flask(__name__)
+# Reset by mark_started() in every forked worker, so boot time is per worker
+_started = time.perf_counter()
 
-# Configure your JWT settings
-app.config['JWT_SECRET_KEY'] = "d2df9688ef44d41a0ba41..."
-app.config['JWT_TOKEN_LOCATION'] = ['headers']
-app.config['JWT_HEADER_NAME'] = 'Authorization'
-app.config['JWT_IDENTITY_CLAIM'] = 'id'
 
-jwt = JWTManager(app)
+def mark_started():
+    global _started
+    _started = time.perf_counter()
 
-# Enable CORS globally for all routes
-CORS(
-    app,
-    resources={r"/*": {"origins": "*"}},
-    allow_headers=["Content-Type", "Authorization"],
-    expose_headers=["Content-Type", "Authorization"],
-    supports_credentials=True
-)
 
-# Register the Blueprint
-app.register_blueprint(routes_app)
+def uptime_ms():
+    return round((time.perf_counter() - _started) * 1000, 1)
+
+
+def create_app(config=None):
+    """Builds the Flask app. `config` overrides settings (e.g. for tests and benchmarks)."""
+    building = time.perf_counter()
+    from routes import routes_app
+
+    app = Flask(__name__)
+
+    # Configure your JWT settings
+    app.config['JWT_SECRET_KEY'] = JWT_SECRET_KEY
+    app.config['JWT_TOKEN_LOCATION'] = ['headers']
+    app.config['JWT_HEADER_NAME'] = 'Authorization'
+    app.config['JWT_IDENTITY_CLAIM'] = 'id'
+    app.config['JWT_QUERY_STRING_NAME'] = 'token'  # only GET /events reads it (EventSource can't set headers)
+    if config:
+        app.config.update(config)
+
+    JWTManager(app)
+
+    # Enable CORS globally for all routes
+    CORS(
+        app,
+        resources={r"/*": {"origins": "*"}},
+        allow_headers=["Content-Type", "Authorization"],
+        expose_headers=["Content-Type", "Authorization", "ETag", "X-SQL-Profile"],
+        supports_credentials=True
+    )
+
+    # Register the Blueprint
+    app.register_blueprint(routes_app)
+
+    _time_first_request(app)
+    app.config['STARTUP_MS'] = round((time.perf_counter() - building) * 1000, 1)
+    print(f"🔹 App created in {app.config['STARTUP_MS']} ms (pid {os.getpid()})")
+    return app
+
+
+def _time_first_request(app):
+    """Logs how long each process's first (cold: no pool, empty caches) request takes."""
+    pending = [True]
+
+    @app.before_request
+    def first_request():
+        if pending and pending.pop():
+            g.first_request_started = time.perf_counter()
+
+    @app.after_request
+    def first_request_done(response):
+        started = g.pop("first_request_started", None)
+        if started is not None:
+            app.config['FIRST_REQUEST_MS'] = round((time.perf_counter() - started) * 1000, 1)
+            print(f"🔹 First request in pid {os.getpid()} took {app.config['FIRST_REQUEST_MS']} ms")
+        return response
 
-# Initialize the database
-init_db()
 
 # Run the app
 if __name__ == '__main__':
+    from database import init_db
+
+    init_db()
     port = int(os.environ.get("PORT", 5000))
-    app.run(
-        debug=True,
+    create_app().run(
+        debug=os.environ.get("FLASK_DEBUG", "0").lower() in {"1", "true", "yes"},
         host="0.0.0.0",
         port=port
     )
@@ -0,0 +1,248 @@
+# metrics.py
+#
+# Request, database and hashing metrics in Prometheus text format (GET /metrics).
+#   - every OS thread records into its own shard, so the hot path takes no lock;
+#     a scrape sums the shards (greenlets of a gevent worker share their
+#     thread's shard, so short-lived greenlets don't pile up shards)
+#   - request latency is recorded around the routes_app blueprint, DB statements
+#     through the query-layer listener (query.add_listener), pool waits and
+#     bcrypt time by database.py / hashing.py
+#   - with METRICS_DIR set, each worker process also writes its totals there
+#     every METRICS_FLUSH_INTERVAL seconds and a scrape merges every worker's
+#     file, so one scrape sees the whole server
+
+import os
+import json
+import time
+import bisect
+import threading
+import tempfile
+from flask import g, request
+import query
+from config import METRICS_DIR, METRICS_FLUSH_INTERVAL
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# name -> (type, help, buckets)
+DEFINITIONS = {
+    "http_requests_total": ("counter", "Requests handled, by endpoint, method and status.", None),
+    "http_request_duration_seconds": ("histogram", "Request latency until the response is returned.", LATENCY_BUCKETS),
+    "http_request_db_queries": ("histogram", "Database statements run per request.", COUNT_BUCKETS),
+    "http_request_db_seconds": ("histogram", "Time spent in the database per request.", LATENCY_BUCKETS),
+    "db_queries_total": ("counter", "Database statements, by statement kind.", None),
+    "db_query_seconds": ("histogram", "Database statement latency, by statement kind.", LATENCY_BUCKETS),
+    "db_pool_acquire_seconds": ("histogram", "Time waiting for a pooled connection.", LATENCY_BUCKETS),
+    "bcrypt_seconds": ("histogram", "Wall time of a password hash / check, queueing included.", LATENCY_BUCKETS),
+    "bcrypt_cpu_seconds_total": ("counter", "CPU time spent inside bcrypt.", None),
+    "rate_limited_total": ("counter", "Requests refused with 429, by limit.", None),
+    "announcement_deliveries_total": ("counter", "Announcement inbox rows written by the fan-out.", None),
+}
+
+
+class Metrics:
+    def __init__(self):
+        self._shards = {}  # native thread id -> shard
+        self._shards_lock = threading.Lock()  # only taken when a thread records for the first time
+
+    def _shard(self):
+        # get_native_id() is not patched by gevent; a reused id just keeps adding to the old shard
+        ident = threading.get_native_id()
+        shard = self._shards.get(ident)
+        if shard is None:
+            with self._shards_lock:
+                shard = self._shards.setdefault(ident, {})
+        return shard
+
+    def inc(self, name, value=1, labels=()):
+        shard = self._shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        shard = self._shard()
+        key = (name, labels)
+        buckets = DEFINITIONS[name][2]
+        hist = shard.get(key)
+        if hist is None:
+            hist = shard[key] = [0] * (len(buckets) + 1) + [0.0]  # bucket counts, +Inf, sum
+        hist[bisect.bisect_left(buckets, value)] += 1
+        hist[-1] += value
+
+    def snapshot(self):
+        """Sum of every thread's shard: {(name, labels): number | histogram list}."""
+        with self._shards_lock:
+            shards = list(self._shards.values())
+        totals = {}
+        for shard in shards:
+            _merge(totals, dict(shard).items())  # dict() copies atomically under the GIL
+        return totals
+
+    def render(self):
+        totals = self.snapshot()
+        if METRICS_DIR:
+            _flush(totals)
+            totals = _merge_dir()
+        return _render(totals) + _render_gauges()
+
+
+def _merge(totals, items):
+    for key, value in items:
+        current = totals.get(key)
+        if current is None:
+            totals[key] = list(value) if isinstance(value, list) else value
+        elif isinstance(value, list):
+            for i, v in enumerate(value):
+                current[i] += v
+        else:
+            totals[key] = current + value
+    return totals
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _render(totals):
+    lines = []
+    by_name = {}
+    for (name, labels), value in totals.items():
+        by_name.setdefault(name, []).append((labels, value))
+    for name, series in sorted(by_name.items()):
+        kind, help_text, buckets = DEFINITIONS[name]
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(series):
+            if kind != "histogram":
+                lines.append(f"{name}{_labels(labels)} {value:g}")
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, value):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, [('le', f'{bound:g}')])} {cumulative}")
+            cumulative += value[len(buckets)]
+            lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {value[-1]:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def _render_gauges():
+    """Point-in-time pool / hash-queue / event-stream state of the process answering the scrape."""
+    from database import pool_stats
+    from hashing import hash_stats
+    from events import hub
+
+    pid = [("pid", os.getpid())]
+    pool, hashes = pool_stats(), hash_stats()
+    gauges = [
+        ("db_pool_in_use", "Connections checked out.", pool.get("in_use", 0)),
+        ("db_pool_idle", "Open connections waiting in the pool.", pool.get("idle", pool.get("open", 0) - pool.get("in_use", 0))),
+        ("bcrypt_in_flight", "Hashes running or queued.", hashes["in_flight"]),
+        ("events_subscribers", "Open /events streams.", hub.snapshot()["subscribers"]),
+    ]
+    lines = []
+    for name, help_text, value in gauges:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name}{_labels(pid)} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+# --- multi-process (METRICS_DIR) ---
+
+_flusher_pid = None
+
+
+def _flush(totals=None):
+    totals = metrics.snapshot() if totals is None else totals
+    path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+    fd, tmp = tempfile.mkstemp(dir=METRICS_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump([[name, labels, value] for (name, labels), value in totals.items()], f)
+    os.replace(tmp, path)
+
+
+def _merge_dir():
+    totals = {}
+    for entry in os.scandir(METRICS_DIR):
+        if not entry.name.endswith(".json"):
+            continue
+        try:
+            with open(entry.path) as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            continue
+        _merge(totals, (((name, tuple(tuple(pair) for pair in labels)), value) for name, labels, value in items))
+    return totals
+
+
+def _flush_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        try:
+            _flush()
+        except OSError as e:
+            print(f"❌ Could not write metrics to {METRICS_DIR}: {e}")
+
+
+def _ensure_flusher():
+    # Started lazily in each worker: a thread started in the master doesn't survive fork
+    global _flusher_pid
+    if _flusher_pid != os.getpid():
+        _flusher_pid = os.getpid()
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True).start()
+
+
+# --- hooks ---
+
+metrics = Metrics()
+_request = threading.local()
+
+
+def render():
+    return metrics.render()
+
+
+def record_query(db, sql, params, seconds):
+    kind = sql.split(None, 1)[0].upper() if sql else ""
+    labels = (("kind", kind),)
+    metrics.inc("db_queries_total", 1, labels)
+    metrics.observe("db_query_seconds", seconds, labels)
+    totals = getattr(_request, "db", None)
+    if totals is not None:
+        totals[0] += 1
+        totals[1] += seconds
+
+
+query.add_listener(record_query)
+
+
+def instrument(blueprint):
+    """Records latency, status and DB usage for every request routed to `blueprint`."""
+
+    @blueprint.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+        _request.db = [0, 0.0]
+
+    @blueprint.after_request
+    def _record(response):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = (request.endpoint or "unmatched").rsplit(".", 1)[-1]
+        labels = (("endpoint", endpoint), ("method", request.method), ("status", str(response.status_code)))
+        metrics.inc("http_requests_total", 1, labels)
+        metrics.observe("http_request_duration_seconds", elapsed, labels[:2])
+        queries, db_seconds = _request.db
+        _request.db = None
+        metrics.observe("http_request_db_queries", queries, labels[:1])
+        metrics.observe("http_request_db_seconds", db_seconds, labels[:1])
+        if METRICS_DIR:
+            _ensure_flusher()
+        return response
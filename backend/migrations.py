@@ -0,0 +1,129 @@
+# migrations.py
+#
+# Versioned schema migrations. Files live in database/migrations/ and are named
+#   <version>_<name>.sql            (runs on every backend)
+#   <version>_<name>.<dialect>.sql  (postgres / sqlite only; wins over the generic file)
+# Each applied step is recorded in schema_migrations with a checksum of its SQL,
+# so startup only runs pending steps and warns if an applied file was edited.
+
+import os
+import re
+import hashlib
+from dataclasses import dataclass
+from database import db_connection
+from query import dialect, fetch_all
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "database", "migrations")
+_FILE_RE = re.compile(r"^(\d+)_(\w+?)(?:\.(postgres|sqlite))?\.sql$")
+_LOCK_ID = 7261  # pg advisory lock key, so concurrent workers don't migrate twice
+
+VERSION_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    checksum VARCHAR(64) NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    sql: str
+
+    @property
+    def checksum(self):
+        return hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+
+
+def discover(target):
+    """Returns the migrations for `target` ("postgres" / "sqlite"), ordered by version."""
+    found = {}
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = _FILE_RE.match(filename)
+        if not match:
+            continue
+        version, name, only_for = int(match.group(1)), match.group(2), match.group(3)
+        if only_for and only_for != target:
+            continue
+        if version in found and not only_for:
+            continue  # the dialect-specific file takes precedence
+        with open(os.path.join(MIGRATIONS_DIR, filename), "r", encoding="utf-8") as f:
+            found[version] = Migration(version, name, f.read())
+    return [found[v] for v in sorted(found)]
+
+
+def applied_migrations(db):
+    rows = fetch_all(db, "SELECT version, name, checksum FROM schema_migrations ORDER BY version")
+    return {row["version"]: row for row in rows}
+
+
+def _apply_postgres(db, migration):
+    with db:
+        with db.cursor() as cur:
+            cur.execute(migration.sql)
+            cur.execute(
+                "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                (migration.version, migration.name, migration.checksum)
+            )
+    # RAISE NOTICE is how a step reports what it changed in existing data
+    for notice in db.notices:
+        print(f"⚠️ Migration {migration.version}_{migration.name}: {notice.strip()}")
+    del db.notices[:]
+
+
+def _apply_sqlite(db, migration):
+    # executescript() commits on its own, so the step and its bookkeeping row
+    # are wrapped in one explicit transaction.
+    try:
+        db.executescript(
+            "BEGIN;\n" + migration.sql + "\n;"
+            f"INSERT INTO schema_migrations (version, name, checksum) "
+            f"VALUES ({migration.version}, '{migration.name}', '{migration.checksum}');\n"
+            "COMMIT;"
+        )
+    except Exception:
+        if db.in_transaction:
+            db.rollback()
+        raise
+
+
+def migrate():
+    """Applies every pending migration. Returns the list of versions applied."""
+    applied_now = []
+    with db_connection() as db:
+        target = dialect(db)
+        if target == "postgres":
+            with db:
+                with db.cursor() as cur:
+                    cur.execute(VERSION_TABLE_SQL)
+            # Session-level lock: held across the per-step transactions below
+            with db.cursor() as cur:
+                cur.execute("SELECT pg_advisory_lock(%s)", (_LOCK_ID,))
+        else:
+            db.execute(VERSION_TABLE_SQL)
+            db.commit()
+
+        try:
+            done = applied_migrations(db)
+            for migration in discover(target):
+                previous = done.get(migration.version)
+                if previous is not None:
+                    if previous["checksum"] != migration.checksum:
+                        print(f"⚠️ Migration {migration.version}_{migration.name} changed after it was applied "
+                              f"(checksum {previous['checksum'][:12]} != {migration.checksum[:12]}).")
+                    continue
+                print(f"🔹 Applying migration {migration.version}_{migration.name}")
+                if target == "postgres":
+                    _apply_postgres(db, migration)
+                else:
+                    _apply_sqlite(db, migration)
+                applied_now.append(migration.version)
+        finally:
+            if target == "postgres":
+                with db.cursor() as cur:
+                    cur.execute("SELECT pg_advisory_unlock(%s)", (_LOCK_ID,))
+                db.commit()
+    return applied_now
@@ -0,0 +1,138 @@
+from dataclasses import dataclass, field
+from query import execute, execute_many, insert, fetch_one
+from pagination import fetch_page
+from serializers import ANNOUNCEMENT
+
+AUDIENCES = ("club", "teams", "players")  # that can be posted to; 'cancellation' is sent by cancellation.py
+
+@dataclass(slots=True)
+class Announcement:
+    id: int
+    author_id: int
+    title: str
+    content: str
+    important: bool = False
+    audience: str = "club"      # club | teams | players (of coach_id)
+    coach_id: int = None
+    team_ids: tuple = field(default_factory=tuple)
+    cancellation_id: int = None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "author_id": self.author_id,
+            "title": self.title,
+            "content": self.content,
+            "important": self.important,
+            "audience": self.audience,
+            "coach_id": self.coach_id,
+            "team_ids": list(self.team_ids)
+        }
+
+    def save(self, db, commit=True):
+        """Stores the announcement; announcements.py delivers it to the inboxes afterwards."""
+        self.id = insert(
+            db,
+            "INSERT INTO announcements (author_id, title, content, important, audience, coach_id, cancellation_id) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            (self.author_id, self.title, self.content, bool(self.important), self.audience, self.coach_id,
+             self.cancellation_id)
+        )
+        if self.team_ids:
+            execute_many(
+                db,
+                "INSERT INTO announcement_teams (announcement_id, team_id) VALUES (%s, %s)",
+                [(self.id, team_id) for team_id in self.team_ids]
+            )
+        if commit:
+            db.commit()
+        return self
+
+    # Same shape as serializers.ANNOUNCEMENT, one row per inbox entry
+    INBOX_SQL = """
+        SELECT a.id, a.title, a.content, a.important, a.audience, a.author_id,
+               CASE WHEN u.first_name <> '' AND u.last_name <> ''
+                    THEN u.first_name || ' ' || u.last_name ELSE 'Unknown' END AS author_name,
+               u.role AS author_role, a.created_at, ai.read_at
+        FROM announcement_inbox ai
+        JOIN announcements a ON a.id = ai.announcement_id
+        LEFT JOIN users u ON u.id = a.author_id
+        WHERE ai.user_id = %s
+        """
+
+    @staticmethod
+    def get_inbox(db, user_id, page=None):
+        """The user's announcements, newest first."""
+        return fetch_page(db, Announcement.INBOX_SQL, (user_id,), [("ai.announcement_id", "id")], page,
+                          ANNOUNCEMENT.row, descending=True)
+
+    @staticmethod
+    def get_inbox_entry(db, user_id, announcement_id):
+        row = fetch_one(db, Announcement.INBOX_SQL + " AND ai.announcement_id = %s", (user_id, announcement_id))
+        return ANNOUNCEMENT.row(row) if row else None
+
+    @staticmethod
+    def unread_count(db, user_id):
+        row = fetch_one(db, "SELECT unread FROM announcement_unread WHERE user_id = %s", (user_id,))
+        return row["unread"] if row else 0
+
+    @staticmethod
+    def find(db, announcement_id):
+        """The announcement with its delivery progress, or None."""
+        row = fetch_one(db, """
+            SELECT id, author_id, title, content, important, audience, coach_id, created_at,
+                   recipients, delivered_at
+            FROM announcements WHERE id = %s
+        """, (announcement_id,))
+        if row is None:
+            return None
+        announcement = dict(row)
+        announcement["important"] = bool(announcement["important"])
+        return announcement
+
+    @staticmethod
+    def mark_read(db, user_id, announcement_id):
+        cursor = execute(
+            db,
+            "UPDATE announcement_inbox SET read_at = CURRENT_TIMESTAMP "
+            "WHERE user_id = %s AND announcement_id = %s AND read_at IS NULL",
+            (user_id, announcement_id)
+        )
+        if cursor.rowcount:
+            execute(db, "UPDATE announcement_unread SET unread = unread - 1 WHERE user_id = %s", (user_id,))
+        db.commit()
+        return cursor.rowcount > 0
+
+    @staticmethod
+    def mark_all_read(db, user_id):
+        marked = execute(
+            db,
+            "UPDATE announcement_inbox SET read_at = CURRENT_TIMESTAMP WHERE user_id = %s AND read_at IS NULL",
+            (user_id,)
+        ).rowcount
+        # Subtract rather than zero: a fan-out batch may have added one meanwhile
+        if marked:
+            execute(db, "UPDATE announcement_unread SET unread = unread - %s WHERE user_id = %s", (marked, user_id))
+        db.commit()
+        return marked
+
+    @staticmethod
+    def delete(db, announcement_id):
+        # Marking it delivered first locks the row, which stops a running fan-out
+        claimed = execute(
+            db,
+            "UPDATE announcements SET delivered_at = COALESCE(delivered_at, CURRENT_TIMESTAMP) WHERE id = %s",
+            (announcement_id,)
+        ).rowcount
+        if not claimed:
+            db.rollback()
+            return False
+        execute(db, """
+            UPDATE announcement_unread SET unread = unread - 1
+            WHERE user_id IN (SELECT user_id FROM announcement_inbox WHERE announcement_id = %s AND read_at IS NULL)
+        """, (announcement_id,))
+        execute(db, "DELETE FROM announcement_inbox WHERE announcement_id = %s", (announcement_id,))
+        execute(db, "DELETE FROM announcement_teams WHERE announcement_id = %s", (announcement_id,))
+        execute(db, "DELETE FROM announcements WHERE id = %s", (announcement_id,))
+        db.commit()
+        return True
@@ -1,12 +1,15 @@
 from dataclasses import dataclass
+from clock import format_minutes
+from query import execute, fetch_all
+from serializers import AVAILABILITY
 
-@dataclass
+@dataclass(slots=True)
 class CoachAvailability:
     id: int
     coach_id: int
     day: str
-    start_time: str
-    end_time: str
+    start_time: int  # minutes since midnight
+    end_time: int
 
     @classmethod
     def from_row(cls, row):
@@ -26,13 +29,13 @@ class CoachAvailability:
             "id": self.id,
             "coach_id": self.coach_id,
             "day": self.day,
-            "start_time": self.start_time,
-            "end_time": self.end_time
+            "start_time": format_minutes(self.start_time),
+            "end_time": format_minutes(self.end_time)
         }
 
     def save(self, db):
-        cursor = db.cursor()
-        cursor.execute(
+        execute(
+            db,
             "INSERT INTO coach_availability (coach_id, day, start_time, end_time) VALUES (%s, %s, %s, %s)",
             (self.coach_id, self.day, self.start_time, self.end_time)
         )
@@ -40,17 +43,16 @@ class CoachAvailability:
 
     @staticmethod
     def get_availability(db, coach_id):
-        cursor = db.cursor()
-        cursor.execute(
-            "SELECT id, coach_id, day, start_time, end_time FROM coach_availability WHERE coach_id = %s",
+        rows = fetch_all(
+            db,
+            f"SELECT {AVAILABILITY.columns()} FROM coach_availability WHERE coach_id = %s",
             (coach_id,)
         )
-        rows = cursor.fetchall()
-        return [CoachAvailability.from_row(row).to_dict() for row in rows]
+        return AVAILABILITY.rows(rows)
 
     def update(self, db):
-        cursor = db.cursor()
-        cursor.execute(
+        execute(
+            db,
             "UPDATE coach_availability SET day = %s, start_time = %s, end_time = %s WHERE id = %s",
             (self.day, self.start_time, self.end_time, self.id)
         )
@@ -1,13 +1,17 @@
 from dataclasses import dataclass
+from clock import format_minutes
+from query import insert, fetch_one, iter_rows
+from pagination import fetch_page
+from serializers import LESSON
 
-@dataclass
+@dataclass(slots=True)
 class Lesson:
     id: int
     player_id: int
     coach_id: int
     lesson_date: str
-    start_time: str
-    end_time: str
+    start_time: int  # minutes since midnight
+    end_time: int
 
     @classmethod
     def from_row(cls, row):
@@ -28,43 +32,78 @@ class Lesson:
             "player_id": self.player_id,
             "coach_id": self.coach_id,
             "lesson_date": self.lesson_date,
-            "start_time": self.start_time,
-            "end_time": self.end_time
+            "start_time": format_minutes(self.start_time),
+            "end_time": format_minutes(self.end_time)
         }
 
-    def save(self, db):
-        cursor = db.cursor()
-        cursor.execute(
+    def save(self, db, commit=True):
+        self.id = insert(
+            db,
             "INSERT INTO private_lessons (player_id, coach_id, lesson_date, start_time, end_time) VALUES (%s, %s, %s, %s, %s)",
             (self.player_id, self.coach_id, self.lesson_date, self.start_time, self.end_time)
         )
-        db.commit()
+        if commit:
+            db.commit()
 
     @staticmethod
-    def is_booked(db, coach_id, lesson_date, start_time):
-        cursor = db.cursor()
-        cursor.execute(
-            "SELECT 1 FROM private_lessons WHERE coach_id = %s AND lesson_date = %s AND start_time = %s",
-            (coach_id, lesson_date, start_time)
-        )
-        return cursor.fetchone() is not None
+    def is_booked(db, coach_id, lesson_date, start_time, end_time=None):
+        """True if the coach already has a lesson overlapping [start_time, end_time)."""
+        if end_time is None:
+            row = fetch_one(
+                db,
+                "SELECT 1 FROM private_lessons WHERE coach_id = %s AND lesson_date = %s AND start_time = %s",
+                (coach_id, lesson_date, start_time)
+            )
+        else:
+            row = fetch_one(
+                db,
+                "SELECT 1 FROM private_lessons WHERE coach_id = %s AND lesson_date = %s "
+                "AND start_time < %s AND end_time > %s LIMIT 1",
+                (coach_id, lesson_date, end_time, start_time)
+            )
+        return row is not None
 
     @staticmethod
-    def get_player_lessons(db, player_id):
-        cursor = db.cursor()
-        cursor.execute(
-            "SELECT id, player_id, coach_id, lesson_date, start_time, end_time FROM private_lessons WHERE player_id = %s",
-            (player_id,)
+    def player_is_busy(db, player_id, lesson_date, start_time, end_time):
+        """True if the player already has any lesson overlapping [start_time, end_time)."""
+        row = fetch_one(
+            db,
+            "SELECT 1 FROM private_lessons WHERE player_id = %s AND lesson_date = %s "
+            "AND start_time < %s AND end_time > %s LIMIT 1",
+            (player_id, lesson_date, end_time, start_time)
         )
-        rows = cursor.fetchall()
-        return [Lesson.from_row(row).to_dict() for row in rows]
+        return row is not None
+
+    ORDER = [("lesson_date", "lesson_date"), ("start_time", "start_time"), ("id", "id")]
 
     @staticmethod
-    def get_coach_lessons(db, coach_id):
-        cursor = db.cursor()
-        cursor.execute(
-            "SELECT id, player_id, coach_id, lesson_date, start_time, end_time FROM private_lessons WHERE coach_id = %s",
-            (coach_id,)
-        )
-        rows = cursor.fetchall()
-        return [Lesson.from_row(row).to_dict() for row in rows]
+    def _list_sql(column, value, date_from, date_to):
+        sql = f"SELECT {LESSON.columns()} FROM private_lessons WHERE {column} = %s"
+        params = [value]
+        if date_from:
+            sql += " AND lesson_date >= %s"
+            params.append(date_from)
+        if date_to:
+            sql += " AND lesson_date <= %s"
+            params.append(date_to)
+        return sql, tuple(params)
+
+    @staticmethod
+    def _list(db, column, value, date_from, date_to, page):
+        sql, params = Lesson._list_sql(column, value, date_from, date_to)
+        return fetch_page(db, sql, params, Lesson.ORDER, page, LESSON.row)
+
+    @staticmethod
+    def iter_lessons(db, column, value, date_from=None, date_to=None):
+        """Streams lessons for one player_id / coach_id without loading them all."""
+        sql, params = Lesson._list_sql(column, value, date_from, date_to)
+        sql += " ORDER BY " + ", ".join(expr for expr, _ in Lesson.ORDER)
+        yield from LESSON.iter(iter_rows(db, sql, params))
+
+    @staticmethod
+    def get_player_lessons(db, player_id, date_from=None, date_to=None, page=None):
+        return Lesson._list(db, "player_id", player_id, date_from, date_to, page)
+
+    @staticmethod
+    def get_coach_lessons(db, coach_id, date_from=None, date_to=None, page=None):
+        return Lesson._list(db, "coach_id", coach_id, date_from, date_to, page)
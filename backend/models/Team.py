@@ -1,6 +1,10 @@
+import json
 from dataclasses import dataclass
+from query import dialect, execute, fetch_all, iter_rows
+from pagination import fetch_page
+from serializers import TEAM
 
-@dataclass
+@dataclass(slots=True)
 class Team:
     id: int
     team_name: str
@@ -30,47 +34,35 @@ class Team:
         }
 
     def save(self, db):
-        cursor = db.cursor()
-        cursor.execute(
+        execute(
+            db,
             "INSERT INTO teams (team_name, coach_id) VALUES (%s, %s)",
             (self.team_name, self.coach_id)
         )
         db.commit()
 
-    @staticmethod
-    def get_all_teams(db):
-        cursor = db.cursor()
-        cursor.execute("""
-        SELECT t.id, t.team_name, t.coach_id, u.first_name, u.last_name
+    # Same shape as to_dict(), with coach_name built by the database
+    LIST_SQL = """
+        SELECT t.id, t.team_name, t.coach_id,
+               CASE WHEN u.first_name <> '' AND u.last_name <> ''
+                    THEN u.first_name || ' ' || u.last_name ELSE 'Unassigned' END AS coach_name
         FROM teams t
         LEFT JOIN users u ON t.coach_id = u.id
-        """)
-        rows = cursor.fetchall()
-        return [Team.from_row(row).to_dict() for row in rows]
+        WHERE 1 = 1
+        """
 
     @staticmethod
-    def get_team(db, team_id):
-        cursor = db.cursor()
-        cursor.execute("""
-        SELECT t.id, t.team_name, t.coach_id, 
-               u.first_name, u.last_name
-        FROM teams t
-        LEFT JOIN users u ON t.coach_id = u.id
-        WHERE t.id = %s
-        """, (team_id,))
-        row = cursor.fetchone()
-        
-        if row is None:
-            return None
-        
-        team = Team.from_row(row).to_dict()
-        print("🔹 get_team() Output:", team)  # Debugging output
-        return team
+    def get_all_teams(db, page=None):
+        return fetch_page(db, Team.LIST_SQL, (), [("t.id", "id")], page, TEAM.row)
+
+    @staticmethod
+    def iter_teams(db):
+        yield from TEAM.iter(iter_rows(db, Team.LIST_SQL + " ORDER BY t.id"))
 
     @staticmethod
     def assign_player(db, team_id, player_id):
-        cursor = db.cursor()
-        cursor.execute(
+        execute(
+            db,
             "INSERT INTO team_members (team_id, player_id) VALUES (%s, %s)",
             (team_id, player_id)
         )
@@ -78,8 +70,8 @@ class Team:
 
     @staticmethod
     def remove_player(db, team_id, player_id):
-        cursor = db.cursor()
-        cursor.execute(
+        execute(
+            db,
             "DELETE FROM team_members WHERE team_id = %s AND player_id = %s",
             (team_id, player_id)
         )
@@ -87,14 +79,12 @@ class Team:
 
     @staticmethod
     def get_team_players(db, team_id):
-        cursor = db.cursor()
-        cursor.execute("""
+        rows = fetch_all(db, """
             SELECT u.id, u.first_name, u.last_name, u.role
             FROM users u
             JOIN team_members tm ON u.id = tm.player_id
             WHERE tm.team_id = %s
         """, (team_id,))
-        rows = cursor.fetchall()
         return {
             "players": [
                 {
@@ -108,9 +98,57 @@ class Team:
             "count": len(rows)
         }
 
+    # Roster as a JSON array built by the database, one row per team.
+    # Correlated subqueries (rather than GROUP BY) keep the outer query pageable.
+    _ROSTER_SQL = {
+        "postgres": """
+            (SELECT COALESCE(json_agg(json_build_object(
+                        'id', p.id, 'first_name', p.first_name, 'last_name', p.last_name, 'role', p.role
+                    ) ORDER BY p.id), '[]'::json)::text
+             FROM team_members tm JOIN users p ON p.id = tm.player_id
+             WHERE tm.team_id = t.id)""",
+        "sqlite": """
+            (SELECT json_group_array(json_object(
+                        'id', p.id, 'first_name', p.first_name, 'last_name', p.last_name, 'role', p.role))
+             FROM (SELECT p.id, p.first_name, p.last_name, p.role
+                   FROM team_members tm JOIN users p ON p.id = tm.player_id
+                   WHERE tm.team_id = t.id ORDER BY p.id) p)""",
+    }
+
+    @staticmethod
+    def _roster_json(row):
+        """Serializes a roster row straight to JSON text; `players` is already JSON from the database."""
+        coach_name = (f"{row['first_name']} {row['last_name']}"
+                      if row['first_name'] and row['last_name'] else "Unassigned")
+        return (
+            '{"id":%d,"team_name":%s,"coach_id":%s,"coach_name":%s,"player_count":%d,"players":%s}' % (
+                row["id"], json.dumps(row["team_name"]), json.dumps(row["coach_id"]),
+                json.dumps(coach_name), row["player_count"], row["players"] or "[]"
+            )
+        )
+
+    @staticmethod
+    def get_teams_with_players(db, team_id=None, page=None):
+        """
+        Teams with their rosters and player counts in a single query.
+        Returns JSON text per team (a list, or a Page of them), not Team objects.
+        """
+        sql = f"""
+        SELECT t.id, t.team_name, t.coach_id, u.first_name, u.last_name,
+               (SELECT COUNT(*) FROM team_members tm WHERE tm.team_id = t.id) AS player_count,
+               {Team._ROSTER_SQL[dialect(db)]} AS players
+        FROM teams t
+        LEFT JOIN users u ON t.coach_id = u.id
+        WHERE 1 = 1
+        """
+        params = ()
+        if team_id is not None:
+            sql += " AND t.id = %s"
+            params = (team_id,)
+        return fetch_page(db, sql, params, [("t.id", "id")], page, Team._roster_json)
+
     @staticmethod
     def delete_team(db, team_id):
-        cursor = db.cursor()
-        cursor.execute("DELETE FROM teams WHERE id = %s", (team_id,))
+        cursor = execute(db, "DELETE FROM teams WHERE id = %s", (team_id,))
         db.commit()
         return cursor.rowcount > 0  # True if a row was deleted
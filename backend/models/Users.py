@@ -1,11 +1,14 @@
-import bcrypt
 import jwt
 import datetime
 from dataclasses import dataclass
-from database import get_db_connection
+from query import execute, execute_many, fetch_one, fetch_all, iter_rows
+from hashing import hash_password, hash_passwords, check_password, needs_rehash
+from auth import invalidate_user
+from pagination import fetch_page
+from serializers import USER
 from flask import current_app  # for accessing the JWT secret from main.py
 
-@dataclass
+@dataclass(slots=True)
 class User:
     id: int
     first_name: str
@@ -37,25 +40,38 @@ class User:
     def hash_password(self):
         # only hash if it's not already hashed
         if not self.password.startswith("$2b$"):
-            self.password = bcrypt.hashpw(
-                self.password.encode('utf-8'),
-                bcrypt.gensalt()
-            ).decode('utf-8')
+            self.password = hash_password(self.password)
+
+    @staticmethod
+    def hash_passwords(users):
+        """hash_password() for many users at once, spread over the hash pool's workers."""
+        pending = [user for user in users if not user.password.startswith("$2b$")]
+        for user, hashed in zip(pending, hash_passwords([user.password for user in pending])):
+            user.password = hashed
 
     def verify_password(self, password):
-        return bcrypt.checkpw(password.encode('utf-8'), self.password.encode('utf-8'))
+        return check_password(password, self.password)
+
+    def password_needs_rehash(self):
+        # True when the stored hash was made with a different BCRYPT_ROUNDS
+        return needs_rehash(self.password)
+
+    @staticmethod
+    def set_password_hash(db, user_id, hashed_password):
+        execute(db, "UPDATE users SET password = %s WHERE id = %s", (hashed_password, user_id))
+        db.commit()
 
     def save(self, db):
         self.hash_password()
-        cursor = db.cursor()
         # Check for duplicate user
-        cursor.execute(
+        if fetch_one(
+            db,
             "SELECT id FROM users WHERE first_name = %s AND last_name = %s",
             (self.first_name, self.last_name)
-        )
-        if cursor.fetchone():
+        ):
             return False  # Already exists
-        cursor.execute(
+        execute(
+            db,
             "INSERT INTO users (first_name, last_name, password, role) VALUES (%s, %s, %s, %s)",
             (self.first_name, self.last_name, self.password, self.role)
         )
@@ -63,63 +79,103 @@ class User:
         return True
 
     def delete(db, user_id):
-        cursor = db.cursor()
-        cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        cursor = execute(db, "DELETE FROM users WHERE id = %s", (user_id,))
         db.commit()
+        invalidate_user(user_id)
         return cursor.rowcount > 0
     
     def update(db, user_id, new_id=None, new_password=None):
-        cursor = db.cursor()
         if new_id:
-            cursor.execute("UPDATE users SET id = %s WHERE id = %s", (new_id, user_id))
+            execute(db, "UPDATE users SET id = %s WHERE id = %s", (new_id, user_id))
         if new_password:
-            hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            cursor.execute(
+            hashed_password = hash_password(new_password)
+            execute(
+                db,
                 "UPDATE users SET password = %s WHERE id = %s",
                 (hashed_password, new_id if new_id else user_id)
             )
         db.commit()
+        invalidate_user(user_id, new_id)
         return True
 
     def generate_token(self):
+        now = datetime.datetime.utcnow()
         payload = {
             "id": self.id,
             "role": self.role,
-            "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=24)
+            "iat": now,
+            "exp": now + datetime.timedelta(hours=24)
         }
         secret = current_app.config['JWT_SECRET_KEY']  # from main.py
         return jwt.encode(payload, secret, algorithm="HS256")
 
     @classmethod
     def find_by_id(cls, db, user_id):
-        cursor = db.cursor()
-        cursor.execute(
+        row = fetch_one(
+            db,
             "SELECT id, first_name, last_name, password, role FROM users WHERE id = %s",
             (user_id,)
         )
-        row = cursor.fetchone()
         return cls.from_row(row)
 
     @classmethod
     def find_by_name(cls, db, first_name, last_name):
-        cursor = db.cursor()
-        cursor.execute(
+        row = fetch_one(
+            db,
             "SELECT id, first_name, last_name, password, role FROM users WHERE first_name = %s AND last_name = %s",
             (first_name, last_name)
         )
-        row = cursor.fetchone()
         return cls.from_row(row)
 
+    @staticmethod
+    def find_ids_by_names(db, names, chunk_size=400):
+        """{(first_name, last_name): id} for the given name pairs, one query per chunk."""
+        found = {}
+        for i in range(0, len(names), chunk_size):
+            chunk = names[i:i + chunk_size]
+            values = ", ".join(["(%s, %s)"] * len(chunk))
+            rows = fetch_all(
+                db,
+                f"SELECT id, first_name, last_name FROM users WHERE (first_name, last_name) IN (VALUES {values})",
+                tuple(part for name in chunk for part in name)
+            )
+            for row in rows:
+                found[(row["first_name"], row["last_name"])] = row["id"]
+        return found
+
+    @staticmethod
+    def bulk_create(db, users):
+        """
+        Inserts all users in one transaction. Returns the new ids keyed by
+        (first_name, last_name). Call User.hash_passwords() first, before
+        checking out `db`: any password still in plain text is hashed here,
+        with the connection held.
+        """
+        User.hash_passwords(users)
+        execute_many(
+            db,
+            "INSERT INTO users (first_name, last_name, password, role) VALUES (%s, %s, %s, %s)",
+            [(u.first_name, u.last_name, u.password, u.role) for u in users]
+        )
+        ids = User.find_ids_by_names(db, [(u.first_name, u.last_name) for u in users])
+        db.commit()
+        return ids
+
     @classmethod
-    def get_all_players(cls, db):
-        cursor = db.cursor()
-        cursor.execute("SELECT id, first_name, last_name, password, role FROM users WHERE role = 'player'")
-        rows = cursor.fetchall()
-        return [cls.from_row(row).to_dict() for row in rows]
+    def get_all_players(cls, db, page=None):
+        return fetch_page(
+            db, f"SELECT {USER.columns()} FROM users WHERE role = 'player'", (),
+            [("id", "id")], page, USER.row
+        )
 
     @classmethod
-    def get_all_coaches(cls, db):
-        cursor = db.cursor()
-        cursor.execute("SELECT id, first_name, last_name, password, role FROM users WHERE role = 'coach'")
-        rows = cursor.fetchall()
-        return [cls.from_row(row).to_dict() for row in rows]
+    def iter_by_role(cls, db, role):
+        """Streams every user with `role`, ordered by id."""
+        yield from USER.iter(iter_rows(db, f"SELECT {USER.columns()} FROM users WHERE role = %s ORDER BY id", (role,)))
+
+    @classmethod
+    def get_all_coaches(cls, db, page=None):
+        return fetch_page(
+            db, f"SELECT {USER.columns()} FROM users WHERE role = 'coach'", (),
+            [("id", "id")], page, USER.row
+        )
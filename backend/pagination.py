@@ -0,0 +1,96 @@
+# pagination.py
+#
+# Keyset (cursor) pagination for list endpoints. A page is fetched with
+#   WHERE ... AND (k1, k2, ...) > (<last row's keys>) ORDER BY k1, k2, ... LIMIT n + 1
+# (or < and DESC for newest-first lists)
+# so every page costs one index range scan, however deep the client is.
+# The cursor is the last row's sort key, base64-encoded; clients treat it as opaque.
+#
+# Endpoints stay backwards compatible: without `limit` or `cursor` in the
+# query string they return the full list as before.
+
+import json
+import base64
+from dataclasses import dataclass, field
+from query import fetch_all
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+@dataclass
+class PageRequest:
+    limit: int = DEFAULT_LIMIT
+    after: list = None  # sort key of the last row already seen
+
+
+@dataclass
+class Page:
+    items: list = field(default_factory=list)
+    next_cursor: str = None
+    limit: int = DEFAULT_LIMIT
+
+    def to_dict(self):
+        return {"items": self.items, "next_cursor": self.next_cursor, "limit": self.limit}
+
+
+def encode_cursor(values):
+    raw = json.dumps([v if isinstance(v, (int, float)) or v is None else str(v) for v in values])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token, size):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("Invalid cursor.")
+    return values
+
+
+def page_from_args(args):
+    """PageRequest from a request's query string, or None when the client didn't ask for paging."""
+    if "limit" not in args and "cursor" not in args:
+        return None
+    try:
+        limit = int(args.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        raise InvalidCursor("limit must be an integer.")
+    page = PageRequest(limit=max(1, min(limit, MAX_LIMIT)))
+    page.after = args.get("cursor") or None
+    return page
+
+
+def fetch_page(db, sql, params, order_by, page, convert=None, descending=False):
+    """
+    Runs `sql` (which must already have a WHERE clause) one page at a time.
+    `order_by` lists (sql expression, row key) pairs forming a unique sort key;
+    `descending` walks it newest-first (every key DESC).
+    Without a page, returns every row (converted) as a plain list.
+    """
+    convert = convert or dict
+    direction = " DESC" if descending else ""
+    order_sql = " ORDER BY " + ", ".join(expr + direction for expr, _ in order_by)
+    if page is None:
+        return [convert(row) for row in fetch_all(db, sql + order_sql, params)]
+
+    params = tuple(params)
+    if page.after:
+        after = decode_cursor(page.after, len(order_by))
+        columns = ", ".join(expr for expr, _ in order_by)
+        placeholders = ", ".join(["%s"] * len(order_by))
+        sql += f" AND ({columns}) {'<' if descending else '>'} ({placeholders})"
+        params += tuple(after)
+    rows = fetch_all(db, sql + order_sql + " LIMIT %s", params + (page.limit + 1,))
+
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        next_cursor = encode_cursor([rows[-1][key] for _, key in order_by])
+    return Page(items=[convert(row) for row in rows], next_cursor=next_cursor, limit=page.limit)
@@ -0,0 +1,208 @@
+# profiler.py
+#
+# SQL profiling mode (SQL_PROFILE=1). Every statement run through query.py
+# during a request is recorded with its fingerprint (SQL with literals and
+# placeholder lists folded, so "same query, different id" compares equal),
+# parameter count, duration and the model / controller line that issued it.
+# At the end of the request:
+#   - an X-SQL-Profile header summarizes it: statements, DB time, N+1 suspects
+#   - a fingerprint seen SQL_N_PLUS_ONE times or more is logged as N+1
+#   - statements slower than SQL_SLOW_MS are logged, with their EXPLAIN plan
+#     when SQL_EXPLAIN=1
+# The last SQL_PROFILE_WINDOW requests are kept for the rolling report
+# (GET /debug/sql-profile, admins only).
+#
+# When profiling is off nothing is registered, so the hot path is untouched.
+
+import os
+import re
+import sys
+import threading
+import collections
+from functools import lru_cache
+from flask import request
+import query
+from config import SQL_PROFILE, SQL_SLOW_MS, SQL_EXPLAIN, SQL_N_PLUS_ONE, SQL_PROFILE_WINDOW
+
+# Frames in these files are plumbing; the call site is the first frame outside them
+_PLUMBING = {"query.py", "profiler.py", "metrics.py", "pagination.py", "streaming.py", "serializers.py", "contextlib.py"}
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%s|\?|\$\d+")
+_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS_RE = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_SPACE_RE = re.compile(r"\s+")
+
+Statement = collections.namedtuple("Statement", "fingerprint params ms site")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Normalized statement: literals and placeholders become ?, IN / VALUES lists collapse."""
+    text = _SPACE_RE.sub(" ", sql).strip()
+    text = _STRING_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _PLACEHOLDER_RE.sub("?", text)
+    text = _LIST_RE.sub("(...)", text)
+    text = _ROWS_RE.sub("(...)", text)
+    return text
+
+
+def _call_site():
+    frame = sys._getframe(3)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if os.path.basename(filename) not in _PLUMBING and filename.startswith(_BACKEND_DIR):
+            return f"{os.path.relpath(filename, _BACKEND_DIR)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+def _param_count(params):
+    if params and isinstance(params, list) and isinstance(params[0], (tuple, list)):
+        return len(params) * len(params[0])  # execute_many batch
+    return len(params) if params else 0
+
+
+def _explain(db, sql, params):
+    """Query plan for a slow SELECT (plans only; the statement is not run again)."""
+    if sql.split(None, 1)[0].upper() not in ("SELECT", "WITH"):
+        return None
+    raw = getattr(db, "raw", db)
+    try:
+        cursor = raw.cursor()
+        if query.dialect(db) == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + query.translate(sql, "sqlite")[0], params)
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute("EXPLAIN " + sql, params or None)
+        return [list(row.values())[0] if isinstance(row, dict) else row[0] for row in cursor.fetchall()]
+    except Exception as e:
+        return [f"EXPLAIN failed: {e}"]
+
+
+class SQLProfiler:
+    def __init__(self, window, slow_ms, n_plus_one, explain):
+        self.slow_ms = slow_ms
+        self.n_plus_one = n_plus_one
+        self.explain = explain
+        self._local = threading.local()
+        self._requests = collections.deque(maxlen=window)  # (endpoint, [Statement], total ms)
+        self._slow = collections.deque(maxlen=50)
+
+    def record(self, db, sql, params, seconds):
+        statements = getattr(self._local, "statements", None)
+        if statements is None:
+            return
+        ms = seconds * 1000
+        statement = Statement(fingerprint(sql), _param_count(params), ms, _call_site())
+        statements.append(statement)
+        if ms >= self.slow_ms:
+            plan = _explain(db, sql, params) if self.explain else None
+            self._slow.append({
+                "endpoint": request.endpoint, "ms": round(ms, 2), "site": statement.site,
+                "fingerprint": statement.fingerprint, "plan": plan,
+            })
+            print(f"🐢 Slow query ({ms:.1f} ms) at {statement.site}: {statement.fingerprint}")
+            for line in plan or ():
+                print(f"    {line}")
+
+    def start(self):
+        self._local.statements = []
+
+    def finish(self, endpoint):
+        statements = getattr(self._local, "statements", None)
+        self._local.statements = None
+        if statements is None:
+            return None
+        counts = collections.Counter(s.fingerprint for s in statements)
+        suspects = {fp: n for fp, n in counts.items() if n >= self.n_plus_one}
+        for fp, n in suspects.items():
+            sites = sorted({s.site for s in statements if s.fingerprint == fp})
+            print(f"⚠️ Possible N+1 in {endpoint}: {n}x {fp} (from {', '.join(sites)})")
+        total_ms = sum(s.ms for s in statements)
+        self._requests.append((endpoint, statements, total_ms))
+        return len(statements), total_ms, len(counts), suspects
+
+    def report(self):
+        """Aggregates the rolling window per fingerprint and per endpoint."""
+        requests = list(self._requests)
+        by_fp = {}
+        by_endpoint = {}
+        for endpoint, statements, total_ms in requests:
+            ep = by_endpoint.setdefault(endpoint, {"requests": 0, "statements": 0, "db_ms": 0.0, "n_plus_one": 0})
+            ep["requests"] += 1
+            ep["statements"] += len(statements)
+            ep["db_ms"] += total_ms
+            counts = collections.Counter(s.fingerprint for s in statements)
+            if any(n >= self.n_plus_one for n in counts.values()):
+                ep["n_plus_one"] += 1
+            for s in statements:
+                fp = by_fp.setdefault(s.fingerprint, {
+                    "fingerprint": s.fingerprint, "calls": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "max_per_request": 0, "params": s.params, "sites": set(), "endpoints": set(),
+                })
+                fp["calls"] += 1
+                fp["total_ms"] += s.ms
+                fp["max_ms"] = max(fp["max_ms"], s.ms)
+                fp["max_per_request"] = max(fp["max_per_request"], counts[s.fingerprint])
+                fp["sites"].add(s.site)
+                fp["endpoints"].add(endpoint)
+        fingerprints = sorted(by_fp.values(), key=lambda fp: fp["total_ms"], reverse=True)
+        for fp in fingerprints:
+            fp["avg_ms"] = round(fp["total_ms"] / fp["calls"], 3)
+            fp["total_ms"] = round(fp["total_ms"], 3)
+            fp["max_ms"] = round(fp["max_ms"], 3)
+            fp["n_plus_one"] = fp["max_per_request"] >= self.n_plus_one
+            fp["sites"] = sorted(fp["sites"])
+            fp["endpoints"] = sorted(str(e) for e in fp["endpoints"])
+        for ep in by_endpoint.values():
+            ep["avg_statements"] = round(ep["statements"] / ep["requests"], 2)
+            ep["avg_db_ms"] = round(ep["db_ms"] / ep["requests"], 3)
+            del ep["db_ms"]
+        return {
+            "window": len(requests),
+            "slow_ms": self.slow_ms,
+            "n_plus_one_threshold": self.n_plus_one,
+            "fingerprints": fingerprints,
+            "endpoints": by_endpoint,
+            "slow_queries": list(self._slow),
+        }
+
+    def reset(self):
+        self._requests.clear()
+        self._slow.clear()
+
+
+profiler = SQLProfiler(SQL_PROFILE_WINDOW, SQL_SLOW_MS, SQL_N_PLUS_ONE, SQL_EXPLAIN)
+
+
+def report():
+    return profiler.report()
+
+
+def reset():
+    profiler.reset()
+
+
+def instrument(blueprint):
+    """Profiles every request routed to `blueprint` when SQL_PROFILE is on."""
+    if not SQL_PROFILE:
+        return
+    query.add_listener(profiler.record)
+
+    @blueprint.before_request
+    def _start_profile():
+        profiler.start()
+
+    @blueprint.after_request
+    def _finish_profile(response):
+        summary = profiler.finish(request.endpoint)
+        if summary is not None:
+            count, total_ms, distinct, suspects = summary
+            header = f"queries={count}; distinct={distinct}; db_ms={total_ms:.2f}"
+            if suspects:
+                header += f"; n_plus_one={len(suspects)}"
+            response.headers["X-SQL-Profile"] = header
+        return response
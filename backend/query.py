@@ -0,0 +1,169 @@
+# query.py
+#
+# Small execution layer the models use instead of raw cursors.
+# Statements are written once in psycopg2 style (%s placeholders) and
+# rewritten for the connection they run on:
+#   - SQLite: %s -> ?  (sqlite3 then reuses its own compiled-statement cache)
+#   - Postgres: server-side PREPARE once per connection, EXECUTE afterwards
+# Listeners registered with add_listener() see every statement and its
+# duration (metrics.py, profiler.py).
+
+import re
+import time
+import sqlite3
+import weakref
+import itertools
+import threading
+import collections
+from functools import lru_cache
+
+import psycopg2.extras
+
+# Same rules as psycopg2's own formatting: every %s is a parameter, %% is a literal %
+_TOKEN_RE = re.compile(r"%s|%%")
+_PREPARABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "VALUES")
+PREPARED_PER_CONNECTION = 256
+
+_prepared = weakref.WeakKeyDictionary()  # raw pg connection -> OrderedDict(sql -> name)
+_prepared_lock = threading.Lock()
+_names = itertools.count(1)
+_listeners = []
+
+
+def add_listener(fn):
+    """Calls fn(db, sql, params, seconds) after every statement run through this module."""
+    _listeners.append(fn)
+
+
+def _notify(db, sql, params, started):
+    elapsed = time.perf_counter() - started
+    for fn in _listeners:
+        fn(db, sql, params, elapsed)
+
+
+def dialect(db):
+    raw = getattr(db, "raw", db)
+    return "sqlite" if isinstance(raw, sqlite3.Connection) else "postgres"
+
+
+@lru_cache(maxsize=1024)
+def translate(sql, target):
+    """
+    Rewrites a %s-style statement for `target`:
+      "sqlite"   -> qmark placeholders
+      "prepared" -> ($1, $2, ...) body for a Postgres PREPARE, plus the param count
+    Results are cached per distinct statement.
+    """
+    counter = itertools.count(1)
+
+    def repl(match):
+        token = match.group(0)
+        if token == "%%":
+            return "%"
+        return "?" if target == "sqlite" else f"${next(counter)}"
+
+    rewritten = _TOKEN_RE.sub(repl, sql)
+    return rewritten, next(counter) - 1
+
+
+def _prepared_name(raw, sql, cursor):
+    """Returns the name of the statement prepared for `sql` on this connection, preparing it if needed."""
+    with _prepared_lock:
+        statements = _prepared.get(raw)
+        if statements is None:
+            statements = _prepared[raw] = collections.OrderedDict()
+        name = statements.get(sql)
+        if name is not None:
+            statements.move_to_end(sql)
+            return name
+    body, _ = translate(sql, "prepared")
+    name = f"q{next(_names)}"
+    cursor.execute(f"PREPARE {name} AS {body}")
+    with _prepared_lock:
+        statements[sql] = name
+        if len(statements) > PREPARED_PER_CONNECTION:
+            _, oldest = statements.popitem(last=False)
+            cursor.execute(f"DEALLOCATE {oldest}")
+    return name
+
+
+def execute(db, sql, params=()):
+    """Runs one statement and returns the cursor (for rowcount / lastrowid / fetching)."""
+    started = time.perf_counter()
+    try:
+        return _execute(db, sql, params)
+    finally:
+        _notify(db, sql, params, started)
+
+
+def _execute(db, sql, params):
+    raw = getattr(db, "raw", db)
+    cursor = raw.cursor()
+    if isinstance(raw, sqlite3.Connection):
+        cursor.execute(translate(sql, "sqlite")[0], params)
+        return cursor
+    if sql.lstrip()[:6].upper().startswith(_PREPARABLE):
+        name = _prepared_name(raw, sql, cursor)
+        if params:
+            cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cursor.execute(f"EXECUTE {name}")
+        return cursor
+    cursor.execute(sql, params or None)
+    return cursor
+
+
+def insert(db, sql, params=()):
+    """Runs an INSERT and returns the new row's id."""
+    if dialect(db) == "sqlite":
+        return execute(db, sql, params).lastrowid
+    row = execute(db, sql + " RETURNING id", params).fetchone()
+    return row["id"]
+
+
+def execute_many(db, sql, seq_of_params, page_size=500):
+    """Runs one statement for every parameter tuple, batching round trips on Postgres."""
+    raw = getattr(db, "raw", db)
+    cursor = raw.cursor()
+    started = time.perf_counter()
+    try:
+        if isinstance(raw, sqlite3.Connection):
+            cursor.executemany(translate(sql, "sqlite")[0], seq_of_params)
+        else:
+            psycopg2.extras.execute_batch(cursor, sql, seq_of_params, page_size=page_size)
+    finally:
+        _notify(db, sql, seq_of_params, started)
+    return cursor
+
+
+def iter_rows(db, sql, params=(), chunk_size=1000):
+    """
+    Yields rows without materializing the result: a named (server-side) cursor
+    on Postgres, chunked fetchmany() on SQLite. Memory stays at one chunk.
+    """
+    raw = getattr(db, "raw", db)
+    started = time.perf_counter()
+    if isinstance(raw, sqlite3.Connection):
+        cursor = raw.cursor()
+        cursor.execute(translate(sql, "sqlite")[0], params)
+    else:
+        cursor = raw.cursor(name=f"stream_{next(_names)}", cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.itersize = chunk_size
+        cursor.execute(sql, params or None)
+    _notify(db, sql, params, started)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def fetch_one(db, sql, params=()):
+    return execute(db, sql, params).fetchone()
+
+
+def fetch_all(db, sql, params=()):
+    return execute(db, sql, params).fetchall()
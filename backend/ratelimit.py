@@ -0,0 +1,303 @@
+# ratelimit.py
+#
+# Request throttling that runs before any database or bcrypt work.
+#   - token buckets: a limit like "20/minute" lets a burst of 20 through, then
+#     refills at 20 per minute; an empty bucket answers 429 with Retry-After
+#   - /login has a bucket per client IP and one per user_id, plus backoff on
+#     failures: after LOGIN_FREE_FAILURES wrong passwords for a user from one
+#     IP (or LOGIN_IP_FREE_FAILURES from one IP in total) every further
+#     failure doubles the wait, from LOGIN_BACKOFF_BASE up to
+#     LOGIN_BACKOFF_MAX seconds; a successful login clears that count. The
+#     user's count is per IP so that guessing from one address can't lock
+#     the real user out from another
+#   - @rate_limited() on the expensive list endpoints, per caller (JWT id,
+#     else IP), RATE_LIMIT_LIST by default; RATE_LIMIT_ROUTES overrides it
+#     per endpoint ("get_all_teams=30/minute,search_slots=off")
+#
+# State lives in a store: "memory" keeps it in the process (one node, one
+# worker, or limits that may be per worker), "sqlite" in a small file shared
+# by every worker on the host.
+
+import os
+import math
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import collections
+from functools import wraps
+from flask import request
+from flask_jwt_extended import get_jwt
+from metrics import metrics
+from config import (
+    DATABASE_PATH, RATE_LIMIT_ENABLED, RATE_LIMIT_STORE, RATE_LIMIT_PATH, RATE_LIMIT_MAX_KEYS,
+    RATE_LIMIT_TRUSTED_PROXIES, RATE_LIMIT_LIST, RATE_LIMIT_ROUTES,
+    LOGIN_LIMIT_IP, LOGIN_LIMIT_USER, LOGIN_FREE_FAILURES, LOGIN_IP_FREE_FAILURES,
+    LOGIN_BACKOFF_BASE, LOGIN_BACKOFF_MAX, LOGIN_FAILURE_WINDOW,
+)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+Limit = collections.namedtuple("Limit", "rate burst")  # tokens per second, bucket size
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after, message="Too many requests, please retry later."):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_limit(spec):
+    """ "20/minute" -> Limit(rate=1/3, burst=20); "off" (or empty) -> None."""
+    spec = (spec or "").strip().lower()
+    if spec in ("", "off", "0"):
+        return None
+    count, _, period = spec.partition("/")
+    try:
+        count = int(count)
+        seconds = _PERIODS[period.strip() or "second"]
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate limit {spec!r}; expected e.g. 20/minute")
+    return Limit(count / seconds, count)
+
+
+def _parse_routes(spec):
+    routes = {}
+    for part in (spec or "").split(","):
+        if part.strip():
+            endpoint, _, limit = part.partition("=")
+            routes[endpoint.strip()] = parse_limit(limit)
+    return routes
+
+
+# --- stores ---
+
+class MemoryStore:
+    """Per-process state, least recently used keys dropped beyond max_keys."""
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # key -> [a, b]: bucket (tokens, updated) / failures (count, last)
+
+    def _get(self, key, default):
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = default
+            if len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+        return entry
+
+    def take(self, key, limit, now):
+        """Takes a token; returns 0 if one was available, else seconds until there is one."""
+        with self._lock:
+            bucket = self._get("b:" + key, [float(limit.burst), now])
+            tokens = min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return 0.0
+            bucket[0] = tokens
+            return (1 - tokens) / limit.rate
+
+    def failures(self, key, now, window):
+        """(count, time of the last failure), forgetting failures older than `window`."""
+        with self._lock:
+            entry = self._entries.get("f:" + key)
+            if entry is None or now - entry[1] > window:
+                return 0, 0.0
+            return entry[0], entry[1]
+
+    def fail(self, key, now, window):
+        with self._lock:
+            entry = self._get("f:" + key, [0, now])
+            if now - entry[1] > window:
+                entry[0] = 0
+            entry[0] += 1
+            entry[1] = now
+            return entry[0]
+
+    def clear(self, key):
+        with self._lock:
+            self._entries.pop("f:" + key, None)
+
+
+class SQLiteStore:
+    """State in a SQLite file shared by the worker processes of one host."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL);
+    CREATE TABLE IF NOT EXISTS failures (key TEXT PRIMARY KEY, count INTEGER NOT NULL, last REAL NOT NULL);
+    """
+    CLEANUP_EVERY = 1000  # writes between sweeps of stale rows
+
+    def __init__(self, path, idle_after):
+        self.path = path
+        self.idle_after = idle_after  # rows untouched this long are deleted
+        self._local = threading.local()
+        self._writes = 0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # throttle state may be lost in a crash
+            conn.executescript(self.SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _write(self, conn, now):
+        self._writes += 1
+        if self._writes % self.CLEANUP_EVERY == 0:
+            conn.execute("DELETE FROM buckets WHERE updated < ?", (now - self.idle_after,))
+            conn.execute("DELETE FROM failures WHERE last < ?", (now - self.idle_after,))
+
+    def take(self, key, limit, now):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = limit.burst if row is None else min(limit.burst, row[0] + (now - row[1]) * limit.rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / limit.rate
+            if tokens >= 1:
+                tokens -= 1
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)", (key, tokens, now))
+            self._write(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def failures(self, key, now, window):
+        row = self._conn().execute("SELECT count, last FROM failures WHERE key = ?", (key,)).fetchone()
+        if row is None or now - row[1] > window:
+            return 0, 0.0
+        return row[0], row[1]
+
+    def fail(self, key, now, window):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT count, last FROM failures WHERE key = ?", (key,)).fetchone()
+            count = 1 if row is None or now - row[1] > window else row[0] + 1
+            conn.execute("INSERT OR REPLACE INTO failures (key, count, last) VALUES (?, ?, ?)", (key, count, now))
+            self._write(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return count
+
+    def clear(self, key):
+        self._conn().execute("DELETE FROM failures WHERE key = ?", (key,))
+
+
+def _default_path():
+    digest = hashlib.sha1(DATABASE_PATH.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"tennis_club_ratelimit_{digest}.db")
+
+
+def make_store(kind=RATE_LIMIT_STORE):
+    if kind == "sqlite":
+        return SQLiteStore(RATE_LIMIT_PATH or _default_path(), max(LOGIN_FAILURE_WINDOW, LOGIN_BACKOFF_MAX, 3600))
+    if kind != "memory":
+        raise ValueError(f"Unknown RATE_LIMIT_STORE {kind!r}; expected memory or sqlite")
+    return MemoryStore(RATE_LIMIT_MAX_KEYS)
+
+
+# --- limiter ---
+
+def backoff(count, free, base, ceiling):
+    """Seconds a key stays blocked after its `count`-th failure."""
+    if count <= free:
+        return 0.0
+    return min(ceiling, base * 2 ** (count - free - 1))
+
+
+class RateLimiter:
+    def __init__(self, store, enabled=True):
+        self.store = store
+        self.enabled = enabled
+        self.login_ip = parse_limit(LOGIN_LIMIT_IP)
+        self.login_user = parse_limit(LOGIN_LIMIT_USER)
+        self.list_limit = parse_limit(RATE_LIMIT_LIST)
+        self.routes = _parse_routes(RATE_LIMIT_ROUTES)
+
+    def hit(self, name, key, limit):
+        """Takes a token from bucket `name:key`; raises RateLimited when it's empty."""
+        if not self.enabled or limit is None:
+            return
+        wait = self.store.take(f"{name}:{key}", limit, time.time())
+        if wait > 0:
+            metrics.inc("rate_limited_total", 1, (("limit", name),))
+            raise RateLimited(wait)
+
+    def _blocked_for(self, key, free, now):
+        count, last = self.store.failures(key, now, LOGIN_FAILURE_WINDOW)
+        return last + backoff(count, free, LOGIN_BACKOFF_BASE, LOGIN_BACKOFF_MAX) - now
+
+    def check_login(self, ip, user_id):
+        """Runs before the user is loaded or any hash is checked."""
+        if not self.enabled:
+            return
+        self.hit("login-ip", ip, self.login_ip)
+        self.hit("login-user", user_id, self.login_user)
+        now = time.time()
+        wait = max(self._blocked_for(f"login-ip:{ip}", LOGIN_IP_FREE_FAILURES, now),
+                   self._blocked_for(f"login-user:{user_id}:{ip}", LOGIN_FREE_FAILURES, now))
+        if wait > 0:
+            metrics.inc("rate_limited_total", 1, (("limit", "login-backoff"),))
+            raise RateLimited(wait, "Too many failed logins, please retry later.")
+
+    def login_failed(self, ip, user_id):
+        if self.enabled:
+            now = time.time()
+            self.store.fail(f"login-ip:{ip}", now, LOGIN_FAILURE_WINDOW)
+            self.store.fail(f"login-user:{user_id}:{ip}", now, LOGIN_FAILURE_WINDOW)
+
+    def login_succeeded(self, ip, user_id):
+        if self.enabled:
+            self.store.clear(f"login-user:{user_id}:{ip}")
+
+    def route_limit(self, endpoint, default):
+        return self.routes.get(endpoint, default)
+
+
+limiter = RateLimiter(make_store(), RATE_LIMIT_ENABLED)
+
+
+def retry_after_header(seconds):
+    return str(max(1, math.ceil(seconds)))
+
+
+def client_ip():
+    """Caller's address; with RATE_LIMIT_TRUSTED_PROXIES, taken from X-Forwarded-For."""
+    if RATE_LIMIT_TRUSTED_PROXIES:
+        route = request.access_route  # X-Forwarded-For entries, then the peer address
+        return route[max(len(route) - 1 - RATE_LIMIT_TRUSTED_PROXIES, 0)]
+    return request.remote_addr or "-"
+
+
+def rate_limited(limit=None):
+    """
+    Per-caller token bucket for a view, keyed by JWT id when the request has
+    one (put it below @jwt_required()) and by client IP otherwise.
+    `limit` defaults to RATE_LIMIT_LIST; RATE_LIMIT_ROUTES overrides both.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            chosen = limiter.route_limit(view.__name__, parse_limit(limit) if limit else limiter.list_limit)
+            try:
+                caller = f"user-{get_jwt()['id']}"
+            except (RuntimeError, KeyError):
+                caller = f"ip-{client_ip()}"
+            limiter.hit(view.__name__, caller, chosen)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
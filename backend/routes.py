@@ -1,19 +1,102 @@
-from flask import Blueprint, request, jsonify, current_app
+import io
+import csv
+from flask import Blueprint, Response, request, jsonify
 from flask_cors import cross_origin
 from controllers.Users_controller import UserController
 from controllers.Team_controller import TeamController
 from controllers.Lesson_controller import LessonController
 from controllers.Coach_controller import CoachAvailabilityController
+from controllers.Slot_controller import SlotController
+from controllers.Sync_controller import SyncController
+from controllers.Events_controller import EventsController
+from controllers.Announcement_controller import AnnouncementController
 from flask_jwt_extended import jwt_required
-import jwt
+from hashing import HashQueueFull
+from writer import WriteQueueFull
+from events import HubFull
+from pagination import InvalidCursor, page_from_args
+from http_cache import conditional
+from ratelimit import RateLimited, rate_limited, client_ip, retry_after_header
+import metrics
+import profiler
+from auth import has_role
+from config import METRICS_ENABLED, SQL_PROFILE
 
 routes_app = Blueprint('routes_app', __name__)
+metrics.instrument(routes_app)
+profiler.instrument(routes_app)
+
+
+def _flag(name):
+    return request.args.get(name, "").lower() in ("1", "true")
+
+
+@routes_app.errorhandler(HashQueueFull)
+def password_hashing_busy(error):
+    """
+    Too many bcrypt operations are queued; ask the client to retry shortly
+    rather than letting every request worker wait on the hash pool.
+    """
+    return jsonify({"error": "Server is busy, please retry."}), 503, {"Retry-After": "1"}
+
+
+@routes_app.errorhandler(WriteQueueFull)
+def write_queue_full(error):
+    """The SQLite single-writer queue is backed up; shed load instead of queueing more."""
+    return jsonify({"error": "Server is busy, please retry."}), 503, {"Retry-After": "1"}
+
+
+@routes_app.errorhandler(HubFull)
+def event_hub_full(error):
+    """This worker holds as many event streams as it may; the client reconnects (elsewhere) later."""
+    return jsonify({"error": "Too many open event streams, please retry."}), 503, {"Retry-After": "5"}
+
+
+@routes_app.errorhandler(RateLimited)
+def rate_limited_response(error):
+    """A token bucket is empty or a login backoff is running; Retry-After says for how long."""
+    return jsonify({"error": str(error)}), 429, {"Retry-After": retry_after_header(error.retry_after)}
+
+
+@routes_app.errorhandler(InvalidCursor)
+def invalid_cursor(error):
+    return jsonify({"error": str(error)}), 400
+
+
+@routes_app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Prometheus text exposition: request latency per endpoint / status, DB
+    statements and time per request, pool wait and bcrypt time.
+    """
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Not found"}), 404
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@routes_app.route('/debug/sql-profile', methods=['GET'])
+@jwt_required()
+def get_sql_profile():
+    """
+    Admin only, and only while SQL_PROFILE is on: statements of the last
+    SQL_PROFILE_WINDOW requests grouped by fingerprint and endpoint, with N+1
+    suspects and recent slow queries. ?reset=1 starts a new window.
+    """
+    if not SQL_PROFILE:
+        return jsonify({"error": "SQL profiling is disabled."}), 404
+    if not has_role("admin"):
+        return jsonify({"error": "Unauthorized. Only admin can view the SQL profile."}), 403
+    report = profiler.report()
+    if _flag("reset"):
+        profiler.reset()
+    return jsonify(report), 200
 
 # ---------------------------------
 # User Endpoints
 # ---------------------------------
 
 @routes_app.route('/register', methods=['POST'])
+@jwt_required()
 def register_user():
     """
     Admin can register a new user (only 'coach' or 'player').
@@ -26,26 +109,29 @@ def register_user():
     role = data.get("role")
     if not first_name or not last_name or not password or not role:
         return jsonify({"error": "Missing required fields"}), 400
+    # Only admin can register users (checked against the token's principal).
+    return UserController.register_user(first_name, last_name, password, role)
 
-    # Only admin can register users.
-    token = request.headers.get("Authorization")
-    if not token:
-        return jsonify({"error": "Missing token"}), 401
-
-    try:
-        payload = jwt.decode(
-            token.split(" ")[1],
-            current_app.config['JWT_SECRET_KEY'],  # from main.py
-            algorithms=["HS256"]
-        )
-        if payload.get("role") != "admin":
-            return jsonify({"error": "Unauthorized. Only admin can register users."}), 403
-    except jwt.ExpiredSignatureError:
-        return jsonify({"error": "Token expired"}), 401
-    except jwt.InvalidTokenError:
-        return jsonify({"error": "Invalid token"}), 401
 
-    return UserController.register_user(first_name, last_name, password, role)
+@routes_app.route('/users/import', methods=['POST'])
+@jwt_required()
+def import_users():
+    """
+    Admin bulk registration (coaches / players).
+    Accepts a JSON array (or { "users": [...] }) of { "first_name", "last_name", "password", "role" },
+    or CSV with those column headers, as the request body (text/csv) or an uploaded "file".
+    """
+    if "file" in request.files:
+        text = request.files["file"].read().decode("utf-8-sig")
+        rows = list(csv.DictReader(io.StringIO(text)))
+    elif request.mimetype == "text/csv":
+        rows = list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+    else:
+        data = request.get_json(silent=True)
+        rows = data.get("users") if isinstance(data, dict) else data
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        return jsonify({"error": "Expected a list of users (JSON or CSV)."}), 400
+    return UserController.import_users(rows)
 
 
 @routes_app.route('/login', methods=['POST'])
@@ -59,7 +145,7 @@ def login_user():
     password = data.get("password")
     if not user_id or not password:
         return jsonify({"error": "Missing required fields"}), 400
-    return UserController.login_user(user_id, password)
+    return UserController.login_user(user_id, password, client_ip())
 
 
 @routes_app.route('/user', methods=['GET'])
@@ -72,19 +158,31 @@ def get_client():
 
 
 @routes_app.route('/players', methods=['GET'])
+@conditional("users")
+@rate_limited()
 def get_all_players():
     """
     Returns a list of all players.
+    Optional keyset paging: ?limit=<n>&cursor=<next_cursor> returns { "items", "next_cursor", "limit" }.
+    ?stream=true streams the full list for exports.
     """
-    return UserController.get_all_players()
+    if _flag("stream"):
+        return UserController.stream_users("player")
+    return UserController.get_all_players(page_from_args(request.args))
 
 
 @routes_app.route('/coaches', methods=['GET'])
+@conditional("users")
+@rate_limited()
 def get_all_coaches():
     """
     Returns a list of all coaches.
+    Optional keyset paging: ?limit=<n>&cursor=<next_cursor> returns { "items", "next_cursor", "limit" }.
+    ?stream=true streams the full list for exports.
     """
-    return UserController.get_all_coaches()
+    if _flag("stream"):
+        return UserController.stream_users("coach")
+    return UserController.get_all_coaches(page_from_args(request.args))
 
 
 @routes_app.route('/user/<int:user_id>', methods=['PUT'])
@@ -129,19 +227,31 @@ def create_team():
 
 
 @routes_app.route('/teams/<int:team_id>', methods=['GET'])
+@jwt_required()
+@conditional("teams", "team_members", "users")
 def get_team(team_id):
     """
-    Get details of a specific team.
+    Get details of a specific team, including its players and player_count.
     """
     return TeamController.get_team(team_id)
 
 
 @routes_app.route('/teams', methods=['GET'])
+@jwt_required()
+@conditional("teams", "team_members", "users")
+@rate_limited()
 def get_all_teams():
     """
     Get a list of all teams.
+    ?include=players embeds each team's players and player_count (one query for all rosters).
+    Optional keyset paging: ?limit=<n>&cursor=<next_cursor> returns { "items", "next_cursor", "limit" }.
+    ?stream=true streams the full list for exports.
     """
-    return TeamController.get_all_teams()
+    if _flag("stream"):
+        return TeamController.stream_teams()
+    if "players" in request.args.get("include", "").split(","):
+        return TeamController.get_all_teams_with_players(page_from_args(request.args))
+    return TeamController.get_all_teams(page_from_args(request.args))
 
 
 @routes_app.route('/teams/<int:team_id>/players', methods=['POST'])
@@ -160,6 +270,7 @@ def assign_player_to_team(team_id):
 
 @routes_app.route('/teams/<int:team_id>/players', methods=['GET'])
 @jwt_required()
+@conditional("team_members", "users")
 def get_team_players(team_id):
     """
     Get all players assigned to a specific team.
@@ -206,7 +317,27 @@ def add_availability():
     return CoachAvailabilityController.add_availability(coach_id, day, start_time, end_time)
 
 
+@routes_app.route('/coach/availability/template', methods=['POST'])
+@jwt_required()
+def apply_availability_template():
+    """
+    Coach sets a recurring weekly pattern in one go.
+    Expects JSON body: {
+        "entries": [ { "days": ["Monday", "Wednesday", "Friday"], "start_time": "<HH:MM>", "end_time": "<HH:MM>" }, ... ],
+        "mode": "merge" | "replace",   (default "merge")
+        "coach_id": <coach_id>         (admin only)
+    }
+    A single entry may also be given inline as "days" / "start_time" / "end_time".
+    """
+    data = request.get_json(silent=True) or {}
+    entries = data.get("entries")
+    if entries is None and "days" in data:
+        entries = [{key: data.get(key) for key in ("days", "start_time", "end_time")}]
+    return CoachAvailabilityController.apply_template(data.get("coach_id"), entries, data.get("mode", "merge"))
+
+
 @routes_app.route('/coach/availability/<int:coach_id>', methods=['GET'])
+@conditional("coach_availability")
 def get_availability(coach_id):
     """
     Get the availability for a given coach.
@@ -232,22 +363,239 @@ def book_lesson():
     end_time = data.get("end_time")
     if not coach_id or not lesson_date or not start_time or not end_time:
         return jsonify({"error": "Missing required fields"}), 400
+    try:
+        coach_id = int(coach_id)  # the frontend sends ids as strings
+    except (TypeError, ValueError):
+        return jsonify({"error": "coach_id must be an integer."}), 400
     return LessonController.book_lesson(coach_id, lesson_date, start_time, end_time)
 
 
 @routes_app.route('/lessons/player/<int:player_id>', methods=['GET'])
 @jwt_required()
+@rate_limited()
 def get_player_lessons(player_id):
     """
     Get all lessons booked by a player.
+    Filters: ?from=YYYY-MM-DD&to=YYYY-MM-DD&upcoming=true; paging: ?limit=<n>&cursor=<next_cursor>;
+    ?stream=true streams every matching lesson.
     """
-    return LessonController.get_player_lessons(player_id)
+    return LessonController.get_player_lessons(
+        player_id, request.args.get("from"), request.args.get("to"),
+        _flag("upcoming"), page_from_args(request.args), _flag("stream")
+    )
 
 
 @routes_app.route('/lessons/coach/<int:coach_id>', methods=['GET'])
 @jwt_required()
+@rate_limited()
 def get_coach_lessons(coach_id):
     """
     Get all lessons for a coach.
+    Filters: ?from=YYYY-MM-DD&to=YYYY-MM-DD&upcoming=true; paging: ?limit=<n>&cursor=<next_cursor>;
+    ?stream=true streams every matching lesson.
+    """
+    return LessonController.get_coach_lessons(
+        coach_id, request.args.get("from"), request.args.get("to"),
+        _flag("upcoming"), page_from_args(request.args), _flag("stream")
+    )
+
+
+@routes_app.route('/lessons/cancel', methods=['POST'])
+@jwt_required()
+def cancel_lessons():
+    """
+    Admin cancels every lesson in a window at once (rain), records a refund per lesson and notifies
+    the players and coaches through their announcement inboxes.
+    Expects JSON body: {
+        "date_from": "<YYYY-MM-DD>", "date_to": "<YYYY-MM-DD>",   (date_to defaults to date_from)
+        "start_time": "<HH:MM>", "end_time": "<HH:MM>",           (default: the whole day)
+        "coach_id": <coach_id>,                                   (optional: one coach only)
+        "reason": "weather", "dry_run": false                     (dry_run only counts)
+    }
+    Returns { "lessons", "players", "coaches", "minutes", "cancellation_id", "window", "dry_run" }.
+    """
+    data = request.get_json(silent=True) or {}
+    if not data.get("date_from"):
+        return jsonify({"error": "date_from is required"}), 400
+    if data.get("court") is not None:
+        return jsonify({"error": "Courts are not tracked; filter by date, time and coach_id."}), 400
+    coach_id = data.get("coach_id")
+    if coach_id is not None and not isinstance(coach_id, int):
+        return jsonify({"error": "coach_id must be an integer."}), 400
+    reason = str(data.get("reason") or "weather").strip()[:255]
+    return LessonController.cancel_bulk(
+        data["date_from"], data.get("date_to"), data.get("start_time"), data.get("end_time"),
+        coach_id, reason, bool(data.get("dry_run", False))
+    )
+
+
+@routes_app.route('/refunds', methods=['GET'])
+@jwt_required()
+def get_refunds():
+    """
+    Admin: the refund ledger written by bulk cancellations, oldest first.
+    Filters: ?status=pending|settled&cancellation_id=<id>; paging: ?limit=<n>&cursor=<next_cursor>.
+    """
+    return LessonController.get_refunds(
+        request.args.get("status"), request.args.get("cancellation_id", type=int), page_from_args(request.args)
+    )
+
+
+# ---------------------------------
+# Open Slot Search
+# ---------------------------------
+
+@routes_app.route('/slots', methods=['GET'])
+@jwt_required()
+@rate_limited()
+def search_slots():
+    """
+    Free lesson slots across coaches.
+    Query params: start_date=YYYY-MM-DD, end_date=YYYY-MM-DD (optional), duration=<minutes, default 60>,
+                  coach_id=<id> (repeatable or comma separated), step=<minutes, default 15>, limit=<n, default 200>
+    """
+    coach_ids = [int(c) for value in request.args.getlist("coach_id") for c in value.split(",") if c.strip().isdigit()]
+    start_date = request.args.get("start_date")
+    if not start_date:
+        return jsonify({"error": "start_date is required"}), 400
+    return SlotController.search(
+        start_date,
+        request.args.get("end_date"),
+        request.args.get("duration", 60, type=int),
+        coach_ids,
+        request.args.get("step", 15, type=int),
+        request.args.get("limit", 200, type=int),
+    )
+
+
+# ---------------------------------
+# Announcements
+# ---------------------------------
+
+@routes_app.route('/announcements', methods=['POST'])
+@jwt_required()
+def create_announcement():
+    """
+    Admin or coach posts an announcement; it's delivered to the recipients' inboxes in the background (202).
+    Expects JSON body: {
+        "title": "", "content": "", "important": false,
+        "audience": "club" | "teams" | "players",   (default "club")
+        "team_ids": [<team_id>, ...],               (audience "teams"; coaches: their own teams)
+        "coach_id": <coach_id>                      (audience "players": that coach's players; coaches: themselves)
+    }
+    """
+    data = request.get_json(silent=True) or {}
+    title = (data.get("title") or "").strip()
+    content = (data.get("content") or "").strip()
+    if not title or not content:
+        return jsonify({"error": "Title and content are required."}), 400
+    team_ids = data.get("team_ids")
+    if team_ids is not None and not isinstance(team_ids, list):
+        return jsonify({"error": "team_ids must be a list."}), 400
+    return AnnouncementController.create_announcement(
+        title, content, data.get("important", False), data.get("audience", "club"), team_ids, data.get("coach_id")
+    )
+
+
+@routes_app.route('/announcements', methods=['GET'])
+@jwt_required()
+@rate_limited()
+def get_announcements():
+    """
+    The caller's inbox, newest first; read_at is null while unread.
+    Optional keyset paging: ?limit=<n>&cursor=<next_cursor> returns { "items", "next_cursor", "limit" }.
+    """
+    return AnnouncementController.get_inbox(page_from_args(request.args))
+
+
+@routes_app.route('/announcements/unread_count', methods=['GET'])
+@jwt_required()
+def get_unread_announcements():
+    """
+    Number of unread announcements in the caller's inbox (for the badge): { "unread": <n> }.
+    """
+    return AnnouncementController.unread_count()
+
+
+@routes_app.route('/announcements/read_all', methods=['POST'])
+@jwt_required()
+def mark_all_announcements_read():
+    """
+    Marks every announcement in the caller's inbox as read.
+    """
+    return AnnouncementController.mark_all_read()
+
+
+@routes_app.route('/announcements/<int:announcement_id>', methods=['GET'])
+@jwt_required()
+def get_announcement(announcement_id):
+    """
+    One announcement: the inbox entry for a recipient; with recipients / delivered_at for its author or an admin.
+    """
+    return AnnouncementController.get_announcement(announcement_id)
+
+
+@routes_app.route('/announcements/<int:announcement_id>/read', methods=['POST'])
+@jwt_required()
+def mark_announcement_read(announcement_id):
+    """
+    Marks one announcement in the caller's inbox as read.
+    """
+    return AnnouncementController.mark_read(announcement_id)
+
+
+@routes_app.route('/announcements/<int:announcement_id>', methods=['DELETE'])
+@jwt_required()
+def delete_announcement(announcement_id):
+    """
+    Its author or an admin can delete an announcement; it disappears from every inbox.
+    """
+    return AnnouncementController.delete_announcement(announcement_id)
+
+
+# ---------------------------------
+# Delta Sync
+# ---------------------------------
+
+@routes_app.route('/sync', methods=['GET'])
+@jwt_required()
+def sync_changes():
+    """
+    Lessons, availability, teams and rosters changed since ?since=<next token from the previous sync>,
+    limited to what the caller can see: { "changes": [{ "table", "op", "id", "row" }], "next", "more" }.
+    Without ?since (first sync) returns only a token and full_resync: true; load the lists, then sync from it.
+    410 with full_resync: true when the token is older than the compacted log.
+    """
+    return SyncController.sync(request.args.get("since") or None)
+
+
+@routes_app.route('/sync/compact', methods=['POST'])
+@jwt_required()
+def compact_change_log():
+    """
+    Admin can compact the change log now instead of waiting for the periodic run.
+    Optional JSON body: { "retention_days": <n> } (default CHANGE_LOG_RETENTION_DAYS).
+    """
+    data = request.get_json(silent=True) or {}
+    retention_days = data.get("retention_days")
+    if retention_days is not None and (not isinstance(retention_days, (int, float)) or retention_days < 0):
+        return jsonify({"error": "retention_days must be a non-negative number."}), 400
+    return SyncController.compact(retention_days)
+
+
+# ---------------------------------
+# Server-Sent Events
+# ---------------------------------
+
+@routes_app.route('/events', methods=['GET'])
+@jwt_required(locations=["headers", "query_string"])
+def subscribe_events():
+    """
+    Event stream (text/event-stream) of changes to the given topics:
+    ?topic=lessons:coach:<id>|lessons:player:<id>|availability:coach:<id>|team:<id>|teams (repeatable).
+    Without topics the caller gets their own lessons, availability and teams.
+    EventSource can't send headers, so the JWT may be passed as ?token=<jwt>.
+    Each "change" event's id is a /sync token: fetch the rows with /sync?since=<last id>.
     """
-    return LessonController.get_coach_lessons(coach_id)
+    topics = [t.strip() for value in request.args.getlist("topic") for t in value.split(",") if t.strip()]
+    return EventsController.subscribe(topics)
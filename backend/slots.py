@@ -0,0 +1,136 @@
+# slots.py
+#
+# Open-slot search across coaches. Weekly availability comes from the cached
+# per-coach bitmaps (weekmap.py) and is expanded into concrete dates; booked
+# lessons are cleared from the day's bits and every candidate start is one
+# mask test. Searches whose step / duration aren't multiples of the bitmap
+# bucket fall back to a sorted interval sweep per (coach, date). Lessons in
+# range are loaded a week at a time, so cost grows with the number of
+# intervals, not with round trips.
+
+import datetime
+from collections import defaultdict
+from clock import format_minutes
+from weekmap import weekmaps, merge_intervals, aligned, span_mask, touch_mask
+from query import fetch_all
+
+MAX_RANGE_DAYS = 92
+MAX_LIMIT = 1000  # slots per search
+LOAD_DAYS = 7
+
+
+def subtract_intervals(free, busy):
+    """free - busy, both sorted and merged. Linear sweep over the two lists."""
+    result = []
+    i = 0
+    for start, end in free:
+        cursor = start
+        while i < len(busy) and busy[i][1] <= cursor:
+            i += 1
+        j = i
+        while j < len(busy) and busy[j][0] < end:
+            if busy[j][0] > cursor:
+                result.append((cursor, busy[j][0]))
+            cursor = max(cursor, busy[j][1])
+            j += 1
+        if cursor < end:
+            result.append((cursor, end))
+    return result
+
+
+def _coach_filter(coach_ids):
+    if not coach_ids:
+        return "", ()
+    return f" AND u.id IN ({', '.join(['%s'] * len(coach_ids))})", tuple(coach_ids)
+
+
+def _load_coaches(db, coach_ids):
+    """coach_id -> display name."""
+    coach_filter, params = _coach_filter(coach_ids)
+    rows = fetch_all(
+        db,
+        "SELECT u.id, u.first_name, u.last_name FROM users u WHERE u.role = 'coach'" + coach_filter,
+        params
+    )
+    return {row["id"]: f"{row['first_name']} {row['last_name']}" for row in rows}
+
+
+def _load_booked(db, coach_ids, first_day, last_day):
+    """(coach_id, 'YYYY-MM-DD') -> [(start, end)] for lessons between the two dates."""
+    coach_filter, params = _coach_filter(coach_ids)
+    rows = fetch_all(
+        db,
+        "SELECT l.coach_id, l.lesson_date, l.start_time, l.end_time "
+        "FROM private_lessons l JOIN users u ON u.id = l.coach_id "
+        "WHERE l.lesson_date >= %s AND l.lesson_date <= %s" + coach_filter,
+        (first_day.isoformat(), last_day.isoformat()) + params
+    )
+    booked = defaultdict(list)
+    for row in rows:
+        booked[(row["coach_id"], str(row["lesson_date"]))].append((row["start_time"], row["end_time"]))
+    return booked
+
+
+def find_open_slots(db, start_date, end_date, duration, coach_ids=None, step=15, limit=200):
+    """
+    Free slots of `duration` minutes between start_date and end_date (inclusive),
+    ordered by date, start time and coach. Slot starts are aligned to `step` minutes.
+    Returns (slots, truncated). `limit` must be 1 to MAX_LIMIT.
+    """
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"limit must be 1 to {MAX_LIMIT}, got {limit}")
+    names = _load_coaches(db, coach_ids)
+    by_weekday = defaultdict(list)  # weekday -> [(coach_id, WeekMap)]
+    for coach_id, week in weekmaps.get_many(db, list(names)).items():
+        for weekday in week.windows:
+            by_weekday[weekday].append((coach_id, week))
+    use_bits = aligned(step, duration)
+
+    slots = []
+    day = start_date
+    booked, booked_until = {}, start_date - datetime.timedelta(days=1)
+    while day <= end_date:
+        iso = day.isoformat()
+        if day.weekday() not in by_weekday:
+            day += datetime.timedelta(days=1)
+            continue
+        if day > booked_until:
+            # Lessons are loaded a week at a time, so a small `limit` only reads the first few days
+            booked_until = min(day + datetime.timedelta(days=LOAD_DAYS - 1), end_date)
+            booked = _load_booked(db, coach_ids, day, booked_until)
+        todays = []
+        weekday = day.weekday()
+        for coach_id, week in by_weekday[weekday]:
+            busy = booked.get((coach_id, iso))
+            windows = week.windows[weekday]
+            if use_bits:
+                free = week.bits
+                for start, end in busy or ():
+                    free &= ~touch_mask(weekday, start, end)
+                for start, end in windows:
+                    slot = -(-start // step) * step  # first step-aligned start inside the window
+                    while slot + duration <= end:
+                        mask = span_mask(weekday, slot, slot + duration)
+                        if free & mask == mask:
+                            todays.append((slot, coach_id))
+                        slot += step
+                continue
+            free = subtract_intervals(windows, merge_intervals(busy)) if busy else windows
+            for start, end in free:
+                slot = -(-start // step) * step
+                while slot + duration <= end:
+                    todays.append((slot, coach_id))
+                    slot += step
+        todays.sort()
+        for slot, coach_id in todays:
+            if len(slots) == limit:
+                return slots, True
+            slots.append({
+                "coach_id": coach_id,
+                "coach_name": names[coach_id],
+                "date": iso,
+                "start_time": format_minutes(slot),
+                "end_time": format_minutes(slot + duration),
+            })
+        day += datetime.timedelta(days=1)
+    return slots, False
@@ -0,0 +1,54 @@
+# streaming.py
+#
+# Streaming JSON array responses for large exports. Rows come from
+# query.iter_rows (server-side cursor / chunked fetch), are encoded one at a
+# time and flushed in chunks, so peak memory doesn't depend on result size.
+# The database connection is checked out before the response starts and held
+# until the body has been sent.
+
+from flask import Response, jsonify, stream_with_context
+from database import get_db_connection
+from serializers import dumps
+
+CHUNK_BYTES = 64 * 1024
+
+
+def json_array_chunks(items):
+    """Yields a JSON array ("[...]") as byte chunks of roughly CHUNK_BYTES."""
+    buffer = [b"["]
+    size = 1
+    first = True
+    for item in items:
+        encoded = dumps(item)
+        if not first:
+            buffer.append(b",")
+        buffer.append(encoded)
+        first = False
+        size += len(encoded) + 1
+        if size >= CHUNK_BYTES:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    buffer.append(b"]")
+    yield b"".join(buffer)
+
+
+def stream_query(fetch, *args):
+    """
+    Streams `fetch(db, *args)` (a generator of dicts) as a JSON array.
+    The pooled connection is checked out before the response starts, so an
+    exhausted pool answers 503 rather than breaking a stream already sent as
+    200; it goes back to the pool when the body ends or the response is closed.
+    """
+    db = get_db_connection()
+    if db is None:
+        return jsonify({"error": "Server is busy, please retry."}), 503, {"Retry-After": "1"}
+
+    def generate():
+        try:
+            yield from json_array_chunks(fetch(db, *args))
+        finally:
+            db.close()
+
+    response = Response(stream_with_context(generate()), mimetype="application/json")
+    response.call_on_close(db.close)  # the body may never be iterated
+    return response
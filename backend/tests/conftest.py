@@ -0,0 +1,93 @@
+# Tests run against a throwaway SQLite database, migrated once per session.
+# The environment is set before any app module is imported, since config.py
+# reads it at import time. Every test that takes `db` (or `client`) starts
+# from empty tables.
+
+import os
+import sys
+import sqlite3
+import tempfile
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix="tennis_club_tests_")
+DATABASE = os.path.join(_TMP, "tennis_club.db")
+os.environ["DATABASE_URL"] = "sqlite:///" + DATABASE
+os.environ["CHANGE_COUNTER_PATH"] = os.path.join(_TMP, "counters.bin")
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["BCRYPT_WORKERS"] = "0"
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import init_db, get_db_connection  # noqa: E402
+from counters import bump, TABLES  # noqa: E402
+from hashing import hash_password  # noqa: E402
+from query import insert  # noqa: E402
+from clock import to_minutes  # noqa: E402
+
+init_db()
+
+
+def _empty_tables():
+    conn = sqlite3.connect(DATABASE)
+    try:
+        conn.execute("PRAGMA foreign_keys = OFF")
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name NOT IN ('schema_migrations', 'change_log_state') AND name NOT LIKE 'sqlite_%'"
+        )]
+        for table in tables:
+            conn.execute(f"DELETE FROM {table}")
+        conn.execute("DELETE FROM sqlite_sequence")
+        conn.execute("UPDATE change_log_state SET watermark_txid = 0, watermark = 0")
+        conn.commit()
+    finally:
+        conn.close()
+    bump(*TABLES)  # retire cached principals and weekmaps
+
+
+@pytest.fixture
+def db():
+    _empty_tables()
+    conn = get_db_connection()
+    yield conn
+    conn.rollback()
+    conn.close()
+
+
+@pytest.fixture(scope="session")
+def app():
+    from main import create_app
+    return create_app({"TESTING": True})
+
+
+@pytest.fixture
+def client(app, db):
+    return app.test_client()
+
+
+def add_user(db, role, first_name=None, last_name=None, password="pw"):
+    """Inserts a user directly and returns its id."""
+    user_id = insert(
+        db,
+        "INSERT INTO users (first_name, last_name, password, role) VALUES (%s, %s, %s, %s)",
+        (first_name or role.title(), last_name or f"User{os.urandom(3).hex()}", hash_password(password), role)
+    )
+    db.commit()
+    return user_id
+
+
+def add_availability(db, coach_id, day, start_time, end_time):
+    insert(
+        db,
+        "INSERT INTO coach_availability (coach_id, day, start_time, end_time) VALUES (%s, %s, %s, %s)",
+        (coach_id, day, to_minutes(start_time), to_minutes(end_time))
+    )
+    db.commit()
+    bump("coach_availability")
+
+
+def login(client, user_id, password="pw"):
+    """Headers carrying a fresh token for `user_id`."""
+    response = client.post("/login", json={"user_id": user_id, "password": password})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return {"Authorization": "Bearer " + response.get_json()["token"]}
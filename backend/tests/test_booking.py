@@ -0,0 +1,134 @@
+import sqlite3
+import pytest
+import booking
+from models.Lesson import Lesson
+from query import execute, fetch_one, insert
+from conftest import add_user, add_availability, login
+
+MONDAY = "2030-01-07"
+
+
+@pytest.fixture
+def coach_and_player(db):
+    coach_id = add_user(db, "coach")
+    player_id = add_user(db, "player")
+    add_availability(db, coach_id, "Monday", "09:00", "12:00")
+    return coach_id, player_id
+
+
+def _lesson(coach_id, start="10:00", end="11:00", day=MONDAY):
+    return {"coach_id": coach_id, "lesson_date": day, "start_time": start, "end_time": end}
+
+
+class TestBookLessonRoute:
+    def test_int_coach_id(self, client, coach_and_player):
+        coach_id, player_id = coach_and_player
+        response = client.post("/lessons", json=_lesson(coach_id), headers=login(client, player_id))
+        assert response.status_code == 201
+        assert response.get_json()["lesson"]["coach_id"] == coach_id
+
+    def test_string_coach_id(self, client, coach_and_player):
+        # The frontend sends ids as strings
+        coach_id, player_id = coach_and_player
+        response = client.post("/lessons", json=_lesson(str(coach_id)), headers=login(client, player_id))
+        assert response.status_code == 201
+        assert response.get_json()["lesson"]["coach_id"] == coach_id
+
+    def test_non_integer_coach_id(self, client, coach_and_player):
+        _, player_id = coach_and_player
+        response = client.post("/lessons", json=_lesson("two"), headers=login(client, player_id))
+        assert response.status_code == 400
+
+
+class TestBookingEngine:
+    def test_books_inside_availability(self, db, coach_and_player):
+        coach_id, player_id = coach_and_player
+        lesson = booking.book_lesson(db, player_id, coach_id, MONDAY, "10:00", "11:00")
+        assert lesson.id is not None
+        assert (lesson.start_time, lesson.end_time) == (600, 660)
+        assert fetch_one(db, "SELECT COUNT(*) AS n FROM private_lessons")["n"] == 1
+
+    def test_overlap_with_coach_lesson(self, db, coach_and_player):
+        coach_id, player_id = coach_and_player
+        other_player = add_user(db, "player")
+        booking.book_lesson(db, player_id, coach_id, MONDAY, "10:00", "11:00")
+        with pytest.raises(booking.SlotTaken, match="already booked"):
+            booking.book_lesson(db, other_player, coach_id, MONDAY, "10:30", "11:30")
+
+    def test_back_to_back_lessons(self, db, coach_and_player):
+        coach_id, player_id = coach_and_player
+        other_player = add_user(db, "player")
+        booking.book_lesson(db, player_id, coach_id, MONDAY, "10:00", "11:00")
+        booking.book_lesson(db, other_player, coach_id, MONDAY, "11:00", "12:00")
+
+    def test_player_double_booking(self, db, coach_and_player):
+        coach_id, player_id = coach_and_player
+        other_coach = add_user(db, "coach")
+        add_availability(db, other_coach, "Monday", "09:00", "12:00")
+        booking.book_lesson(db, player_id, coach_id, MONDAY, "10:00", "11:00")
+        with pytest.raises(booking.SlotTaken, match="You already have"):
+            booking.book_lesson(db, player_id, other_coach, MONDAY, "10:30", "11:30")
+
+    @pytest.mark.parametrize("day, start, end", [
+        (MONDAY, "11:30", "12:30"),        # runs past the window
+        (MONDAY, "08:00", "09:00"),        # before it
+        (MONDAY, "08:50", "09:40"),        # starts before it, off the 15-minute buckets
+        ("2030-01-08", "10:00", "11:00"),  # Tuesday: no window
+    ])
+    def test_outside_availability(self, db, coach_and_player, day, start, end):
+        coach_id, player_id = coach_and_player
+        with pytest.raises(booking.CoachUnavailable):
+            booking.book_lesson(db, player_id, coach_id, day, start, end)
+
+    def test_unaligned_times_inside_availability(self, db, coach_and_player):
+        coach_id, player_id = coach_and_player
+        assert booking.book_lesson(db, player_id, coach_id, MONDAY, "09:10", "09:50").id is not None
+
+    def test_rejects_bad_input(self, db, coach_and_player):
+        coach_id, player_id = coach_and_player
+        with pytest.raises(booking.BookingError, match="end after"):
+            booking.book_lesson(db, player_id, coach_id, MONDAY, "11:00", "10:00")
+        with pytest.raises(booking.BookingError, match="Invalid time"):
+            booking.book_lesson(db, player_id, coach_id, MONDAY, "ten", "11:00")
+        with pytest.raises(booking.BookingError, match="Coach not found"):
+            booking.book_lesson(db, player_id, player_id, MONDAY, "10:00", "11:00")
+
+    def test_database_guard_reports_slot_taken(self, db, coach_and_player, monkeypatch):
+        # A concurrent booking that passed the checks is stopped by the trigger
+        coach_id, player_id = coach_and_player
+        other_player = add_user(db, "player")
+        booking.book_lesson(db, player_id, coach_id, MONDAY, "10:00", "11:00")
+        monkeypatch.setattr(Lesson, "is_booked", staticmethod(lambda *args: False))
+        with pytest.raises(booking.SlotTaken):
+            booking.book_lesson(db, other_player, coach_id, MONDAY, "10:30", "11:30")
+        assert fetch_one(db, "SELECT COUNT(*) AS n FROM private_lessons")["n"] == 1
+
+
+class TestOverlapTriggers:
+    def _insert(self, db, coach_id, player_id, start, end):
+        lesson_id = insert(
+            db,
+            "INSERT INTO private_lessons (player_id, coach_id, lesson_date, start_time, end_time) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            (player_id, coach_id, MONDAY, start, end)
+        )
+        db.commit()
+        return lesson_id
+
+    def test_insert(self, db, coach_and_player):
+        coach_id, player_id = coach_and_player
+        self._insert(db, coach_id, player_id, 600, 660)
+        with pytest.raises(sqlite3.IntegrityError):
+            self._insert(db, coach_id, player_id, 630, 690)
+        db.rollback()
+
+    def test_update(self, db, coach_and_player):
+        coach_id, player_id = coach_and_player
+        self._insert(db, coach_id, player_id, 600, 660)
+        later = self._insert(db, coach_id, player_id, 660, 720)
+        with pytest.raises(sqlite3.IntegrityError):
+            execute(db, "UPDATE private_lessons SET start_time = 630 WHERE id = %s", (later,))
+        db.rollback()
+        # Moving a lesson within its own slot is not an overlap
+        execute(db, "UPDATE private_lessons SET end_time = 705 WHERE id = %s", (later,))
+        db.commit()
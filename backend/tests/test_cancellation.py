@@ -0,0 +1,130 @@
+import pytest
+import cancellation
+from cancellation import CancellationError, cancel_lessons, parse_window
+from query import fetch_all, fetch_one, insert
+from conftest import add_user, login
+
+MONDAY, TUESDAY = "2030-01-07", "2030-01-08"
+
+
+def _count(db, table):
+    return fetch_one(db, f"SELECT COUNT(*) AS n FROM {table}")["n"]
+
+
+def _add_lesson(db, coach_id, player_id, day, start, end):
+    lesson_id = insert(
+        db,
+        "INSERT INTO private_lessons (player_id, coach_id, lesson_date, start_time, end_time) "
+        "VALUES (%s, %s, %s, %s, %s)",
+        (player_id, coach_id, day, start, end)
+    )
+    db.commit()
+    return lesson_id
+
+
+@pytest.fixture
+def rainy_monday(db):
+    """Two coaches with lessons on Monday morning and afternoon, one on Tuesday."""
+    admin_id = add_user(db, "admin")
+    coaches = [add_user(db, "coach"), add_user(db, "coach")]
+    players = [add_user(db, "player"), add_user(db, "player")]
+    lessons = {
+        "morning": _add_lesson(db, coaches[0], players[0], MONDAY, 540, 600),
+        "other_coach": _add_lesson(db, coaches[1], players[1], MONDAY, 570, 660),
+        "afternoon": _add_lesson(db, coaches[0], players[1], MONDAY, 900, 960),
+        "tuesday": _add_lesson(db, coaches[0], players[0], TUESDAY, 540, 600),
+    }
+    return admin_id, coaches, players, lessons
+
+
+def _remaining(db):
+    return {row["id"] for row in fetch_all(db, "SELECT id FROM private_lessons")}
+
+
+class TestParseWindow:
+    def test_whole_day_by_default(self):
+        first, last, start, end = parse_window(MONDAY)
+        assert (first, last, start, end) == (first, first, 0, 24 * 60)
+
+    @pytest.mark.parametrize("args", [
+        (TUESDAY, MONDAY),                      # ends before it starts
+        (MONDAY, "2030-02-07"),                 # longer than BULK_CANCEL_MAX_DAYS
+        (MONDAY, None, "12:00", "09:00"),       # empty time range
+    ])
+    def test_rejects(self, args):
+        with pytest.raises(CancellationError):
+            parse_window(*args)
+
+
+class TestCancelLessons:
+    def test_cancels_the_window_and_records_refunds(self, db, rainy_monday):
+        admin_id, coaches, players, lessons = rainy_monday
+        result = cancel_lessons(db, admin_id, *parse_window(MONDAY, None, "09:30", "12:00"))
+        assert result["cancellation_id"] is not None
+        assert (result["lessons"], result["players"], result["coaches"], result["minutes"]) == (2, 2, 2, 150)
+        assert _remaining(db) == {lessons["afternoon"], lessons["tuesday"]}
+
+        refunds = fetch_all(db, "SELECT lesson_id, minutes, status FROM lesson_refunds ORDER BY lesson_id")
+        assert [(r["lesson_id"], r["minutes"], r["status"]) for r in refunds] == [
+            (lessons["morning"], 60, "pending"), (lessons["other_coach"], 90, "pending")
+        ]
+        announcement = fetch_one(db, "SELECT audience, cancellation_id FROM announcements")
+        assert dict(announcement) == {"audience": "cancellation", "cancellation_id": result["cancellation_id"]}
+        assert fetch_one(db, "SELECT lessons FROM lesson_cancellations")["lessons"] == 2
+
+    def test_one_coach(self, db, rainy_monday):
+        admin_id, coaches, players, lessons = rainy_monday
+        result = cancel_lessons(db, admin_id, *parse_window(MONDAY), coach_id=coaches[0])
+        assert result["lessons"] == 2
+        assert _remaining(db) == {lessons["other_coach"], lessons["tuesday"]}
+
+    def test_dry_run_changes_nothing(self, db, rainy_monday):
+        admin_id, coaches, players, lessons = rainy_monday
+        result = cancel_lessons(db, admin_id, *parse_window(MONDAY), dry_run=True)
+        assert result == {"lessons": 3, "players": 2, "coaches": 2, "minutes": 210, "cancellation_id": None}
+        assert _remaining(db) == set(lessons.values())
+        assert _count(db, "lesson_refunds") == _count(db, "lesson_cancellations") == _count(db, "announcements") == 0
+
+    def test_repeat_run_is_a_no_op(self, db, rainy_monday):
+        admin_id, coaches, players, lessons = rainy_monday
+        window = parse_window(MONDAY)
+        assert cancel_lessons(db, admin_id, *window)["lessons"] == 3
+        again = cancel_lessons(db, admin_id, *window)
+        assert again == {"lessons": 0, "players": 0, "coaches": 0, "minutes": 0, "cancellation_id": None}
+        assert _count(db, "lesson_refunds") == 3
+        assert _count(db, "lesson_cancellations") == _count(db, "announcements") == 1
+
+    def test_refuses_more_than_the_maximum(self, db, rainy_monday, monkeypatch):
+        admin_id, coaches, players, lessons = rainy_monday
+        monkeypatch.setattr(cancellation, "BULK_CANCEL_MAX_LESSONS", 2)
+        with pytest.raises(CancellationError, match="at most 2"):
+            cancel_lessons(db, admin_id, *parse_window(MONDAY))
+        assert _remaining(db) == set(lessons.values())
+        assert _count(db, "lesson_refunds") == 0
+        # A narrower window gets through
+        assert cancel_lessons(db, admin_id, *parse_window(MONDAY, None, "14:00"))["lessons"] == 1
+
+
+class TestCancelRoute:
+    def test_admin_only(self, client, rainy_monday, db):
+        coach_id = rainy_monday[1][0]
+        response = client.post("/lessons/cancel", json={"date_from": MONDAY}, headers=login(client, coach_id))
+        assert response.status_code == 403
+        assert len(_remaining(db)) == 4
+
+    def test_cancels(self, client, rainy_monday, db):
+        admin_id, coaches, players, lessons = rainy_monday
+        headers = login(client, admin_id)
+        response = client.post("/lessons/cancel", json={"date_from": MONDAY, "dry_run": True}, headers=headers)
+        assert response.status_code == 200
+        assert response.get_json()["lessons"] == 3
+        response = client.post("/lessons/cancel", json={"date_from": MONDAY, "coach_id": coaches[1]}, headers=headers)
+        assert response.get_json()["lessons"] == 1
+        refunds = client.get("/refunds", headers=headers).get_json()
+        assert [refund["lesson_id"] for refund in refunds] == [lessons["other_coach"]]
+
+    def test_bad_window(self, client, rainy_monday):
+        admin_id = rainy_monday[0]
+        response = client.post("/lessons/cancel", json={"date_from": TUESDAY, "date_to": MONDAY},
+                               headers=login(client, admin_id))
+        assert response.status_code == 400
@@ -0,0 +1,18 @@
+import pytest
+import database
+
+
+def test_postgres_requires_a_counter_path(monkeypatch):
+    def migrate_called():
+        raise AssertionError("migrations ran")
+
+    monkeypatch.setattr(database, "is_postgres", lambda: True)
+    monkeypatch.setattr(database, "CHANGE_COUNTER_PATH", "")
+    monkeypatch.setattr("migrations.migrate", migrate_called)
+    with pytest.raises(RuntimeError, match="CHANGE_COUNTER_PATH"):
+        database.init_db()
+
+
+def test_sqlite_starts_without_one(monkeypatch):
+    monkeypatch.setattr(database, "CHANGE_COUNTER_PATH", "")
+    database.init_db()
@@ -0,0 +1,50 @@
+import time
+import unittest
+
+from hashing import HashPool, HashQueueFull
+
+
+def _slow(seconds):
+    time.sleep(seconds)
+    return "done", seconds
+
+
+class HashPoolTimeoutTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = HashPool(workers=1, queue_size=0, timeout=0.2)
+
+    def tearDown(self):
+        if self.pool._executor is not None:
+            self.pool._executor.shutdown(wait=True, cancel_futures=True)
+
+    def test_timeout_raises_queue_full(self):
+        with self.assertRaises(HashQueueFull):
+            self.pool.run(_slow, 1.0)
+        self.assertEqual(self.pool.snapshot()["timed_out"], 1)
+        self.assertEqual(self.pool.snapshot()["in_flight"], 0)
+
+    def test_running_hash_keeps_its_slot_until_done(self):
+        with self.assertRaises(HashQueueFull):
+            self.pool.run(_slow, 0.5)
+        # The timed-out hash still occupies the only worker
+        with self.assertRaises(HashQueueFull):
+            self.pool.run(_slow, 0)
+        time.sleep(0.6)
+        self.assertEqual(self.pool.run(_slow, 0), "done")
+
+
+class HashPoolMapTest(unittest.TestCase):
+    def test_bulk_hashes_release_their_slots(self):
+        pool = HashPool(workers=2, queue_size=0, timeout=5)
+        try:
+            self.assertEqual(pool.map(_slow, [(0.01,)] * 6), ["done"] * 6)
+            time.sleep(0.1)  # slots are released by done callbacks
+            self.assertEqual(pool.snapshot()["in_flight"], 0)
+            self.assertEqual(pool.run(_slow, 0), "done")
+            self.assertEqual(pool.run(_slow, 0), "done")
+        finally:
+            pool._executor.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import pytest
+import ratelimit
+from ratelimit import Limit, MemoryStore, SQLiteStore, RateLimiter, RateLimited, backoff, parse_limit
+from config import LOGIN_FREE_FAILURES, LOGIN_IP_FREE_FAILURES, LOGIN_FAILURE_WINDOW
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStore(100)
+    return SQLiteStore(str(tmp_path / "ratelimit.db"), 3600)
+
+
+@pytest.fixture
+def limiter(store):
+    limiter = RateLimiter(store, enabled=True)
+    limiter.login_ip = limiter.login_user = None  # backoff only
+    return limiter
+
+
+class TestParseLimit:
+    def test_parses_rate_and_burst(self):
+        assert parse_limit("20/minute") == Limit(20 / 60, 20)
+        assert parse_limit("5") == Limit(5, 5)
+
+    @pytest.mark.parametrize("spec", ["", "off", "0", None])
+    def test_off(self, spec):
+        assert parse_limit(spec) is None
+
+    @pytest.mark.parametrize("spec", ["many/minute", "5/fortnight"])
+    def test_invalid(self, spec):
+        with pytest.raises(ValueError):
+            parse_limit(spec)
+
+
+class TestStore:
+    def test_bucket_empties_then_refills(self, store):
+        limit = Limit(rate=1.0, burst=2)
+        assert store.take("k", limit, 100.0) == 0
+        assert store.take("k", limit, 100.0) == 0
+        assert store.take("k", limit, 100.0) == pytest.approx(1.0)
+        assert store.take("k", limit, 101.5) == 0
+
+    def test_failures_counted_and_forgotten(self, store):
+        assert store.fail("k", 100.0, 60) == 1
+        assert store.fail("k", 110.0, 60) == 2
+        assert store.failures("k", 120.0, 60) == (2, 110.0)
+        assert store.failures("k", 200.0, 60) == (0, 0.0)
+        assert store.fail("k", 200.0, 60) == 1
+        store.clear("k")
+        assert store.failures("k", 200.0, 60) == (0, 0.0)
+
+
+def test_backoff_doubles_up_to_ceiling():
+    assert [backoff(n, 2, 1, 5) for n in range(1, 7)] == [0, 0, 1, 2, 4, 5]
+
+
+class TestLogin:
+    def _fail(self, limiter, ip, user_id, times):
+        for _ in range(times):
+            limiter.login_failed(ip, user_id)
+
+    def test_user_backoff_after_free_failures(self, limiter):
+        self._fail(limiter, "10.0.0.1", 7, LOGIN_FREE_FAILURES)
+        limiter.check_login("10.0.0.1", 7)
+        limiter.login_failed("10.0.0.1", 7)
+        with pytest.raises(RateLimited) as raised:
+            limiter.check_login("10.0.0.1", 7)
+        assert raised.value.retry_after > 0
+
+    def test_failures_from_another_address_do_not_lock_the_user_out(self, limiter):
+        self._fail(limiter, "10.0.0.66", 7, LOGIN_FREE_FAILURES + 3)
+        with pytest.raises(RateLimited):
+            limiter.check_login("10.0.0.66", 7)
+        limiter.check_login("10.0.0.1", 7)
+
+    def test_success_clears_the_user_count(self, limiter):
+        self._fail(limiter, "10.0.0.1", 7, LOGIN_FREE_FAILURES + 1)
+        limiter.login_succeeded("10.0.0.1", 7)
+        limiter.check_login("10.0.0.1", 7)
+
+    def test_address_backoff_across_users(self, limiter):
+        for user_id in range(LOGIN_IP_FREE_FAILURES + 1):
+            limiter.login_failed("10.0.0.66", user_id)
+        with pytest.raises(RateLimited):
+            limiter.check_login("10.0.0.66", 999)
+        limiter.check_login("10.0.0.1", 999)
+
+    def test_failures_expire(self, limiter, monkeypatch):
+        self._fail(limiter, "10.0.0.1", 7, LOGIN_FREE_FAILURES + 1)
+        later = ratelimit.time.time() + LOGIN_FAILURE_WINDOW + 1
+        monkeypatch.setattr(ratelimit.time, "time", lambda: later)
+        limiter.check_login("10.0.0.1", 7)
+
+    def test_user_bucket(self, store):
+        limiter = RateLimiter(store, enabled=True)
+        limiter.login_ip, limiter.login_user = None, Limit(rate=0.01, burst=2)
+        limiter.check_login("10.0.0.1", 7)
+        limiter.check_login("10.0.0.2", 7)
+        with pytest.raises(RateLimited):
+            limiter.check_login("10.0.0.3", 7)
+
+    def test_disabled(self, store):
+        limiter = RateLimiter(store, enabled=False)
+        self._fail(limiter, "10.0.0.1", 7, LOGIN_FREE_FAILURES + 5)
+        limiter.check_login("10.0.0.1", 7)
@@ -0,0 +1,111 @@
+import datetime
+import pytest
+import slots
+from slots import find_open_slots, subtract_intervals
+from query import insert
+from conftest import add_user, add_availability, login
+
+MONDAY = datetime.date(2030, 1, 7)
+SUNDAY = MONDAY + datetime.timedelta(days=6)
+
+
+@pytest.fixture
+def club(db):
+    """Coach A free Monday 09-12 with a lesson at 10, coach B Monday 10-11 and Wednesday 14-16."""
+    a = add_user(db, "coach", "Ann", "Able")
+    b = add_user(db, "coach", "Ben", "Baker")
+    player_id = add_user(db, "player")
+    add_availability(db, a, "Monday", "09:00", "12:00")
+    add_availability(db, b, "Monday", "10:00", "11:00")
+    add_availability(db, b, "Wednesday", "14:00", "16:00")
+    insert(
+        db,
+        "INSERT INTO private_lessons (player_id, coach_id, lesson_date, start_time, end_time) "
+        "VALUES (%s, %s, %s, %s, %s)",
+        (player_id, a, MONDAY.isoformat(), 600, 660)
+    )
+    db.commit()
+    return a, b, player_id
+
+
+def _starts(found):
+    return [(slot["date"], slot["start_time"], slot["coach_id"]) for slot in found]
+
+
+def test_subtract_intervals():
+    assert subtract_intervals([(0, 100), (200, 300)], [(50, 60), (90, 210), (290, 400)]) == \
+        [(0, 50), (60, 90), (210, 290)]
+
+
+class TestFindOpenSlots:
+    def test_skips_booked_time(self, db, club):
+        a, b, _ = club
+        found, truncated = find_open_slots(db, MONDAY, SUNDAY, 60, step=60)
+        assert not truncated
+        assert _starts(found) == [
+            ("2030-01-07", "09:00", a), ("2030-01-07", "10:00", b), ("2030-01-07", "11:00", a),
+            ("2030-01-09", "14:00", b), ("2030-01-09", "15:00", b),
+        ]
+        assert found[0]["coach_name"] == "Ann Able"
+        assert found[0]["end_time"] == "10:00"
+
+    def test_coach_filter(self, db, club):
+        a, b, _ = club
+        found, _ = find_open_slots(db, MONDAY, MONDAY, 60, coach_ids=[b], step=60)
+        assert _starts(found) == [("2030-01-07", "10:00", b)]
+
+    @pytest.mark.parametrize("duration, step", [(60, 15), (45, 15), (50, 20), (40, 25)])
+    def test_bitmap_and_interval_paths_agree(self, db, club, duration, step):
+        # (50, 20) and (40, 25) aren't multiples of the bitmap bucket and take the interval sweep
+        a, b, _ = club
+        free = {
+            (a, "2030-01-07"): [(540, 600), (660, 720)],
+            (b, "2030-01-07"): [(600, 660)],
+            (b, "2030-01-09"): [(840, 960)],
+        }
+        expected = sorted(
+            (day, start, coach_id)
+            for (coach_id, day), windows in free.items()
+            for low, high in windows
+            for start in range(-(-low // step) * step, high - duration + 1, step)
+        )
+        found, _ = find_open_slots(db, MONDAY, SUNDAY, duration, step=step)
+        assert _starts(found) == [(day, f"{start // 60:02d}:{start % 60:02d}", coach_id)
+                                  for day, start, coach_id in expected]
+
+    def test_truncated_at_limit(self, db, club):
+        found, truncated = find_open_slots(db, MONDAY, SUNDAY, 60, step=60, limit=3)
+        assert truncated
+        assert len(found) == 3
+        found, truncated = find_open_slots(db, MONDAY, SUNDAY, 60, step=60, limit=5)
+        assert not truncated
+        assert len(found) == 5
+
+    @pytest.mark.parametrize("limit", [0, -1, slots.MAX_LIMIT + 1])
+    def test_rejects_bad_limit(self, db, club, limit):
+        with pytest.raises(ValueError):
+            find_open_slots(db, MONDAY, SUNDAY, 60, limit=limit)
+
+
+class TestSlotsRoute:
+    def test_search(self, client, club):
+        a, b, player_id = club
+        response = client.get("/slots?start_date=2030-01-07&end_date=2030-01-13&step=60&limit=2",
+                              headers=login(client, player_id))
+        assert response.status_code == 200
+        body = response.get_json()
+        assert (body["count"], body["truncated"]) == (2, True)
+        assert [slot["coach_id"] for slot in body["slots"]] == [a, b]
+
+    @pytest.mark.parametrize("query", [
+        "limit=0", f"limit={slots.MAX_LIMIT + 1}", "duration=5", "step=200",
+        "end_date=2030-01-06", "end_date=2030-06-30",
+    ])
+    def test_rejects(self, client, club, query):
+        player_id = club[2]
+        response = client.get(f"/slots?start_date=2030-01-07&{query}", headers=login(client, player_id))
+        assert response.status_code == 400
+
+    def test_start_date_required(self, client, club):
+        response = client.get("/slots", headers=login(client, club[2]))
+        assert response.status_code == 400
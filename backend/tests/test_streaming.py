@@ -0,0 +1,19 @@
+import streaming
+from conftest import add_user, login
+
+
+def test_streams_json_array(client, db):
+    admin_id = add_user(db, "admin")
+    add_user(db, "coach")
+    response = client.get("/coaches?stream=true", headers=login(client, admin_id))
+    assert response.status_code == 200
+    assert [coach["role"] for coach in response.get_json()] == ["coach"]
+
+
+def test_pool_exhausted_answers_503_before_streaming(client, db, monkeypatch):
+    admin_id = add_user(db, "admin")
+    headers = login(client, admin_id)
+    monkeypatch.setattr(streaming, "get_db_connection", lambda: None)
+    response = client.get("/coaches?stream=true", headers=headers)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,123 @@
+import pytest
+import changelog
+from auth import Principal
+from query import execute, insert
+from conftest import add_user, login
+
+MONDAY = "2030-01-07"
+
+
+def _add_lesson(db, coach_id, player_id, start):
+    lesson_id = insert(
+        db,
+        "INSERT INTO private_lessons (player_id, coach_id, lesson_date, start_time, end_time) "
+        "VALUES (%s, %s, %s, %s, %s)",
+        (player_id, coach_id, MONDAY, start, start + 60)
+    )
+    db.commit()
+    return lesson_id
+
+
+@pytest.fixture
+def people(db):
+    return add_user(db, "admin"), add_user(db, "coach"), add_user(db, "player"), add_user(db, "player")
+
+
+def _first_token(client, headers):
+    body = client.get("/sync", headers=headers).get_json()
+    assert body["full_resync"] is True
+    return body["next"]
+
+
+class TestSync:
+    def test_changes_since_token(self, client, db, people):
+        admin_id, coach_id, player_id, other_player = people
+        headers = login(client, player_id)
+        token = _first_token(client, headers)
+        mine = _add_lesson(db, coach_id, player_id, 540)
+        _add_lesson(db, coach_id, other_player, 600)
+        execute(db, "UPDATE private_lessons SET end_time = 570 WHERE id = %s", (mine,))
+        db.commit()
+
+        body = client.get(f"/sync?since={token}", headers=headers).get_json()
+        assert body["more"] is False
+        # Insert then update collapses into one insert with the current row; the other player's lesson is hidden
+        assert [(c["table"], c["op"], c["id"]) for c in body["changes"]] == [("private_lessons", "insert", mine)]
+        assert body["changes"][0]["row"]["end_time"] == "09:30"
+
+        execute(db, "DELETE FROM private_lessons WHERE id = %s", (mine,))
+        db.commit()
+        body = client.get(f"/sync?since={body['next']}", headers=headers).get_json()
+        assert body["changes"] == [{"table": "private_lessons", "op": "delete", "id": mine}]
+        assert client.get(f"/sync?since={body['next']}", headers=headers).get_json()["changes"] == []
+
+    def test_created_and_removed_within_the_window(self, client, db, people):
+        admin_id, coach_id, player_id, _ = people
+        headers = login(client, admin_id)
+        token = _first_token(client, headers)
+        lesson_id = _add_lesson(db, coach_id, player_id, 540)
+        execute(db, "DELETE FROM private_lessons WHERE id = %s", (lesson_id,))
+        db.commit()
+        assert client.get(f"/sync?since={token}", headers=headers).get_json()["changes"] == []
+
+    def test_more_pages(self, db, people):
+        admin_id, coach_id, player_id, _ = people
+        since = changelog.head(db)
+        lessons = [_add_lesson(db, coach_id, player_id, start) for start in (480, 540, 600, 660, 720)]
+        admin = Principal(admin_id, "admin")
+
+        seen, pages = [], 0
+        while True:
+            body = changelog.changes_since(db, admin, since, limit=2)
+            seen += [change["id"] for change in body["changes"]]
+            pages += 1
+            since = changelog.decode_token(body["next"])
+            if not body["more"]:
+                break
+        assert seen == lessons
+        assert pages == 3
+        assert changelog.changes_since(db, admin, since, limit=2) == \
+            {"changes": [], "next": changelog.encode_token(since), "more": False}
+
+    def test_invalid_token(self, client, people):
+        response = client.get("/sync?since=garbage", headers=login(client, people[0]))
+        assert response.status_code == 400
+
+
+class TestCompaction:
+    def test_expired_token_answers_410(self, client, db, people):
+        admin_id, coach_id, player_id, _ = people
+        headers = login(client, admin_id)
+        token = _first_token(client, headers)
+        _add_lesson(db, coach_id, player_id, 540)
+        execute(db, "UPDATE change_log SET changed_at = '2000-01-01 00:00:00'")
+        db.commit()
+
+        response = client.post("/sync/compact", json={"retention_days": 1}, headers=headers)
+        assert response.get_json()["removed"] == 1
+        response = client.get(f"/sync?since={token}", headers=headers)
+        assert response.status_code == 410
+        body = response.get_json()
+        assert body["full_resync"] is True
+
+        # The token from the 410 syncs again once the lists are reloaded
+        later = _add_lesson(db, coach_id, player_id, 600)
+        body = client.get(f"/sync?since={body['next']}", headers=headers).get_json()
+        assert [change["id"] for change in body["changes"]] == [later]
+
+    def test_recent_entries_are_kept(self, client, db, people):
+        admin_id, coach_id, player_id, _ = people
+        headers = login(client, admin_id)
+        token = _first_token(client, headers)
+        lesson_id = _add_lesson(db, coach_id, player_id, 540)
+        assert client.post("/sync/compact", json={"retention_days": 1}, headers=headers).get_json()["removed"] == 0
+        body = client.get(f"/sync?since={token}", headers=headers).get_json()
+        assert [change["id"] for change in body["changes"]] == [lesson_id]
+
+    def test_token_ahead_of_the_log(self, client, people):
+        headers = login(client, people[0])
+        response = client.get(f"/sync?since={changelog.encode_token((0, 10 ** 6))}", headers=headers)
+        assert response.status_code == 410
+
+    def test_legacy_token(self, db):
+        assert changelog.decode_token(changelog.encode_cursor([42])) == (0, 42)
@@ -0,0 +1,137 @@
+# weekmap.py
+#
+# Per-coach weekly availability as a bitmap: one bit per 15-minute bucket,
+# 7 * 96 bits in a single Python int (bit = weekday * 96 + minute // 15).
+# "Is the coach available for [start, end) on this weekday?" becomes one mask
+# test for bucket-aligned intervals; anything else is answered exactly from the
+# merged windows kept next to the bits.
+#
+# Maps are built from coach_availability and cached per process. Any
+# availability write bumps the shared coach_availability counter (counters.py),
+# which retires every cached map in every worker.
+
+import threading
+import collections
+from clock import DAYS
+from query import fetch_all
+from counters import counters
+from config import AVAILABILITY_CACHE_SIZE
+
+BUCKET = 15
+BUCKETS_PER_DAY = 24 * 60 // BUCKET
+_DAY_INDEX = {day: i for i, day in enumerate(DAYS)}
+
+
+def merge_intervals(intervals):
+    """Sorted, non-overlapping union of (start, end) minute pairs."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def span_mask(weekday, start, end):
+    """Bits of the buckets fully inside [start, end) on `weekday`."""
+    first, last = -(-start // BUCKET), end // BUCKET
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << (weekday * BUCKETS_PER_DAY + first)
+
+
+def touch_mask(weekday, start, end):
+    """Bits of every bucket that [start, end) touches on `weekday`."""
+    first, last = start // BUCKET, -(-end // BUCKET)
+    return ((1 << (last - first)) - 1) << (weekday * BUCKETS_PER_DAY + first)
+
+
+def aligned(*minutes):
+    return all(m % BUCKET == 0 for m in minutes)
+
+
+class WeekMap:
+    __slots__ = ("bits", "windows")
+
+    def __init__(self, windows):
+        self.windows = windows  # weekday -> merged [(start, end)]
+        bits = 0
+        for weekday, ranges in windows.items():
+            for start, end in ranges:
+                bits |= span_mask(weekday, start, end)
+        self.bits = bits
+
+    def covers(self, weekday, start, end):
+        """True if [start, end) lies inside the coach's availability on `weekday`."""
+        if aligned(start, end):
+            mask = span_mask(weekday, start, end)
+            return self.bits & mask == mask
+        return any(s <= start and end <= e for s, e in self.windows.get(weekday, ()))
+
+
+class WeekMapCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # coach_id -> (WeekMap, coach_availability version)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db, coach_id):
+        coach_id = int(coach_id)
+        return self.get_many(db, [coach_id])[coach_id]
+
+    def get_many(self, db, coach_ids):
+        """{coach_id: WeekMap} keyed by int id; coaches not cached (or stale) are loaded in one query."""
+        coach_ids = [int(coach_id) for coach_id in coach_ids]
+        version = counters.version("coach_availability")
+        found, missing = {}, []
+        with self._lock:
+            for coach_id in coach_ids:
+                entry = self._entries.get(coach_id)
+                if entry is not None and entry[1] == version:
+                    self._entries.move_to_end(coach_id)
+                    found[coach_id] = entry[0]
+                else:
+                    missing.append(coach_id)
+            self.hits += len(found)
+            self.misses += len(missing)
+        if missing:
+            loaded = self._load(db, missing)
+            with self._lock:
+                for coach_id, week in loaded.items():
+                    self._entries[coach_id] = (week, version)
+                    self._entries.move_to_end(coach_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+            found.update(loaded)
+        return found
+
+    @staticmethod
+    def _load(db, coach_ids, chunk_size=500):
+        # Rows carry int coach ids, so the map is keyed by int whatever the caller passed
+        coach_ids = [int(coach_id) for coach_id in coach_ids]
+        windows = {coach_id: collections.defaultdict(list) for coach_id in coach_ids}
+        for i in range(0, len(coach_ids), chunk_size):
+            chunk = coach_ids[i:i + chunk_size]
+            rows = fetch_all(
+                db,
+                "SELECT coach_id, day, start_time, end_time FROM coach_availability "
+                f"WHERE coach_id IN ({', '.join(['%s'] * len(chunk))})",
+                tuple(chunk)
+            )
+            for row in rows:
+                windows[row["coach_id"]][_DAY_INDEX[row["day"]]].append((row["start_time"], row["end_time"]))
+        return {
+            coach_id: WeekMap({weekday: merge_intervals(ranges) for weekday, ranges in days.items()})
+            for coach_id, days in windows.items()
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+weekmaps = WeekMapCache(AVAILABILITY_CACHE_SIZE)
@@ -0,0 +1,93 @@
+# writer.py
+#
+# Single-writer queue for SQLite (SQLITE_SINGLE_WRITER, on by default with
+# SQLITE_PRODUCTION). SQLite allows one writer at a time; with many request
+# threads writing through their own connections they queue on the file lock
+# and eventually fail with "database is locked". Instead, write transactions
+# are handed to one thread that owns one connection and runs them back to
+# back, while reads keep using the per-thread pool (WAL lets them proceed
+# alongside the writer).
+#
+#     lesson = writer.run(booking.book_lesson, player_id, coach_id, ...)
+#
+# `fn` gets the writer's connection as its first argument and commits or
+# rolls back itself. On Postgres, or with the queue disabled, run() calls
+# `fn` with a pooled connection in the calling thread instead.
+#
+# The queue is per process: with several workers the processes still share
+# the file lock, which SQLITE_BUSY_TIMEOUT_MS covers.
+
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from database import connect_sqlite, db_connection, is_postgres, sqlite_path
+from config import SQLITE_SINGLE_WRITER, SQLITE_WRITE_QUEUE_SIZE, SQLITE_WRITE_TIMEOUT
+
+
+class WriteQueueFull(Exception):
+    """Raised when the write queue stayed full for SQLITE_WRITE_TIMEOUT seconds."""
+
+
+class SingleWriter:
+    def __init__(self, queue_size, timeout):
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.writes = 0
+        self.failed = 0
+
+    def _ensure_thread(self):
+        # One writer per process: a thread started before fork doesn't exist in the child
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._thread = threading.Thread(target=self._loop, args=(self._queue,),
+                                                name="sqlite-writer", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _loop(self, jobs):
+        db = connect_sqlite(sqlite_path())
+        while True:
+            fn, args, kwargs, future = jobs.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(db, *args, **kwargs))
+                self.writes += 1
+            except Exception as e:
+                self.failed += 1
+                future.set_exception(e)
+            finally:
+                if db.in_transaction:
+                    db.rollback()
+
+    def run(self, fn, *args, **kwargs):
+        if is_postgres() or not SQLITE_SINGLE_WRITER:
+            with db_connection() as db:
+                return fn(db, *args, **kwargs)
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("writer.run() called from inside a write; use the connection you were given.")
+        self._ensure_thread()
+        future = Future()
+        try:
+            self._queue.put((fn, args, kwargs, future), timeout=self.timeout)
+        except queue.Full:
+            raise WriteQueueFull("Too many writes are waiting for the database")
+        return future.result()
+
+    def snapshot(self):
+        return {"enabled": SQLITE_SINGLE_WRITER and not is_postgres(), "queued": self._queue.qsize(),
+                "writes": self.writes, "failed": self.failed}
+
+
+writer = SingleWriter(SQLITE_WRITE_QUEUE_SIZE, SQLITE_WRITE_TIMEOUT)
+
+
+def run(fn, *args, **kwargs):
+    return writer.run(fn, *args, **kwargs)
@@ -0,0 +1,8 @@
+# wsgi.py
+#
+# Production entry point: `gunicorn -c gunicorn.conf.py wsgi:app`.
+# Migrations are not run here; gunicorn.conf.py runs them once in the master.
+
+from main import create_app
+
+app = create_app()
@@ -0,0 +1,16 @@
+-- 0002 hot-path indexes
+-- Lesson lookups by coach / player / slot, roster joins and role / name searches.
+
+-- A player can only be on a team once; drop existing duplicates before enforcing it.
+DELETE FROM team_members
+WHERE id NOT IN (SELECT MIN(id) FROM team_members GROUP BY team_id, player_id);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_team_members_team_player ON team_members (team_id, player_id);
+CREATE INDEX IF NOT EXISTS ix_team_members_player ON team_members (player_id);
+
+CREATE INDEX IF NOT EXISTS ix_private_lessons_coach_slot ON private_lessons (coach_id, lesson_date, start_time);
+CREATE INDEX IF NOT EXISTS ix_private_lessons_player_date ON private_lessons (player_id, lesson_date);
+
+CREATE INDEX IF NOT EXISTS ix_coach_availability_coach ON coach_availability (coach_id, day);
+
+CREATE INDEX IF NOT EXISTS ix_users_role ON users (role);
+CREATE INDEX IF NOT EXISTS ix_users_name ON users (first_name, last_name);
@@ -0,0 +1,70 @@
+-- 0003 lesson overlap guard (PostgreSQL)
+-- A coach can't have two lessons whose [start, end) ranges intersect on the same day.
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+CREATE OR REPLACE FUNCTION hhmm_to_minutes(t TEXT) RETURNS INT AS $$
+    SELECT split_part(t, ':', 1)::int * 60 + split_part(t, ':', 2)::int
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+-- Lessons booked before the guard existed may break it: times hhmm_to_minutes
+-- can't read, an end before the start, or overlaps. They are moved to
+-- private_lessons_rejected (with the reason) rather than dropped, and counted
+-- in a NOTICE, so the constraint can be added and an admin can rebook them.
+CREATE TABLE IF NOT EXISTS private_lessons_rejected (
+    id INT PRIMARY KEY,
+    player_id INT NOT NULL,
+    coach_id INT NOT NULL,
+    lesson_date DATE NOT NULL,
+    start_time VARCHAR(20) NOT NULL,
+    end_time VARCHAR(20) NOT NULL,
+    reason VARCHAR(20) NOT NULL,
+    rejected_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- HH:MM (or HH:MM:SS) within the day, ending after it starts
+INSERT INTO private_lessons_rejected (id, player_id, coach_id, lesson_date, start_time, end_time, reason)
+SELECT id, player_id, coach_id, lesson_date, start_time, end_time, 'invalid_time'
+FROM private_lessons
+WHERE NOT CASE
+    WHEN start_time ~ '^([01]?[0-9]|2[0-3]):[0-5][0-9](:[0-5][0-9])?$'
+     AND end_time ~ '^(([01]?[0-9]|2[0-3]):[0-5][0-9]|24:00)(:[0-5][0-9])?$'
+    THEN hhmm_to_minutes(end_time) > hhmm_to_minutes(start_time)
+    ELSE FALSE
+END;
+
+DELETE FROM private_lessons WHERE id IN (SELECT id FROM private_lessons_rejected);
+
+-- Of overlapping lessons the first booked (lowest id) stays; a lesson is
+-- rejected when it overlaps any earlier one of its coach that day.
+INSERT INTO private_lessons_rejected (id, player_id, coach_id, lesson_date, start_time, end_time, reason)
+SELECT l.id, l.player_id, l.coach_id, l.lesson_date, l.start_time, l.end_time, 'overlap'
+FROM private_lessons l
+WHERE EXISTS (
+    SELECT 1 FROM private_lessons e
+    WHERE e.coach_id = l.coach_id
+      AND e.lesson_date = l.lesson_date
+      AND e.id < l.id
+      AND hhmm_to_minutes(e.start_time) < hhmm_to_minutes(l.end_time)
+      AND hhmm_to_minutes(e.end_time) > hhmm_to_minutes(l.start_time)
+);
+
+DELETE FROM private_lessons WHERE id IN (SELECT id FROM private_lessons_rejected);
+
+DO $$
+DECLARE
+    invalid INT;
+    overlapping INT;
+BEGIN
+    SELECT COUNT(*) FILTER (WHERE reason = 'invalid_time'), COUNT(*) FILTER (WHERE reason = 'overlap')
+    INTO invalid, overlapping
+    FROM private_lessons_rejected;
+    IF invalid + overlapping > 0 THEN
+        RAISE NOTICE 'moved % lessons with unreadable times and % overlapping lessons to private_lessons_rejected',
+            invalid, overlapping;
+    END IF;
+END
+$$;
+
+ALTER TABLE private_lessons
+    ADD CONSTRAINT ex_private_lessons_coach_overlap
+    EXCLUDE USING gist (coach_id WITH =, lesson_date WITH =,
+        int4range(hhmm_to_minutes(start_time), hhmm_to_minutes(end_time)) WITH &&);
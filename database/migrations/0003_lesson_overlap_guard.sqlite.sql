@@ -0,0 +1,16 @@
+-- 0003 lesson overlap guard (SQLite)
+-- A coach can't have two lessons whose [start, end) ranges intersect on the same day.
+-- Times are zero-padded HH:MM, so string comparison orders them correctly.
+
+CREATE TRIGGER IF NOT EXISTS trg_private_lessons_no_overlap
+BEFORE INSERT ON private_lessons
+WHEN EXISTS (
+    SELECT 1 FROM private_lessons
+    WHERE coach_id = NEW.coach_id
+      AND lesson_date = NEW.lesson_date
+      AND start_time < NEW.end_time
+      AND end_time > NEW.start_time
+)
+BEGIN
+    SELECT RAISE(ABORT, 'lesson overlaps an existing booking');
+END;
@@ -0,0 +1,4 @@
+-- 0004 lessons by date
+-- Date-range scans across every coach (open-slot search, schedule views).
+
+CREATE INDEX IF NOT EXISTS ix_private_lessons_date ON private_lessons (lesson_date, coach_id);
@@ -0,0 +1,61 @@
+-- 0005 times as minutes since midnight (PostgreSQL)
+-- start_time / end_time become INTEGER minutes (09:30 -> 570), so range checks
+-- compare numbers and the overlap guard uses the columns directly.
+
+-- Availability rows hhmm_to_minutes can't convert (or that end before they
+-- start, or name no weekday) would fail the ALTER below and keep the app from
+-- starting. They are moved to coach_availability_rejected with the reason and
+-- counted in a NOTICE, as 0003 does for lessons; the coach re-enters them.
+CREATE TABLE IF NOT EXISTS coach_availability_rejected (
+    id INT PRIMARY KEY,
+    coach_id INT NOT NULL,
+    day VARCHAR(20) NOT NULL,
+    start_time VARCHAR(20) NOT NULL,
+    end_time VARCHAR(20) NOT NULL,
+    reason VARCHAR(20) NOT NULL,
+    rejected_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO coach_availability_rejected (id, coach_id, day, start_time, end_time, reason)
+SELECT id, coach_id, day, start_time, end_time,
+       CASE WHEN day NOT IN ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+            THEN 'invalid_day' ELSE 'invalid_time' END
+FROM coach_availability
+WHERE day NOT IN ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+   OR NOT CASE
+       WHEN start_time ~ '^([01]?[0-9]|2[0-3]):[0-5][0-9](:[0-5][0-9])?$'
+        AND end_time ~ '^(([01]?[0-9]|2[0-3]):[0-5][0-9]|24:00)(:[0-5][0-9])?$'
+       THEN hhmm_to_minutes(end_time) > hhmm_to_minutes(start_time)
+       ELSE FALSE
+   END;
+
+DELETE FROM coach_availability WHERE id IN (SELECT id FROM coach_availability_rejected);
+
+DO $$
+DECLARE
+    rejected INT;
+BEGIN
+    SELECT COUNT(*) INTO rejected FROM coach_availability_rejected;
+    IF rejected > 0 THEN
+        RAISE NOTICE 'moved % unreadable availability rows to coach_availability_rejected', rejected;
+    END IF;
+END
+$$;
+
+ALTER TABLE private_lessons DROP CONSTRAINT IF EXISTS ex_private_lessons_coach_overlap;
+
+ALTER TABLE private_lessons
+    ALTER COLUMN start_time TYPE INTEGER USING hhmm_to_minutes(start_time),
+    ALTER COLUMN end_time TYPE INTEGER USING hhmm_to_minutes(end_time);
+
+ALTER TABLE coach_availability
+    ALTER COLUMN start_time TYPE INTEGER USING hhmm_to_minutes(start_time),
+    ALTER COLUMN end_time TYPE INTEGER USING hhmm_to_minutes(end_time);
+
+ALTER TABLE private_lessons
+    ADD CONSTRAINT ex_private_lessons_coach_overlap
+    EXCLUDE USING gist (
+        coach_id WITH =,
+        lesson_date WITH =,
+        int4range(start_time, end_time) WITH &&
+    );
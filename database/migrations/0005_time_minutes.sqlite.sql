@@ -0,0 +1,69 @@
+-- 0005 times as minutes since midnight (SQLite)
+-- start_time / end_time become INTEGER minutes (09:30 -> 570). The tables are
+-- rebuilt rather than updated in place: databases created from schema.sql
+-- declare the columns VARCHAR, whose TEXT affinity would turn 570 back into '570'.
+
+CREATE TABLE coach_availability_new (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  coach_id INTEGER NOT NULL,
+  day TEXT CHECK (day IN ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')),
+  start_time INTEGER NOT NULL,
+  end_time INTEGER NOT NULL,
+  FOREIGN KEY (coach_id) REFERENCES users(id) ON DELETE CASCADE,
+  UNIQUE (coach_id, day, start_time, end_time)
+);
+
+INSERT OR IGNORE INTO coach_availability_new (id, coach_id, day, start_time, end_time)
+SELECT id, coach_id, day,
+       CASE WHEN typeof(start_time) = 'integer' THEN start_time
+            ELSE CAST(substr(start_time, 1, instr(start_time, ':') - 1) AS INTEGER) * 60
+               + CAST(substr(start_time, instr(start_time, ':') + 1, 2) AS INTEGER) END,
+       CASE WHEN typeof(end_time) = 'integer' THEN end_time
+            ELSE CAST(substr(end_time, 1, instr(end_time, ':') - 1) AS INTEGER) * 60
+               + CAST(substr(end_time, instr(end_time, ':') + 1, 2) AS INTEGER) END
+FROM coach_availability;
+
+DROP TABLE coach_availability;
+ALTER TABLE coach_availability_new RENAME TO coach_availability;
+CREATE INDEX IF NOT EXISTS ix_coach_availability_coach ON coach_availability (coach_id, day);
+
+CREATE TABLE private_lessons_new (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  player_id INTEGER NOT NULL,
+  coach_id INTEGER NOT NULL,
+  lesson_date DATE NOT NULL,
+  start_time INTEGER NOT NULL,
+  end_time INTEGER NOT NULL,
+  FOREIGN KEY (player_id) REFERENCES users(id) ON DELETE CASCADE,
+  FOREIGN KEY (coach_id) REFERENCES users(id) ON DELETE CASCADE,
+  UNIQUE (coach_id, lesson_date, start_time)
+);
+
+INSERT INTO private_lessons_new (id, player_id, coach_id, lesson_date, start_time, end_time)
+SELECT id, player_id, coach_id, lesson_date,
+       CASE WHEN typeof(start_time) = 'integer' THEN start_time
+            ELSE CAST(substr(start_time, 1, instr(start_time, ':') - 1) AS INTEGER) * 60
+               + CAST(substr(start_time, instr(start_time, ':') + 1, 2) AS INTEGER) END,
+       CASE WHEN typeof(end_time) = 'integer' THEN end_time
+            ELSE CAST(substr(end_time, 1, instr(end_time, ':') - 1) AS INTEGER) * 60
+               + CAST(substr(end_time, instr(end_time, ':') + 1, 2) AS INTEGER) END
+FROM private_lessons;
+
+DROP TABLE private_lessons;
+ALTER TABLE private_lessons_new RENAME TO private_lessons;
+CREATE INDEX IF NOT EXISTS ix_private_lessons_coach_slot ON private_lessons (coach_id, lesson_date, start_time);
+CREATE INDEX IF NOT EXISTS ix_private_lessons_player_date ON private_lessons (player_id, lesson_date);
+CREATE INDEX IF NOT EXISTS ix_private_lessons_date ON private_lessons (lesson_date, coach_id);
+
+CREATE TRIGGER IF NOT EXISTS trg_private_lessons_no_overlap
+BEFORE INSERT ON private_lessons
+WHEN EXISTS (
+    SELECT 1 FROM private_lessons
+    WHERE coach_id = NEW.coach_id
+      AND lesson_date = NEW.lesson_date
+      AND start_time < NEW.end_time
+      AND end_time > NEW.start_time
+)
+BEGIN
+    SELECT RAISE(ABORT, 'lesson overlaps an existing booking');
+END;
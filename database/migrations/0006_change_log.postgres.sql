@@ -0,0 +1,61 @@
+-- 0006 change log for delta sync (PostgreSQL)
+-- Every insert / update / delete on private_lessons, coach_availability, teams
+-- and team_members appends a row here, in the writing transaction, with the
+-- ids /sync uses to decide who may see it. An update that moves a row to
+-- another coach / player / team also logs a delete for the previous owner.
+--
+-- Sequence numbers come from a sequence, which hands them out in call order,
+-- not commit order. The trigger takes a transaction-level advisory lock first,
+-- so change-logging transactions commit in seq order and a client never
+-- skips a lower seq that becomes visible after a higher one.
+
+CREATE TABLE IF NOT EXISTS change_log (
+    seq BIGSERIAL PRIMARY KEY,
+    table_name VARCHAR(32) NOT NULL,
+    op VARCHAR(6) NOT NULL CHECK (op IN ('insert', 'update', 'delete')),
+    row_id INTEGER NOT NULL,
+    coach_id INTEGER,
+    player_id INTEGER,
+    team_id INTEGER,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Entries at or below the watermark have been compacted away
+CREATE TABLE IF NOT EXISTS change_log_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    watermark BIGINT NOT NULL
+);
+INSERT INTO change_log_state (id, watermark) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION log_change() RETURNS trigger AS $$
+DECLARE
+    new_row JSONB := CASE WHEN TG_OP <> 'DELETE' THEN to_jsonb(NEW) END;
+    old_row JSONB := CASE WHEN TG_OP <> 'INSERT' THEN to_jsonb(OLD) END;
+    team_key TEXT := CASE WHEN TG_TABLE_NAME = 'teams' THEN 'id' ELSE 'team_id' END;
+BEGIN
+    PERFORM pg_advisory_xact_lock(7262);
+    IF TG_OP = 'UPDATE' AND (
+        old_row->>'coach_id' IS DISTINCT FROM new_row->>'coach_id'
+        OR old_row->>'player_id' IS DISTINCT FROM new_row->>'player_id'
+        OR old_row->>team_key IS DISTINCT FROM new_row->>team_key
+    ) THEN
+        INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+        VALUES (TG_TABLE_NAME, 'delete', (old_row->>'id')::int, (old_row->>'coach_id')::int,
+                (old_row->>'player_id')::int, (old_row->>team_key)::int);
+    END IF;
+    new_row := COALESCE(new_row, old_row);
+    INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+    VALUES (TG_TABLE_NAME, lower(TG_OP), (new_row->>'id')::int, (new_row->>'coach_id')::int,
+            (new_row->>'player_id')::int, (new_row->>team_key)::int);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_private_lessons_change_log AFTER INSERT OR UPDATE OR DELETE ON private_lessons
+    FOR EACH ROW EXECUTE FUNCTION log_change();
+CREATE TRIGGER trg_coach_availability_change_log AFTER INSERT OR UPDATE OR DELETE ON coach_availability
+    FOR EACH ROW EXECUTE FUNCTION log_change();
+CREATE TRIGGER trg_teams_change_log AFTER INSERT OR UPDATE OR DELETE ON teams
+    FOR EACH ROW EXECUTE FUNCTION log_change();
+CREATE TRIGGER trg_team_members_change_log AFTER INSERT OR UPDATE OR DELETE ON team_members
+    FOR EACH ROW EXECUTE FUNCTION log_change();
@@ -0,0 +1,108 @@
+-- 0006 change log for delta sync (SQLite)
+-- Every insert / update / delete on private_lessons, coach_availability, teams
+-- and team_members appends a row here, in the writing transaction, with the
+-- ids /sync uses to decide who may see it. An update that moves a row to
+-- another coach / player / team also logs a delete for the previous owner.
+-- SQLite has one writer at a time, so AUTOINCREMENT seqs are in commit order.
+
+CREATE TABLE IF NOT EXISTS change_log (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  table_name TEXT NOT NULL,
+  op TEXT NOT NULL CHECK (op IN ('insert', 'update', 'delete')),
+  row_id INTEGER NOT NULL,
+  coach_id INTEGER,
+  player_id INTEGER,
+  team_id INTEGER,
+  changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Entries at or below the watermark have been compacted away
+CREATE TABLE IF NOT EXISTS change_log_state (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  watermark INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO change_log_state (id, watermark) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_private_lessons_log_insert AFTER INSERT ON private_lessons
+BEGIN
+    INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+    VALUES ('private_lessons', 'insert', NEW.id, NEW.coach_id, NEW.player_id, NULL);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_private_lessons_log_update AFTER UPDATE ON private_lessons
+BEGIN
+    INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+    SELECT 'private_lessons', 'delete', OLD.id, OLD.coach_id, OLD.player_id, NULL
+    WHERE OLD.coach_id IS NOT NEW.coach_id OR OLD.player_id IS NOT NEW.player_id;
+    INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+    VALUES ('private_lessons', 'update', NEW.id, NEW.coach_id, NEW.player_id, NULL);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_private_lessons_log_delete AFTER DELETE ON private_lessons
+BEGIN
+    INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+    VALUES ('private_lessons', 'delete', OLD.id, OLD.coach_id, OLD.player_id, NULL);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_coach_availability_log_insert AFTER INSERT ON coach_availability
+BEGIN
+    INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+    VALUES ('coach_availability', 'insert', NEW.id, NEW.coach_id, NULL, NULL);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_coach_availability_log_update AFTER UPDATE ON coach_availability
+BEGIN
+    INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+    SELECT 'coach_availability', 'delete', OLD.id, OLD.coach_id, NULL, NULL
+    WHERE OLD.coach_id IS NOT NEW.coach_id;
+    INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+    VALUES ('coach_availability', 'update', NEW.id, NEW.coach_id, NULL, NULL);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_coach_availability_log_delete AFTER DELETE ON coach_availability
+BEGIN
+    INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+    VALUES ('coach_availability', 'delete', OLD.id, OLD.coach_id, NULL, NULL);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_teams_log_insert AFTER INSERT ON teams
+BEGIN
+    INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+    VALUES ('teams', 'insert', NEW.id, NEW.coach_id, NULL, NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_teams_log_update AFTER UPDATE ON teams
+BEGIN
+    INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+    SELECT 'teams', 'delete', OLD.id, OLD.coach_id, NULL, OLD.id
+    WHERE OLD.coach_id IS NOT NEW.coach_id OR OLD.id IS NOT NEW.id;
+    INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+    VALUES ('teams', 'update', NEW.id, NEW.coach_id, NULL, NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_teams_log_delete AFTER DELETE ON teams
+BEGIN
+    INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+    VALUES ('teams', 'delete', OLD.id, OLD.coach_id, NULL, OLD.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_team_members_log_insert AFTER INSERT ON team_members
+BEGIN
+    INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+    VALUES ('team_members', 'insert', NEW.id, NULL, NEW.player_id, NEW.team_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_team_members_log_update AFTER UPDATE ON team_members
+BEGIN
+    INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+    SELECT 'team_members', 'delete', OLD.id, NULL, OLD.player_id, OLD.team_id
+    WHERE OLD.player_id IS NOT NEW.player_id OR OLD.team_id IS NOT NEW.team_id;
+    INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+    VALUES ('team_members', 'update', NEW.id, NULL, NEW.player_id, NEW.team_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_team_members_log_delete AFTER DELETE ON team_members
+BEGIN
+    INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+    VALUES ('team_members', 'delete', OLD.id, NULL, OLD.player_id, OLD.team_id);
+END;
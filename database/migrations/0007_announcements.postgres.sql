@@ -0,0 +1,45 @@
+-- 0007 announcements (PostgreSQL)
+-- An announcement is posted once and fanned out to one inbox row per
+-- recipient by a background worker (backend/announcements.py), in batches,
+-- resuming from fanout_cursor (the last recipient id delivered).
+-- announcement_unread keeps each user's unread count, so the badge is a
+-- primary-key lookup instead of a count over the inbox.
+
+CREATE TABLE IF NOT EXISTS announcements (
+    id SERIAL PRIMARY KEY,
+    author_id INT,
+    title VARCHAR(255) NOT NULL,
+    content TEXT NOT NULL,
+    important BOOLEAN NOT NULL DEFAULT FALSE,
+    audience VARCHAR(16) NOT NULL CHECK (audience IN ('club', 'teams', 'players')),
+    coach_id INT,                       -- audience 'players': this coach's players
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    fanout_cursor INT NOT NULL DEFAULT 0,
+    recipients INT NOT NULL DEFAULT 0,
+    delivered_at TIMESTAMP,             -- NULL while the fan-out is pending
+    CONSTRAINT fk_announcement_author
+      FOREIGN KEY(author_id)
+      REFERENCES users(id)
+      ON DELETE SET NULL
+);
+CREATE INDEX IF NOT EXISTS ix_announcements_pending ON announcements (id) WHERE delivered_at IS NULL;
+
+-- audience 'teams': the teams addressed
+CREATE TABLE IF NOT EXISTS announcement_teams (
+    announcement_id INT NOT NULL REFERENCES announcements(id) ON DELETE CASCADE,
+    team_id INT NOT NULL REFERENCES teams(id) ON DELETE CASCADE,
+    PRIMARY KEY (announcement_id, team_id)
+);
+
+CREATE TABLE IF NOT EXISTS announcement_inbox (
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    announcement_id INT NOT NULL REFERENCES announcements(id) ON DELETE CASCADE,
+    read_at TIMESTAMP,
+    PRIMARY KEY (user_id, announcement_id)
+);
+CREATE INDEX IF NOT EXISTS ix_announcement_inbox_announcement ON announcement_inbox (announcement_id);
+
+CREATE TABLE IF NOT EXISTS announcement_unread (
+    user_id INT PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    unread INT NOT NULL DEFAULT 0
+);
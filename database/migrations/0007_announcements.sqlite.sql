@@ -0,0 +1,49 @@
+-- 0007 announcements (SQLite)
+-- An announcement is posted once and fanned out to one inbox row per
+-- recipient by a background worker (backend/announcements.py), in batches,
+-- resuming from fanout_cursor (the last recipient id delivered).
+-- announcement_unread keeps each user's unread count, so the badge is a
+-- primary-key lookup instead of a count over the inbox.
+-- Foreign keys aren't enforced on these connections: deleting an
+-- announcement removes its inbox rows explicitly (models/Announcement.py).
+
+CREATE TABLE IF NOT EXISTS announcements (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  author_id INTEGER,
+  title TEXT NOT NULL,
+  content TEXT NOT NULL,
+  important INTEGER NOT NULL DEFAULT 0,
+  audience TEXT NOT NULL CHECK (audience IN ('club', 'teams', 'players')),
+  coach_id INTEGER,                     -- audience 'players': this coach's players
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  fanout_cursor INTEGER NOT NULL DEFAULT 0,
+  recipients INTEGER NOT NULL DEFAULT 0,
+  delivered_at TIMESTAMP,               -- NULL while the fan-out is pending
+  FOREIGN KEY (author_id) REFERENCES users(id) ON DELETE SET NULL
+);
+CREATE INDEX IF NOT EXISTS ix_announcements_pending ON announcements (id) WHERE delivered_at IS NULL;
+
+-- audience 'teams': the teams addressed
+CREATE TABLE IF NOT EXISTS announcement_teams (
+  announcement_id INTEGER NOT NULL,
+  team_id INTEGER NOT NULL,
+  PRIMARY KEY (announcement_id, team_id),
+  FOREIGN KEY (announcement_id) REFERENCES announcements(id) ON DELETE CASCADE,
+  FOREIGN KEY (team_id) REFERENCES teams(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS announcement_inbox (
+  user_id INTEGER NOT NULL,
+  announcement_id INTEGER NOT NULL,
+  read_at TIMESTAMP,
+  PRIMARY KEY (user_id, announcement_id),
+  FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+  FOREIGN KEY (announcement_id) REFERENCES announcements(id) ON DELETE CASCADE
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_announcement_inbox_announcement ON announcement_inbox (announcement_id);
+
+CREATE TABLE IF NOT EXISTS announcement_unread (
+  user_id INTEGER PRIMARY KEY,
+  unread INTEGER NOT NULL DEFAULT 0,
+  FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
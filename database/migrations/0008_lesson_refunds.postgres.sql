@@ -0,0 +1,46 @@
+-- 0008 bulk lesson cancellation and refund ledger (PostgreSQL)
+-- A bulk cancellation (rain) removes every lesson in a date / time window in
+-- one transaction and leaves one lesson_refunds row per lesson, with the
+-- lesson's details, for billing to settle. Lessons carry no price, so a refund
+-- is recorded in minutes of lesson time. The players and coaches are told
+-- through an announcement with audience 'cancellation', delivered by the
+-- announcement fan-out (backend/announcements.py).
+
+CREATE TABLE IF NOT EXISTS lesson_cancellations (
+    id SERIAL PRIMARY KEY,
+    cancelled_by INT,
+    reason VARCHAR(255) NOT NULL,
+    date_from DATE NOT NULL,
+    date_to DATE NOT NULL,
+    start_time INTEGER NOT NULL,        -- window, minutes since midnight
+    end_time INTEGER NOT NULL,
+    coach_id INT,                       -- NULL: every coach
+    lessons INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_cancellation_user
+      FOREIGN KEY(cancelled_by)
+      REFERENCES users(id)
+      ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS lesson_refunds (
+    id SERIAL PRIMARY KEY,
+    cancellation_id INT NOT NULL REFERENCES lesson_cancellations(id),
+    lesson_id INT NOT NULL UNIQUE,      -- the lesson itself is gone; refunded at most once
+    player_id INT NOT NULL,
+    coach_id INT NOT NULL,
+    lesson_date DATE NOT NULL,
+    start_time INTEGER NOT NULL,
+    end_time INTEGER NOT NULL,
+    minutes INTEGER NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'settled')),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS ix_lesson_refunds_cancellation ON lesson_refunds (cancellation_id);
+CREATE INDEX IF NOT EXISTS ix_lesson_refunds_status ON lesson_refunds (status, id);
+
+-- Announcements addressed to the players and coaches of a cancellation
+ALTER TABLE announcements ADD COLUMN IF NOT EXISTS cancellation_id INT;
+ALTER TABLE announcements DROP CONSTRAINT IF EXISTS announcements_audience_check;
+ALTER TABLE announcements ADD CONSTRAINT announcements_audience_check
+    CHECK (audience IN ('club', 'teams', 'players', 'cancellation'));
@@ -0,0 +1,66 @@
+-- 0008 bulk lesson cancellation and refund ledger (SQLite)
+-- A bulk cancellation (rain) removes every lesson in a date / time window in
+-- one transaction and leaves one lesson_refunds row per lesson, with the
+-- lesson's details, for billing to settle. Lessons carry no price, so a refund
+-- is recorded in minutes of lesson time. The players and coaches are told
+-- through an announcement with audience 'cancellation', delivered by the
+-- announcement fan-out (backend/announcements.py).
+
+CREATE TABLE IF NOT EXISTS lesson_cancellations (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  cancelled_by INTEGER,
+  reason TEXT NOT NULL,
+  date_from DATE NOT NULL,
+  date_to DATE NOT NULL,
+  start_time INTEGER NOT NULL,          -- window, minutes since midnight
+  end_time INTEGER NOT NULL,
+  coach_id INTEGER,                     -- NULL: every coach
+  lessons INTEGER NOT NULL DEFAULT 0,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (cancelled_by) REFERENCES users(id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS lesson_refunds (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  cancellation_id INTEGER NOT NULL,
+  lesson_id INTEGER NOT NULL UNIQUE,    -- the lesson itself is gone; refunded at most once
+  player_id INTEGER NOT NULL,
+  coach_id INTEGER NOT NULL,
+  lesson_date DATE NOT NULL,
+  start_time INTEGER NOT NULL,
+  end_time INTEGER NOT NULL,
+  minutes INTEGER NOT NULL,
+  status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'settled')),
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (cancellation_id) REFERENCES lesson_cancellations(id)
+);
+CREATE INDEX IF NOT EXISTS ix_lesson_refunds_cancellation ON lesson_refunds (cancellation_id);
+CREATE INDEX IF NOT EXISTS ix_lesson_refunds_status ON lesson_refunds (status, id);
+
+-- Announcements addressed to the players and coaches of a cancellation.
+-- SQLite can't change a CHECK constraint in place, so the table is rebuilt.
+CREATE TABLE announcements_new (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  author_id INTEGER,
+  title TEXT NOT NULL,
+  content TEXT NOT NULL,
+  important INTEGER NOT NULL DEFAULT 0,
+  audience TEXT NOT NULL CHECK (audience IN ('club', 'teams', 'players', 'cancellation')),
+  coach_id INTEGER,                     -- audience 'players': this coach's players
+  cancellation_id INTEGER,              -- audience 'cancellation': its players and coaches
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  fanout_cursor INTEGER NOT NULL DEFAULT 0,
+  recipients INTEGER NOT NULL DEFAULT 0,
+  delivered_at TIMESTAMP,               -- NULL while the fan-out is pending
+  FOREIGN KEY (author_id) REFERENCES users(id) ON DELETE SET NULL
+);
+
+INSERT INTO announcements_new (id, author_id, title, content, important, audience, coach_id, created_at,
+                               fanout_cursor, recipients, delivered_at)
+SELECT id, author_id, title, content, important, audience, coach_id, created_at,
+       fanout_cursor, recipients, delivered_at
+FROM announcements;
+
+DROP TABLE announcements;
+ALTER TABLE announcements_new RENAME TO announcements;
+CREATE INDEX IF NOT EXISTS ix_announcements_pending ON announcements (id) WHERE delivered_at IS NULL;
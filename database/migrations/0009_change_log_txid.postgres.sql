@@ -0,0 +1,38 @@
+-- 0009 change log ordered by transaction (PostgreSQL)
+-- 0006 made every change-logging transaction wait on one advisory lock, so
+-- seqs would commit in order; that serialized all writers, per-coach
+-- bookings included. Entries now record the writing transaction's id, and
+-- readers take only entries of ended transactions (txid below the snapshot's
+-- xmin) in (txid, seq) order (see changelog.py). Writers don't wait on each
+-- other any more.
+-- Entries logged before this step get txid 0, so they keep their seq order
+-- ahead of every new one; a token holding a bare seq reads as (0, seq).
+
+ALTER TABLE change_log ADD COLUMN IF NOT EXISTS txid BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE change_log ALTER COLUMN txid SET DEFAULT txid_current();
+CREATE INDEX IF NOT EXISTS ix_change_log_position ON change_log (txid, seq);
+
+ALTER TABLE change_log_state ADD COLUMN IF NOT EXISTS watermark_txid BIGINT NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION log_change() RETURNS trigger AS $$
+DECLARE
+    new_row JSONB := CASE WHEN TG_OP <> 'DELETE' THEN to_jsonb(NEW) END;
+    old_row JSONB := CASE WHEN TG_OP <> 'INSERT' THEN to_jsonb(OLD) END;
+    team_key TEXT := CASE WHEN TG_TABLE_NAME = 'teams' THEN 'id' ELSE 'team_id' END;
+BEGIN
+    IF TG_OP = 'UPDATE' AND (
+        old_row->>'coach_id' IS DISTINCT FROM new_row->>'coach_id'
+        OR old_row->>'player_id' IS DISTINCT FROM new_row->>'player_id'
+        OR old_row->>team_key IS DISTINCT FROM new_row->>team_key
+    ) THEN
+        INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+        VALUES (TG_TABLE_NAME, 'delete', (old_row->>'id')::int, (old_row->>'coach_id')::int,
+                (old_row->>'player_id')::int, (old_row->>team_key)::int);
+    END IF;
+    new_row := COALESCE(new_row, old_row);
+    INSERT INTO change_log (table_name, op, row_id, coach_id, player_id, team_id)
+    VALUES (TG_TABLE_NAME, lower(TG_OP), (new_row->>'id')::int, (new_row->>'coach_id')::int,
+            (new_row->>'player_id')::int, (new_row->>team_key)::int);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,9 @@
+-- 0009 change log positions (SQLite)
+-- Entries are read in (txid, seq) order on both databases (see the PostgreSQL
+-- step and changelog.py). SQLite has one writer at a time, so seq alone is
+-- in commit order and txid stays 0.
+
+ALTER TABLE change_log ADD COLUMN txid INTEGER NOT NULL DEFAULT 0;
+CREATE INDEX IF NOT EXISTS ix_change_log_position ON change_log (txid, seq);
+
+ALTER TABLE change_log_state ADD COLUMN watermark_txid INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,19 @@
+-- 0010 lesson overlap guard on updates (SQLite)
+-- The 0003 / 0005 trigger only checks inserts, so an UPDATE could move a
+-- lesson onto another of the same coach. This one checks updates of the
+-- coach, date or times, against every other lesson. PostgreSQL's exclusion
+-- constraint already covers updates.
+
+CREATE TRIGGER IF NOT EXISTS trg_private_lessons_no_overlap_update
+BEFORE UPDATE OF coach_id, lesson_date, start_time, end_time ON private_lessons
+WHEN EXISTS (
+    SELECT 1 FROM private_lessons
+    WHERE coach_id = NEW.coach_id
+      AND lesson_date = NEW.lesson_date
+      AND start_time < NEW.end_time
+      AND end_time > NEW.start_time
+      AND id <> OLD.id
+)
+BEGIN
+    SELECT RAISE(ABORT, 'lesson overlaps an existing booking');
+END;
@@ -1,5 +1,7 @@
 -- schema.sql for PostgreSQL
 -- Adjust as needed for your naming / constraints
+-- This is the baseline only: schema changes now go in database/migrations/
+-- (applied by backend/migrations.py at startup).
 
 -- USERS table
 CREATE TABLE IF NOT EXISTS users (